@@ -0,0 +1,96 @@
+"""
+Аутентификация по JWT без запроса пользователя к БД на каждый вызов API.
+
+Состояние пользователя (активен и не удален) кэшируется на JWT_USER_STATE_TTL секунд, поэтому деактивированный или
+удаленный пользователь теряет доступ сразу после сохранения (кэш сбрасывается сигналами) или, если изменение прошло
+в обход сигналов (queryset.update()), не позже чем через TTL. Для нескольких процессов нужен общий кэш (CACHES).
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from apps.accounts.models import LazyUser
+
+
+def user_state_key(user_id):
+    return f"accounts:user-state:{user_id}"
+
+
+def forget_user_state(user_id):
+    cache.delete(user_state_key(user_id))
+
+
+class LazyJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication, которая возвращает LazyUser: строка пользователя читается из БД, только если view
+    обращается к его полям. Если состояние пользователя не закэшировано, пользователь загружается целиком (тот же
+    один запрос, что и у JWTAuthentication), и состояние кэшируется.
+    """
+
+    @staticmethod
+    def get_user_id(validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    @staticmethod
+    def check_user(user):
+        """Проверяет загруженного пользователя и возвращает его состояние для кэша."""
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        return user.is_active and not user.is_deleted
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Для проверки смены пароля нужен хэш пароля из БД
+            return super().get_user(validated_token)
+        user_id = self.get_user_id(validated_token)
+
+        key = user_state_key(user_id)
+        is_active = cache.get(key)
+        if is_active is True:
+            return LazyUser.from_pk(user_id)
+
+        user = None
+        if is_active is None:
+            user = LazyUser.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+            is_active = self.check_user(user)
+            cache.set(key, is_active, settings.JWT_USER_STATE_TTL)
+        if not is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+    async def aget_user(self, validated_token):
+        """Асинхронный вариант get_user() для apps.common.async_views.AsyncAPIView."""
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return await sync_to_async(super().get_user)(validated_token)
+        user_id = self.get_user_id(validated_token)
+
+        key = user_state_key(user_id)
+        is_active = await cache.aget(key)
+        if is_active is True:
+            return LazyUser.from_pk(user_id)
+
+        user = None
+        if is_active is None:
+            user = await LazyUser.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).afirst()
+            is_active = self.check_user(user)
+            await cache.aset(key, is_active, settings.JWT_USER_STATE_TTL)
+        if not is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
@@ -0,0 +1,153 @@
+"""
+Политика хэширования паролей.
+
+Новые пароли хэшируются первым хэшером из settings.PASSWORD_HASHERS (Argon2id, а без пакета argon2-cffi — scrypt) с
+параметрами из settings.PASSWORD_HASHING. Хэши старых алгоритмов и параметров проверяются как раньше и
+перехэшируются при следующем успешном входе.
+
+Хэширование и проверка выполняются в ограниченном пуле процессов: во время волны входов нагрузка на CPU не превышает
+POOL_SIZE ядер, а запросы сверх QUEUE_DEPTH сразу получают отказ (HashingOverloaded) вместо бесконечной очереди.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    ScryptPasswordHasher,
+    check_password,
+    get_hasher,
+    identify_hasher,
+    make_password,
+)
+
+DEFAULTS = {
+    # Argon2id по рекомендации OWASP: 19 МиБ памяти, 2 прохода, 1 поток
+    "ARGON2": {"time_cost": 2, "memory_cost": 19456, "parallelism": 1},
+    # scrypt: 128 * N * r байт памяти (16 МиБ)
+    "SCRYPT": {"work_factor": 2 ** 14, "block_size": 8, "parallelism": 1},
+    "POOL_SIZE": None,  # процессов в пуле (None — по числу ядер, 0 — хэшировать в потоке запроса)
+    "QUEUE_DEPTH": 32,  # сколько проверок может выполняться и ждать одновременно
+}
+
+
+def get_config():
+    config = getattr(settings, "PASSWORD_HASHING", {})
+    return {
+        **DEFAULTS,
+        **config,
+        "ARGON2": {**DEFAULTS["ARGON2"], **config.get("ARGON2", {})},
+        "SCRYPT": {**DEFAULTS["SCRYPT"], **config.get("SCRYPT", {})},
+    }
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2id с параметрами из PASSWORD_HASHING["ARGON2"]. Хэши с другими параметрами перехэшируются при входе."""
+
+    @property
+    def time_cost(self):
+        return get_config()["ARGON2"]["time_cost"]
+
+    @property
+    def memory_cost(self):
+        return get_config()["ARGON2"]["memory_cost"]
+
+    @property
+    def parallelism(self):
+        return get_config()["ARGON2"]["parallelism"]
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    """scrypt с параметрами из PASSWORD_HASHING["SCRYPT"]."""
+
+    @property
+    def work_factor(self):
+        return get_config()["SCRYPT"]["work_factor"]
+
+    @property
+    def block_size(self):
+        return get_config()["SCRYPT"]["block_size"]
+
+    @property
+    def parallelism(self):
+        return get_config()["SCRYPT"]["parallelism"]
+
+
+class HashingOverloaded(Exception):
+    """Очередь пула хэширования заполнена."""
+
+
+class HashingPool:
+    """
+    Пул процессов для хэширования с ограничением очереди. Процессы запускаются при первом обращении методом spawn:
+    fork процесса с потоками (сервер приложений, пул миниатюр) небезопасен.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+
+    def _start(self):
+        with self._lock:
+            if self._executor is None:
+                config = get_config()
+                self._slots = threading.BoundedSemaphore(config["QUEUE_DEPTH"])
+                self._executor = ProcessPoolExecutor(
+                    max_workers=config["POOL_SIZE"] or os.cpu_count() or 1,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+        return self._executor
+
+    def run(self, func, *args):
+        if get_config()["POOL_SIZE"] == 0:
+            return func(*args)
+        executor = self._start()
+        if not self._slots.acquire(blocking=False):
+            raise HashingOverloaded()
+        try:
+            return executor.submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+            self._executor = None
+
+
+pool = HashingPool()
+
+
+def hash_password(raw_password):
+    """make_password() в пуле процессов."""
+    return pool.run(make_password, raw_password)
+
+
+def needs_rehash(encoded):
+    """Хэш сделан не предпочтительным алгоритмом или с устаревшими параметрами."""
+    preferred = get_hasher("default")
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+def verify_password(user, raw_password):
+    """
+    Проверяет пароль пользователя в пуле процессов. После успешной проверки устаревший хэш заменяется хэшем по
+    текущей политике; если пул перегружен, перехэширование откладывается до следующего входа.
+    """
+    if not pool.run(check_password, raw_password, user.password):
+        return False
+    if needs_rehash(user.password):
+        try:
+            user.password = hash_password(raw_password)
+        except HashingOverloaded:
+            return True
+        user.save(update_fields=["password"])
+    return True
@@ -2,6 +2,8 @@ from django.contrib.auth.base_user import BaseUserManager
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
 
+from apps.common.managers import live_and_archived
+
 
 class CustomUserManager(BaseUserManager):
     """
@@ -9,6 +11,10 @@ class CustomUserManager(BaseUserManager):
     логику для суперпользователей.
     """
 
+    def with_archived(self):
+        """Все пользователи, включая мягко удаленных и перенесенных в архив (apps.common.archive)."""
+        return live_and_archived(self.model, self.get_queryset())
+
     def email_validator(self, email):
         """
         Метод проверяет корректность адреса электронной почты с помощью validate_email из django.core.validators
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:53
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_lazy_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedUser',
+            fields=[
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('id', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('first_name', models.CharField(max_length=25, null=True, verbose_name='First name')),
+                ('last_name', models.CharField(max_length=25, null=True, verbose_name='Last name')),
+                ('email', models.EmailField(max_length=254, verbose_name='Email address')),
+                ('avatar', models.ImageField(default='avatars/default.jpg', null=True, upload_to='avatars/')),
+                ('is_staff', models.BooleanField(default=False)),
+                ('is_active', models.BooleanField(default=True)),
+                ('account_type', models.CharField(choices=[('SELLER', 'SELLER'), ('BUYER', 'BUYER')], default='BUYER', max_length=6)),
+            ],
+            options={
+                'verbose_name': 'archived user',
+                'db_table': 'accounts_user_archive',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at'], name='accounts_user_deleted_idx'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.contrib.auth.base_user import AbstractBaseUser
 from django.db import models
 
 from apps.accounts.managers import CustomUserManager
+from apps.common.archive import archive_model
 from apps.common.models import IsDeletedModel
 
 
@@ -44,6 +45,9 @@ class User(AbstractBaseUser, IsDeletedModel):
 
     objects = CustomUserManager()
 
+    class Meta(IsDeletedModel.Meta):
+        pass
+
     @property
     def full_name(self):
         return f'{self.first_name} {self.last_name}'
@@ -61,3 +65,51 @@ class User(AbstractBaseUser, IsDeletedModel):
     def is_superuser(self):
         return self.is_staff
 
+
+
+# Архив мягко удаленных пользователей (apps.common.archive)
+ArchivedUser = archive_model(User)
+
+
+class LazyUser(User):
+    """
+    Пользователь, восстановленный из JWT без запроса к БД: загружен только первичный ключ. Строка из БД читается
+    целиком при первом обращении к любому другому полю, а save() сохраняет только поля, которые были загружены или
+    изменены (плюс updated_at), поэтому устаревшие значения не перезаписываются.
+    """
+
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_pk(cls, pk):
+        return cls.from_db(None, [cls._meta.pk.attname], [cls._meta.pk.to_python(pk)])
+
+    async def aload(self):
+        """
+        Загружает отложенные поля через async ORM. В async-представлениях ленивая загрузка при обращении к полю
+        невозможна (синхронный запрос в event loop), поэтому поля нужно загрузить заранее.
+        """
+        deferred_fields = self.get_deferred_fields()
+        if deferred_fields:
+            row = await type(self)._base_manager.filter(pk=self.pk).values(*deferred_fields).aget()
+            for attname, value in row.items():
+                setattr(self, attname, value)
+        return self
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # Первое обращение к отложенному полю загружает все отложенные поля одним запросом, а не по одному
+        if fields is not None:
+            deferred_fields = self.get_deferred_fields()
+            if deferred_fields and set(fields) <= deferred_fields:
+                fields = deferred_fields
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+
+    def save(self, *args, **kwargs):
+        deferred_fields = self.get_deferred_fields()
+        if deferred_fields and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = {
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and (field.attname not in deferred_fields or field.name == "updated_at")
+            }
+        super().save(*args, **kwargs)
@@ -1,7 +1,7 @@
-from django.contrib.auth.hashers import make_password
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
+from apps.accounts.hashers import hash_password
 from apps.accounts.models import User
 
 
@@ -11,7 +11,8 @@ class CreateUserSerializer(serializers.ModelSerializer):
         fields = ('email', 'password')
 
     def validate_password(self, value: str) -> str:
-        return make_password(value)
+        # Хэширование выполняется в пуле процессов (apps.accounts.hashers)
+        return hash_password(value)
 
 
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
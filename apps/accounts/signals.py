@@ -0,0 +1,35 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.accounts.authentication import forget_user_state
+from apps.accounts.models import LazyUser, User
+from apps.common.images import schedule_instance_renditions
+from apps.common.signals import restored, soft_deleted
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=LazyUser)
+def generate_avatar_renditions(sender, instance, **kwargs):
+    """Ставит генерацию миниатюр аватара в фоновый пул."""
+    if "avatar" not in instance.get_deferred_fields():
+        schedule_instance_renditions(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=LazyUser)
+@receiver(post_delete, sender=User)
+def reset_user_state(sender, instance, **kwargs):
+    """Сбрасывает закэшированное состояние пользователя (is_active, is_deleted) для LazyJWTAuthentication."""
+    user_id = instance.pk
+    transaction.on_commit(lambda: forget_user_state(user_id))
+
+
+@receiver([soft_deleted, restored], sender=User)
+def reset_users_state(sender, ids, **kwargs):
+    """То же для пачки пользователей, удаленных или восстановленных через IsDeletedQuerySet."""
+    def forget():
+        for user_id in ids:
+            forget_user_state(user_id)
+
+    transaction.on_commit(forget)
@@ -1,3 +1,123 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.accounts.authentication import user_state_key
+from apps.accounts.hashers import HashingOverloaded, pool
+from apps.accounts.models import User
+from apps.accounts.throttling import SlidingWindow, SlidingWindowThrottle
+from apps.common.archive import archive_deleted
+from apps.profiles.models import ShippingAddress
+
+
+class LazyJWTAuthenticationTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("Ivan", "Petrov", "buyer@example.com", "password123")
+        ShippingAddress.objects.create(user=self.user, full_name="Ivan Petrov", email="buyer@example.com")
+        cache.delete(user_state_key(self.user.id))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+    def query_count(self, method, path, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(path, **kwargs)
+        return response, len(context.captured_queries)
+
+    def test_user_row_is_not_loaded_when_state_is_cached(self):
+        response, first = self.query_count("get", "/profiles/shipping_addresses/")
+        self.assertEqual(response.status_code, 200)
+        response, second = self.query_count("get", "/profiles/shipping_addresses/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(second, first - 1)
+
+    def test_model_fields_are_loaded_lazily_in_one_query(self):
+        self.client.get("/profiles/")
+        response, queries = self.query_count("get", "/profiles/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["first_name"], "Ivan")
+        self.assertEqual(queries, 1)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get("/profiles/")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete("/profiles/")
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(self.user.first_name, "Ivan")
+
+        self.assertEqual(self.client.get("/profiles/").status_code, 401)
+
+    def test_soft_deleted_user_is_rejected(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.client.get("/profiles/").status_code, 401)
+
+
+class TokenObtainTest(APITestCase):
+    def setUp(self):
+        SlidingWindowThrottle.reset()
+        self.user = User.objects.create_user("Ivan", "Petrov", "buyer@example.com", "password123")
+
+    def obtain(self, email="buyer@example.com", password="password123"):
+        return self.client.post("/auth/token/", {"email": email, "password": password})
+
+    @override_settings(PASSWORD_HASHING={"POOL_SIZE": 1})
+    def test_outdated_hash_is_replaced_on_login(self):
+        self.user.password = make_password("password123", hasher="pbkdf2_sha256")
+        self.user.save(update_fields=["password"])
+
+        self.assertEqual(self.obtain(password="wrong").status_code, 401)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+
+        self.assertEqual(self.obtain().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("scrypt$"))
+        self.assertEqual(self.obtain().status_code, 200)
+
+    def test_overloaded_pool_rejects_login(self):
+        with mock.patch.object(pool, "run", side_effect=HashingOverloaded):
+            response = self.obtain()
+        self.assertEqual((response.status_code, response["Retry-After"]), (503, "1"))
+
+    @override_settings(LOGIN_RATE_LIMITS={"ip": "5/min", "email": "2/min"}, PASSWORD_HASHING={"POOL_SIZE": 0})
+    def test_rate_limits_per_email_and_ip(self):
+        self.assertEqual([self.obtain(password="wrong").status_code for _ in range(3)], [401, 401, 429])
+        # Лимит email не мешает входу под другим email, пока не исчерпан лимит IP
+        self.assertEqual([self.obtain(email=f"user{i}@example.com").status_code for i in range(3)], [401, 401, 429])
+
+
+class SlidingWindowTest(TestCase):
+    def test_previous_window_is_weighted(self):
+        window = SlidingWindow(limit=10, period=60)
+        for _ in range(10):
+            self.assertIsNone(window.hit("ip", now=30))
+        self.assertEqual(window.hit("ip", now=59), 1)
+        # Через 30 секунд нового окна предыдущее учитывается наполовину: 5 + 5 новых запросов
+        results = [window.hit("ip", now=90) for _ in range(6)]
+        self.assertEqual(results[:5], [None] * 5)
+        self.assertEqual(results[5], 6)
+
+
+class UserArchiveTest(TestCase):
+    def test_archived_user_is_read_back(self):
+        User.objects.create_user("Ivan", "Petrov", "live@example.com", "password123")
+        gone = User.objects.create_user("Petr", "Ivanov", "gone@example.com", "password123")
+        gone.delete()
+        User.objects.filter(id=gone.id).update(deleted_at=timezone.now() - timedelta(days=60))
+        self.assertEqual(archive_deleted(User, pause=0), 1)
+
+        self.assertFalse(User.objects.filter(email="gone@example.com").exists())
+        self.assertEqual(User.objects.with_archived().count(), 2)
+        archived = User.objects.with_archived().get(email="gone@example.com")
+        self.assertIsInstance(archived, User)
+        self.assertEqual((archived.id, archived.is_deleted), (gone.id, True))
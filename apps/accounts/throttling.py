@@ -0,0 +1,111 @@
+"""
+Ограничение частоты запросов к endpoint'ам токенов по IP и по email. Счетчики — скользящее окно в памяти процесса:
+на ключ хранятся только счетчики текущего и предыдущего окна, поэтому проверка занимает O(1) и не обращается к кэшу
+или БД. Лимиты задает settings.LOGIN_RATE_LIMITS.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+# Сколько ключей хранит одно окно; самые давние вытесняются
+MAX_KEYS = 100_000
+
+
+def parse_rate(rate):
+    """'5/min' -> (5, 60)."""
+    count, period = rate.split("/")
+    return int(count), PERIODS[period[0]]
+
+
+class SlidingWindow:
+    """
+    Приближенное скользящее окно: число запросов за последние period секунд оценивается как счетчик текущего окна
+    плюс доля счетчика предыдущего, пропорциональная перекрытию.
+    """
+
+    def __init__(self, limit, period, max_keys=MAX_KEYS):
+        self.limit = limit
+        self.period = period
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._counters = OrderedDict()
+
+    def hit(self, key, now=None):
+        """Учитывает запрос. Возвращает None, если он разрешен, иначе — сколько секунд ждать."""
+        now = time.monotonic() if now is None else now
+        window = now - now % self.period
+        with self._lock:
+            start, current, previous = self._counters.pop(key, (window, 0, 0))
+            if start != window:
+                previous = current if window - start == self.period else 0
+                current = 0
+            elapsed = now - window
+            estimated = previous * (1 - elapsed / self.period) + current
+            if estimated + 1 > self.limit:
+                wait = self.period - elapsed
+                if current + 1 <= self.limit and previous:
+                    # Лимит освободится, когда вклад предыдущего окна уменьшится достаточно
+                    wait = self.period * (1 - (self.limit - current - 1) / previous) - elapsed
+                self._counters[key] = (window, current, previous)
+                return max(wait, 0.0)
+            self._counters[key] = (window, current + 1, previous)
+            if len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+            return None
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """Базовый класс: окно на каждую пару (scope, лимит) общее для всех представлений процесса."""
+
+    scope = None
+    windows = {}
+    windows_lock = threading.Lock()
+
+    def get_key(self, request):
+        raise NotImplementedError
+
+    def get_window(self):
+        rate = getattr(settings, "LOGIN_RATE_LIMITS", {}).get(self.scope)
+        if not rate:
+            return None
+        with self.windows_lock:
+            window = self.windows.get((self.scope, rate))
+            if window is None:
+                window = self.windows[(self.scope, rate)] = SlidingWindow(*parse_rate(rate))
+        return window
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        window = self.get_window()
+        key = self.get_key(request) if window else None
+        if key is None:
+            return True
+        self.wait_seconds = window.hit(key)
+        return self.wait_seconds is None
+
+    def wait(self):
+        return self.wait_seconds
+
+    @classmethod
+    def reset(cls):
+        with cls.windows_lock:
+            cls.windows.clear()
+
+
+class TokenIPThrottle(SlidingWindowThrottle):
+    scope = "ip"
+
+    def get_key(self, request):
+        return self.get_ident(request)
+
+
+class TokenEmailThrottle(SlidingWindowThrottle):
+    scope = "email"
+
+    def get_key(self, request):
+        email = request.data.get("email") if hasattr(request.data, "get") else None
+        return email.strip().lower() if isinstance(email, str) and email.strip() else None
@@ -1,11 +1,15 @@
 from django.urls import path
-from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
 
-from apps.accounts.views import RegisterAPIView, MyTokenObtainPairView
+from apps.accounts.views import (
+    MyTokenObtainPairView,
+    RegisterAPIView,
+    ThrottledTokenRefreshView,
+    ThrottledTokenVerifyView,
+)
 
 urlpatterns = [
     path('', RegisterAPIView.as_view(), name='registration'),
     path('token/', MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('token/verify/', TokenVerifyView.as_view(), name='token_verify'),
+    path('token/refresh/', ThrottledTokenRefreshView.as_view(), name='token_refresh'),
+    path('token/verify/', ThrottledTokenVerifyView.as_view(), name='token_verify'),
 ]
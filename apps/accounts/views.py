@@ -1,8 +1,15 @@
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
 
+from apps.accounts.hashers import HashingOverloaded
 from apps.accounts.serializers import CreateUserSerializer, MyTokenObtainPairSerializer
+from apps.accounts.throttling import TokenEmailThrottle, TokenIPThrottle
+
+
+def overloaded_response():
+    """Ответ при заполненной очереди пула хэширования: клиенту стоит повторить запрос чуть позже."""
+    return Response({"message": "Service is busy, please retry"}, status=503, headers={"Retry-After": "1"})
 
 
 class RegisterAPIView(APIView):
@@ -10,7 +17,11 @@ class RegisterAPIView(APIView):
 
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
-        if serializer.is_valid():
+        try:
+            is_valid = serializer.is_valid()
+        except HashingOverloaded:
+            return overloaded_response()
+        if is_valid:
             serializer.save()
             return Response({'message': "success"}, status=201)
         return Response(serializer.errors, status=400)
@@ -18,5 +29,18 @@ class RegisterAPIView(APIView):
 
 class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
+    throttle_classes = [TokenIPThrottle, TokenEmailThrottle]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            return super().post(request, *args, **kwargs)
+        except HashingOverloaded:
+            return overloaded_response()
+
+
+class ThrottledTokenRefreshView(TokenRefreshView):
+    throttle_classes = [TokenIPThrottle]
+
 
-    # 4.8 второй шаг
\ No newline at end of file
+class ThrottledTokenVerifyView(TokenVerifyView):
+    throttle_classes = [TokenIPThrottle]
@@ -0,0 +1,124 @@
+"""
+Архивирование мягко удаленных строк IsDeletedModel.
+
+Строки, удаленные раньше окна хранения, переносятся из рабочей таблицы в таблицу-архив с теми же колонками
+(`<таблица>_archive`), поэтому рабочие таблицы и их индексы не растут за счет мертвых строк. Архивная модель
+создается фабрикой archive_model() рядом с рабочей, а менеджеры читают обе таблицы через with_archived().
+"""
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, models, router, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+DEFAULTS = {
+    "RETENTION_DAYS": 30,  # сколько дней удаленная строка остается в рабочей таблице
+    "BATCH_SIZE": 500,  # строк за одну транзакцию
+    "PAUSE": 0.1,  # пауза между пачками (в секундах), чтобы не держать блокировку записи подряд
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "SOFT_DELETE_ARCHIVE", {})}
+
+
+def _archive_field(field):
+    """Копия поля для архива: без уникальности, индексов и ограничений внешних ключей."""
+    if field.is_relation:
+        # deconstruct() внешнего ключа требует загруженного реестра приложений, поэтому поле собирается явно
+        return models.ForeignKey(
+            field.remote_field.model, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+",
+            null=field.null, blank=field.blank, db_column=field.db_column,
+        )
+    _, _, args, kwargs = field.deconstruct()
+    kwargs.pop("unique", None)
+    if not field.primary_key:
+        kwargs["db_index"] = False
+    return field.__class__(*args, **kwargs)
+
+
+def archive_model(model):
+    """
+    Создает модель архивной таблицы для model с теми же колонками в том же порядке (это нужно для UNION в
+    with_archived()). Вызывается в models.py приложения сразу после рабочей модели, чтобы архив попал в миграции.
+    """
+    meta = type("Meta", (), {
+        "db_table": f"{model._meta.db_table}_archive",
+        "app_label": model._meta.app_label,
+        "verbose_name": f"archived {model._meta.verbose_name}",
+    })
+    attrs = {"__module__": model.__module__, "Meta": meta, "objects": models.Manager()}
+    for field in model._meta.concrete_fields:
+        attrs[field.name] = _archive_field(field)
+    archive = type(f"Archived{model.__name__}", (models.Model,), attrs)
+    model.archive_model = archive
+    return archive
+
+
+def get_archived_models():
+    return [
+        model for model in apps.get_models()
+        if getattr(model, "archive_model", None) is not None and not model._meta.proxy
+    ]
+
+
+def _blocking_relations(model):
+    """Обратные связи, из-за которых строку нельзя убрать из рабочей таблицы (иначе сломается внешний ключ)."""
+    return [
+        relation for relation in model._meta.related_objects
+        if relation.on_delete not in (models.SET_NULL, models.SET_DEFAULT)
+    ]
+
+
+def archivable(model, cutoff):
+    """Удаленные до cutoff строки, на которые никто не ссылается, в порядке первичного ключа."""
+    queryset = model._base_manager.filter(is_deleted=True, deleted_at__lt=cutoff)
+    for relation in _blocking_relations(model):
+        related = relation.related_model._base_manager.filter(**{relation.field.name: OuterRef("pk")})
+        queryset = queryset.filter(~Exists(related))
+    return queryset.order_by("pk")
+
+
+def archive_deleted(model, retention_days=None, batch_size=None, pause=None, now=None):
+    """
+    Переносит в архив строки model, удаленные больше retention_days дней назад. Каждая пачка — отдельная короткая
+    транзакция (INSERT ... SELECT в архив и удаление из рабочей таблицы), между пачками — пауза. Строки, на которые
+    ссылаются другие таблицы (например, товары из заказов), остаются на месте. Возвращает число перенесенных строк.
+    """
+    config = get_config()
+    retention_days = config["RETENTION_DAYS"] if retention_days is None else retention_days
+    batch_size = batch_size or config["BATCH_SIZE"]
+    pause = config["PAUSE"] if pause is None else pause
+    cutoff = (now or timezone.now()) - timedelta(days=retention_days)
+
+    archive = model.archive_model
+    using = router.db_for_write(model)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    columns = [field.column for field in model._meta.concrete_fields]
+    attnames = [field.attname for field in model._meta.concrete_fields]
+
+    moved = 0
+    while True:
+        with transaction.atomic(using=using):
+            ids = list(archivable(model, cutoff).using(using).values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                return moved
+            select_sql, params = model._base_manager.using(using).filter(pk__in=ids).values_list(
+                *attnames
+            ).query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {quote(archive._meta.db_table)} ({', '.join(quote(c) for c in columns)}) {select_sql}",
+                    params,
+                )
+            # Удаление через Collector: обнуляет SET_NULL-ссылки и отправляет сигналы удаления (поиск, кэши)
+            model._base_manager.using(using).filter(pk__in=ids).delete()
+        moved += len(ids)
+        if len(ids) < batch_size:
+            return moved
+        if pause:
+            time.sleep(pause)
@@ -0,0 +1,81 @@
+"""
+Асинхронные представления DRF для запуска под ASGI (uvicorn core.asgi:application).
+
+DRF выполняет APIView синхронно, поэтому под ASGI каждый запрос целиком уходит в поток через sync_to_async.
+AsyncAPIView выполняет аутентификацию, проверку прав и async-обработчики прямо в event loop, а синхронные
+обработчики (например, POST в наследнике синхронного представления) запускает в потоке. Какие маршруты обслуживаются
+async-вариантами, задает settings.ASYNC_VIEWS (см. select_view()).
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView с асинхронным dispatch(). Async-обработчики не должны обращаться к ленивым полям и связям моделей:
+    все данные загружаются заранее через async ORM (aget, async for), а сериализатор получает готовые объекты.
+    Сериализаторы с RenditionField синхронно читают кэш и хранилище, поэтому их нужно вызывать через sync_to_async.
+    """
+
+    # Django разрешает только все синхронные или все асинхронные обработчики; здесь допускаются оба вида
+    view_is_async = True
+
+    async def perform_aauthentication(self, request):
+        """
+        Аутентификация без блокировки event loop: у аутентификаторов с методом aauthenticate() он вызывается
+        напрямую, остальные выполняются в потоке.
+        """
+        for authenticator in request.authenticators:
+            if hasattr(authenticator, "aauthenticate"):
+                user_auth_tuple = await authenticator.aauthenticate(request)
+            else:
+                user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+        request._not_authenticated()
+
+    async def ainitial(self, request, *args, **kwargs):
+        """Асинхронный аналог APIView.initial()."""
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+        request.accepted_renderer, request.accepted_media_type = self.perform_content_negotiation(request)
+        request.version, request.versioning_scheme = self.determine_version(request, *args, **kwargs)
+        await self.perform_aauthentication(request)
+        self.check_permissions(request)
+        self.check_throttles(request)
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            if asyncio.iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+def select_view(sync_view, async_view):
+    """
+    Представление для маршрута: async-вариант, если имя синхронного класса указано в settings.ASYNC_VIEWS.
+    Выбор делается при загрузке URLconf.
+    """
+    view = async_view if sync_view.__name__ in getattr(settings, "ASYNC_VIEWS", ()) else sync_view
+    return view.as_view()
@@ -0,0 +1,527 @@
+"""
+Нагрузочные замеры API: детерминированное наполнение базы синтетическими данными и прогон сценариев через
+тестовый клиент Django (в процессе), через локальный WSGI-сервер с параллельными клиентами или через ASGI-приложение
+с параллельными запросами в одном event loop (как под uvicorn). Используется командой `python manage.py benchmark`.
+"""
+import asyncio
+import http.client
+import importlib
+import json
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from decimal import Decimal
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import clear_url_caches
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from apps.common.codes import generate_codes
+from apps.common.compiled import compile_serializer
+from apps.common.projection import get_projection
+from apps.common.renderers import STREAM_CHUNK_SIZE, ORJSONRenderer, stream_json_array
+from apps.common.middleware import QueryCollector
+
+BENCHMARK_PASSWORD = "benchmark-password"
+SERVER_TIMING_QUERIES_RE = re.compile(r'desc="(\d+) queries')
+
+# Представления, у которых есть async-варианты (apps.common.async_views), и модули URLconf, где они выбираются
+ASYNC_VIEW_NAMES = ["CategoriesView", "ProductsView", "ProfileView", "ShippingAddressesView"]
+URLCONF_MODULES = ["apps.shop.urls", "apps.profiles.urls"]
+
+
+def _reload_urlconf():
+    for name in [*URLCONF_MODULES, settings.ROOT_URLCONF]:
+        if name in sys.modules:
+            importlib.reload(sys.modules[name])
+    clear_url_caches()
+
+
+@contextmanager
+def use_async_views(enabled):
+    """Переключает маршруты на async- или sync-варианты представлений (settings.ASYNC_VIEWS) на время замера."""
+    try:
+        with override_settings(ASYNC_VIEWS=ASYNC_VIEW_NAMES if enabled else []):
+            _reload_urlconf()
+            yield
+    finally:
+        _reload_urlconf()
+
+
+@dataclass
+class Dataset:
+    """Созданные объекты, на которые ссылаются сценарии."""
+    buyers: list = field(default_factory=list)
+    sellers: list = field(default_factory=list)
+    shipping_addresses: dict = field(default_factory=dict)
+
+
+def seed(users=200, sellers=20, categories=10, products=2000, orders=500, seed_value=42):
+    """
+    Наполняет базу синтетическими данными. При одинаковых параметрах и seed_value набор данных всегда одинаковый.
+    Все вставки — bulk_create, а пароль хэшируется один раз для всех пользователей.
+    """
+    from apps.accounts.models import User
+    from apps.profiles.models import Order, OrderItem, ShippingAddress
+    from apps.sellers.models import Seller
+    from apps.shop.categories import rebuild as rebuild_categories
+    from apps.shop.models import Category, Product
+
+    rnd = random.Random(seed_value)
+    password = make_password(BENCHMARK_PASSWORD)
+    dataset = Dataset()
+
+    user_objs = User.objects.bulk_create(
+        User(
+            first_name=f"User{i}", last_name="Bench", email=f"user{i}@bench.local", password=password,
+            account_type="SELLER" if i < sellers else "BUYER",
+        )
+        for i in range(users)
+    )
+    seller_objs = Seller.objects.bulk_create(
+        Seller(
+            user=user, business_name=f"Shop {i}", inn_identification_number=str(7700000000 + i),
+            phone_number="+70000000000", business_description="Benchmark shop", business_address="Lenina 1",
+            city="Moscow", postal_code="101000", bank_name="Bank", bank_bic_number="044525225",
+            bank_account_number="40702810000000000000", bank_routing_number="0", is_approved=True,
+        )
+        for i, user in enumerate(user_objs[:sellers])
+    )
+    category_objs = Category.objects.bulk_create(
+        Category(name=f"Category {i}", slug=f"category-{i}", image=f"category_images/category-{i}.jpg")
+        for i in range(categories)
+    )
+
+    product_objs = []
+    for i in range(products):
+        price = Decimal(rnd.randrange(100, 100000)) / 100
+        product = Product(
+            seller=seller_objs[i % sellers], name=f"Product {i}", slug=f"product-{i}",
+            desc=" ".join(rnd.choice(("fast", "new", "phone", "laptop", "black", "pro", "mini")) for _ in range(30)),
+            price_current=price, price_old=price + 10, category=category_objs[rnd.randrange(categories)],
+            in_stock=rnd.randrange(0, 50), image1=f"product_images/product-{i}.jpg",
+        )
+        product._slug_reserved = True
+        product_objs.append(product)
+    Product.objects.bulk_create(product_objs, batch_size=1000)
+    # bulk_create не вызывает save() и сигналы: пути и счетчики категорий заполняются одним пересчетом
+    rebuild_categories()
+
+    buyers = user_objs[sellers:] or user_objs
+    address_objs = ShippingAddress.objects.bulk_create(
+        ShippingAddress(
+            user=user, full_name=f"{user.first_name} {user.last_name}", email=user.email, phone="+70000000000",
+            address=f"Street {n}", city="Moscow", country="Russia", zipcode=101000 + n,
+        )
+        for user in buyers for n in range(2)
+    )
+
+    order_objs, item_objs = [], []
+    for buyer, code in zip((rnd.choice(buyers) for _ in range(orders)), generate_codes(orders)):
+        order = Order(user=buyer, tx_ref=code, address="Street 1", city="Moscow", payment_status="SUCCESSFUL")
+        for _ in range(rnd.randrange(1, 6)):
+            product, quantity = rnd.choice(product_objs), rnd.randrange(1, 4)
+            item_objs.append(OrderItem(
+                user=buyer, order=order, product=product, quantity=quantity, unit_price=product.price_current,
+                line_total=product.price_current * quantity,
+            ))
+            order.total += product.price_current * quantity
+            order.item_count += quantity
+        order_objs.append(order)
+    Order.objects.bulk_create(order_objs, batch_size=1000)
+    OrderItem.objects.bulk_create(item_objs, batch_size=1000)
+
+    dataset.buyers = buyers
+    dataset.sellers = [seller.user for seller in seller_objs]
+    for address in address_objs:
+        dataset.shipping_addresses.setdefault(address.user_id, address.id)
+    return dataset
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    # Пользователь, от имени которого выполняется запрос (Bearer access-токен)
+    user: object = None
+    data: dict = None
+    # Пользователь, для которого перед прогоном выпускается по одному refresh-токену на запрос
+    refresh_user: object = None
+    max_iterations: int = None
+
+
+def build_scenarios(dataset):
+    buyer = dataset.buyers[0]
+    seller = dataset.sellers[0]
+    address_id = dataset.shipping_addresses[buyer.id]
+    return [
+        Scenario("categories", "GET", "/shop/categories/"),
+        Scenario("products_catalog", "GET", "/shop/products/"),
+        Scenario("seller_products", "GET", "/sellers/products/", user=seller),
+        Scenario("profile", "GET", "/profiles/", user=buyer),
+        Scenario("shipping_addresses", "GET", "/profiles/shipping_addresses/", user=buyer),
+        Scenario("shipping_address_detail", "GET", f"/profiles/shipping_addresses/detail/{address_id}/", user=buyer),
+        # Проверка пароля намеренно дорогая, поэтому итераций меньше
+        Scenario(
+            "token_obtain", "POST", "/auth/token/",
+            data={"email": buyer.email, "password": BENCHMARK_PASSWORD}, max_iterations=20,
+        ),
+        # Refresh-токены одноразовые (ROTATE_REFRESH_TOKENS + BLACKLIST_AFTER_ROTATION): на каждый вызов свой токен
+        Scenario("token_refresh", "POST", "/auth/token/refresh/", refresh_user=buyer),
+    ]
+
+
+def summarize(latencies, queries, errors, elapsed):
+    latencies_ms = sorted(value * 1000 for value in latencies)
+
+    def percentile(percent):
+        if not latencies_ms:
+            return None
+        index = min(len(latencies_ms) - 1, max(0, round(percent / 100 * len(latencies_ms)) - 1))
+        return round(latencies_ms[index], 3)
+
+    return {
+        "requests": len(latencies_ms),
+        "errors": errors,
+        "throughput_rps": round(len(latencies_ms) / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies_ms), 3) if latencies_ms else None,
+            "p50": percentile(50),
+            "p95": percentile(95),
+            "p99": percentile(99),
+            "max": round(latencies_ms[-1], 3) if latencies_ms else None,
+        },
+        "queries": {
+            "median": statistics.median(queries) if queries else None,
+            "max": max(queries) if queries else None,
+        },
+    }
+
+
+def _request_body(scenario, iteration, refresh_tokens):
+    if refresh_tokens:
+        return {"refresh": refresh_tokens[iteration]}
+    return scenario.data
+
+
+def _prepare(scenario, total):
+    """Заголовки и одноразовые токены выпускаются до замера, чтобы не учитывать их в задержке."""
+    headers = {}
+    if scenario.user is not None:
+        headers["Authorization"] = f"Bearer {AccessToken.for_user(scenario.user)}"
+    refresh_tokens = []
+    if scenario.refresh_user is not None:
+        refresh_tokens = [str(RefreshToken.for_user(scenario.refresh_user)) for _ in range(total)]
+    return headers, refresh_tokens
+
+
+def run_in_process(scenarios, iterations, warmup):
+    """Прогон сценариев последовательно через django.test.Client в текущем процессе."""
+    client = Client()
+    results = {}
+    for scenario in scenarios:
+        count = min(iterations, scenario.max_iterations or iterations)
+        headers, refresh_tokens = _prepare(scenario, warmup + count)
+        latencies, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for iteration in range(warmup + count):
+            body = _request_body(scenario, iteration, refresh_tokens)
+            collector = QueryCollector()
+            with connections["default"].execute_wrapper(collector):
+                start = time.perf_counter()
+                response = client.generic(
+                    scenario.method, scenario.path, json.dumps(body) if body is not None else "",
+                    content_type="application/json", headers=headers,
+                )
+                duration = time.perf_counter() - start
+            if iteration < warmup:
+                started = time.perf_counter()
+                continue
+            if response.status_code >= 400:
+                errors += 1
+            latencies.append(duration)
+            queries.append(collector.count)
+        results[scenario.name] = summarize(latencies, queries, errors, time.perf_counter() - started)
+    return results
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def run_against_server(scenarios, iterations, warmup, concurrency):
+    """
+    Прогон сценариев через локальный многопоточный WSGI-сервер: concurrency клиентов параллельно отправляют
+    запросы по HTTP. Количество SQL-запросов берется из заголовка Server-Timing (PerformanceMiddleware).
+    """
+    server = make_server("127.0.0.1", 0, WSGIHandler(), server_class=_ThreadingWSGIServer, handler_class=_QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    results = {}
+    try:
+        for scenario in scenarios:
+            count = min(iterations, scenario.max_iterations or iterations)
+            headers, refresh_tokens = _prepare(scenario, warmup + count)
+            headers["Content-Type"] = "application/json"
+            latencies, queries, errors = [], [], []
+            counter = iter(range(warmup + count))
+            lock = threading.Lock()
+
+            def worker():
+                conn = http.client.HTTPConnection(host, port)
+                while True:
+                    with lock:
+                        iteration = next(counter, None)
+                    if iteration is None:
+                        break
+                    body = _request_body(scenario, iteration, refresh_tokens)
+                    start = time.perf_counter()
+                    try:
+                        conn.request(
+                            scenario.method, scenario.path, body=json.dumps(body) if body is not None else None,
+                            headers=headers,
+                        )
+                        response = conn.getresponse()
+                        response.read()
+                    except (OSError, http.client.HTTPException):
+                        conn.close()
+                        conn = http.client.HTTPConnection(host, port)
+                        errors.append(iteration)
+                        continue
+                    duration = time.perf_counter() - start
+                    if iteration < warmup:
+                        continue
+                    if response.status >= 400:
+                        errors.append(iteration)
+                    latencies.append(duration)
+                    match = SERVER_TIMING_QUERIES_RE.search(response.getheader("Server-Timing") or "")
+                    if match:
+                        queries.append(int(match.group(1)))
+                conn.close()
+
+            workers = [threading.Thread(target=worker) for _ in range(concurrency)]
+            started = time.perf_counter()
+            for worker_thread in workers:
+                worker_thread.start()
+            for worker_thread in workers:
+                worker_thread.join()
+            results[scenario.name] = summarize(latencies, queries, len(errors), time.perf_counter() - started)
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+async def _asgi_request(handler, scenario, headers, body):
+    path, _, query_string = scenario.path.partition("?")
+    content = json.dumps(body).encode() if body is not None else b""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": scenario.method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string.encode(),
+        "root_path": "",
+        "headers": [
+            (b"host", b"localhost"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(content)).encode()),
+            *[(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    messages = [{"type": "http.request", "body": content, "more_body": False}]
+    response = {"status": None, "headers": {}}
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # Клиент не отключается: Django ждет http.disconnect до конца ответа
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {name.decode().lower(): value.decode() for name, value in message["headers"]}
+
+    await handler(scope, receive, send)
+    return response
+
+
+def run_asgi(scenarios, iterations, warmup, concurrency):
+    """
+    Прогон сценариев через ASGI-приложение Django в одном event loop: concurrency запросов выполняются одновременно,
+    как под uvicorn. Количество SQL-запросов берется из заголовка Server-Timing (PerformanceMiddleware).
+    """
+    handler = ASGIHandler()
+    results = {}
+    for scenario in scenarios:
+        count = min(iterations, scenario.max_iterations or iterations)
+        headers, refresh_tokens = _prepare(scenario, warmup + count)
+        latencies, queries, errors = [], [], []
+
+        async def worker(counter):
+            for iteration in counter:
+                body = _request_body(scenario, iteration, refresh_tokens)
+                start = time.perf_counter()
+                response = await _asgi_request(handler, scenario, headers, body)
+                duration = time.perf_counter() - start
+                if iteration < warmup:
+                    continue
+                if response["status"] >= 400:
+                    errors.append(iteration)
+                latencies.append(duration)
+                match = SERVER_TIMING_QUERIES_RE.search(response["headers"].get("server-timing", ""))
+                if match:
+                    queries.append(int(match.group(1)))
+
+        async def run():
+            await worker(iter(range(warmup)))
+            counter = iter(range(warmup, warmup + count))
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(counter) for _ in range(concurrency)))
+            return time.perf_counter() - started
+
+        elapsed = asyncio.run(run())
+        results[scenario.name] = summarize(latencies, queries, len(errors), elapsed)
+    return results
+
+
+def compare_serializers(products=1000, repeat=5):
+    """
+    Сериализация списка из products товаров каталога в JSON через ProductSerializer (DRF) и через его
+    скомпилированный вариант. Время — лучшее из repeat прогонов; ответы обязаны совпадать побайтно.
+    """
+    from apps.shop.models import Product
+    from apps.shop.serializers import ProductSerializer
+
+    items = list(Product.objects.select_related("category", "seller", "seller__user").order_by("id")[:products])
+    compiled = compile_serializer(ProductSerializer)
+    variants = {
+        "drf": lambda: JSONRenderer().render(ProductSerializer(items, many=True).data),
+        "compiled": lambda: compiled.render(items, many=True),
+    }
+    if variants["drf"]() != variants["compiled"]():
+        raise AssertionError("Скомпилированный сериализатор вернул другой JSON")
+
+    timings = {}
+    for name, render in variants.items():
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            render()
+            durations.append(time.perf_counter() - start)
+        timings[name] = min(durations) * 1000
+    return {
+        "products": len(items),
+        "drf_ms": round(timings["drf"], 3),
+        "compiled_ms": round(timings["compiled"], 3),
+        "speedup": round(timings["drf"] / timings["compiled"], 2) if timings["compiled"] else None,
+    }
+
+
+def _measure(func, repeat):
+    """Лучшее время func из repeat прогонов (мс) и пиковая память отдельного прогона под tracemalloc (КиБ)."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"ms": round(min(durations) * 1000, 3), "peak_kib": round(peak / 1024, 1)}
+
+
+def compare_renderers(products=1000, repeat=5):
+    """
+    Ответ со списком из products товаров каталога от запроса до байтов: JSONRenderer DRF, ORJSONRenderer и потоковый
+    массив stream_json_array() из итератора запроса. Ответы обязаны совпадать как JSON.
+    """
+    from apps.shop.models import Product
+    from apps.shop.serializers import ProductSerializer
+
+    queryset = get_projection(Product, ProductSerializer).values(Product.objects.order_by("id")[:products])
+    compiled = compile_serializer(ProductSerializer)
+
+    def render_with(renderer):
+        return lambda: renderer.render(compiled.many(queryset.all()))
+
+    def stream():
+        rows = queryset.all().iterator(chunk_size=STREAM_CHUNK_SIZE)
+        # Чанки уходят клиенту и не накапливаются: запоминается только их размер
+        return [len(chunk) for chunk in stream_json_array(rows, compiled.to_representation)]
+
+    expected = json.loads(render_with(JSONRenderer())())
+    streamed = b"".join(stream_json_array(queryset.all().iterator(), compiled.to_representation))
+    if json.loads(render_with(ORJSONRenderer())()) != expected or json.loads(streamed) != expected:
+        raise AssertionError("Рендереры вернули разный JSON")
+    data = compiled.many(queryset.all())
+    encode = {
+        name: _measure(lambda renderer=renderer: renderer.render(data), repeat)["ms"]
+        for name, renderer in (("drf", JSONRenderer()), ("orjson", ORJSONRenderer()))
+    }
+    return {
+        "products": len(expected),
+        # Только кодирование готового списка
+        "encode_ms": {**encode, "speedup": round(encode["drf"] / encode["orjson"], 2) if encode["orjson"] else None},
+        # Весь путь: запрос, сериализация и кодирование
+        "response": {
+            "drf": _measure(render_with(JSONRenderer()), repeat),
+            "orjson": _measure(render_with(ORJSONRenderer()), repeat),
+            "orjson_stream": _measure(stream, repeat),
+        },
+    }
+
+
+def compare(baseline, current):
+    """Относительное изменение ключевых метрик между двумя прогонами (в процентах)."""
+    def delta(old, new):
+        if old in (None, 0) or new is None:
+            return None
+        return round((new - old) / old * 100, 1)
+
+    report = {}
+    for name, result in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            continue
+        report[name] = {
+            "p50_ms_change_pct": delta(old["latency_ms"]["p50"], result["latency_ms"]["p50"]),
+            "p95_ms_change_pct": delta(old["latency_ms"]["p95"], result["latency_ms"]["p95"]),
+            "throughput_change_pct": delta(old["throughput_rps"], result["throughput_rps"]),
+            "queries_max_change": (
+                None if old["queries"]["max"] is None or result["queries"]["max"] is None
+                else result["queries"]["max"] - old["queries"]["max"]
+            ),
+        }
+    return report
@@ -0,0 +1,191 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from django.utils.module_loading import import_string
+
+
+class LocMemLRUBackend:
+    """
+    Потокобезопасный LRU-кэш в памяти процесса. Только для тестов и разработки: у каждого процесса своя версия, поэтому
+    инвалидация в одном воркере не видна остальным.
+    """
+
+    # Операции не выполняют ввода-вывода, поэтому их можно вызывать прямо из event loop
+    blocking = False
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def add(self, key, value):
+        with self._lock:
+            if key in self._data:
+                return False
+        self.set(key, value)
+        return True
+
+    def incr(self, key):
+        with self._lock:
+            value = self._data.get(key, 0) + 1
+            self._data[key] = value
+            self._data.move_to_end(key)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DjangoCacheBackend:
+    """
+    Адаптер к любому кэшу из settings.CACHES (Redis, Memcached и т.д.). Используется по умолчанию: версия и данные
+    общие для всех процессов, если общий сам кэш alias.
+    """
+
+    blocking = True
+
+    def __init__(self, alias="default", timeout=None):
+        self.cache = caches[alias]
+        self.timeout = timeout
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, timeout=self.timeout)
+
+    def add(self, key, value):
+        return self.cache.add(key, value, timeout=self.timeout)
+
+    def incr(self, key):
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            value = time.time_ns()
+            self.cache.set(key, value, timeout=self.timeout)
+            return value
+
+    def clear(self):
+        self.cache.clear()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_cache_backend():
+    """Возвращает бэкенд кэша ответов из settings.RESPONSE_CACHE (по умолчанию DjangoCacheBackend)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = getattr(settings, "RESPONSE_CACHE", {})
+                backend_class = import_string(config.get("BACKEND", "apps.common.cache.DjangoCacheBackend"))
+                _backend = backend_class(**config.get("OPTIONS", {}))
+    return _backend
+
+
+class CachedPayload:
+    """Готовое JSON-тело ответа вместе с его ETag."""
+
+    def __init__(self, content):
+        self.content = content
+        self.etag = f'"{hashlib.md5(content).hexdigest()}"'
+
+
+class VersionedCache:
+    """
+    Read-through кэш с версионированием. Данные хранятся под ключом `<namespace>:<version>`, поэтому инвалидация —
+    это просто увеличение версии: старые записи перестают читаться и со временем вытесняются.
+    """
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.version_key = f"{namespace}:version"
+
+    @property
+    def backend(self):
+        return get_cache_backend()
+
+    def get_version(self):
+        version = self.backend.get(self.version_key)
+        if version is None:
+            # Начальная версия зависит от времени, чтобы после вытеснения ключа версии не ожили старые данные
+            self.backend.add(self.version_key, time.time_ns())
+            version = self.backend.get(self.version_key)
+        return version
+
+    def invalidate(self):
+        self.backend.incr(self.version_key)
+
+    def get_or_set(self, render):
+        """
+        Возвращает CachedPayload из кэша, а при промахе вызывает render() (должен вернуть bytes) и сохраняет результат.
+        """
+        key = f"{self.namespace}:{self.get_version()}"
+        payload = self.backend.get(key)
+        if payload is None:
+            payload = CachedPayload(render())
+            self.backend.set(key, payload)
+        return payload
+
+    async def _call(self, func, *args):
+        if getattr(self.backend, "blocking", True):
+            return await sync_to_async(func)(*args)
+        return func(*args)
+
+    def _lookup(self):
+        key = f"{self.namespace}:{self.get_version()}"
+        return key, self.backend.get(key)
+
+    async def aget_or_set(self, render):
+        """Асинхронный вариант get_or_set(): render — корутина, возвращающая bytes."""
+        key, payload = await self._call(self._lookup)
+        if payload is None:
+            payload = CachedPayload(await render())
+            await self._call(self.backend.set, key, payload)
+        return payload
+
+
+def etag_matches(request, etag):
+    """Проверяет, совпадает ли ETag с заголовком If-None-Match запроса."""
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return "*" in etags or etag in etags
+
+
+def cached_json_response(request, payload):
+    """
+    Отдает закэшированное JSON-тело как есть, без повторной сериализации. Если клиент прислал совпадающий
+    If-None-Match, возвращает 304 без тела.
+    """
+    if etag_matches(request, payload.etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(payload.content, content_type="application/json")
+    response["ETag"] = payload.etag
+    return response
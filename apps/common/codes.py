@@ -0,0 +1,185 @@
+import atexit
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+
+# Алфавит Crockford Base32: без I, L, O, U, чтобы коды было трудно перепутать при диктовке
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+CODE_LENGTH = 13  # 64 бита в Base32
+
+EPOCH_MS = 1735689600000  # 2025-01-01T00:00:00Z
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+# Аренда номера воркера в общем кэше: срок жизни ключа и как часто процесс его продлевает (в секундах)
+WORKER_LEASE_TTL = 10 * 60
+WORKER_LEASE_RENEW = WORKER_LEASE_TTL // 3
+
+
+def encode(number):
+    """Кодирует целое число в строку Base32 фиксированной длины (лексикографический порядок = числовой)."""
+    chars = []
+    for _ in range(CODE_LENGTH):
+        number, index = divmod(number, 32)
+        chars.append(ALPHABET[index])
+    return "".join(reversed(chars))
+
+
+def configured_worker_id():
+    """Номер воркера из settings.CODE_WORKER_ID (переменная окружения CODE_WORKER_ID) или None, если он не задан."""
+    worker_id = getattr(settings, "CODE_WORKER_ID", None)
+    if worker_id is None:
+        return None
+    if not 0 <= worker_id <= MAX_WORKER_ID:
+        raise ImproperlyConfigured(f"CODE_WORKER_ID должен быть в диапазоне 0..{MAX_WORKER_ID}")
+    return worker_id
+
+
+def _lease_key(worker_id):
+    return f"codes:worker:{worker_id}"
+
+
+def acquire_worker_lease(owner):
+    """
+    Занимает свободный номер воркера в общем кэше (cache.add атомарен) и возвращает его. Перебор начинается со
+    случайного номера, чтобы одновременно стартующие процессы не толкались на одних и тех же ключах.
+
+    Кэш в памяти процесса у каждого воркера свой, и на нем все процессы арендовали бы одни и те же номера, поэтому
+    такая аренда отклоняется: нужен общий кэш (REDIS_URL) или явный CODE_WORKER_ID.
+    """
+    if isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache)):
+        raise ImproperlyConfigured(
+            "Номер воркера генератора кодов нельзя арендовать в кэше процесса: задайте REDIS_URL или CODE_WORKER_ID"
+        )
+    start = random.randrange(MAX_WORKER_ID + 1)
+    for offset in range(MAX_WORKER_ID + 1):
+        worker_id = (start + offset) & MAX_WORKER_ID
+        if cache.add(_lease_key(worker_id), owner, timeout=WORKER_LEASE_TTL):
+            return worker_id
+    raise RuntimeError("Все номера воркеров генератора кодов заняты")
+
+
+class CodeGenerator:
+    """
+    Генератор уникальных кодов в стиле Snowflake: 41 бит времени в миллисекундах, 10 бит номера воркера и 12 бит
+    счетчика внутри миллисекунды. Коды монотонно возрастают в пределах процесса и не требуют обращений к БД.
+
+    Номер воркера задается явно (settings.CODE_WORKER_ID), а если не задан — арендуется в общем кэше: процесс держит
+    ключ своего номера и продлевает его раз в WORKER_LEASE_RENEW секунд. Если аренду за это время перехватили
+    (процесс спал дольше WORKER_LEASE_TTL), номер арендуется заново.
+    """
+
+    def __init__(self, worker_id=None):
+        self._lock = threading.Lock()
+        self._worker_id = worker_id
+        self._owner = None
+        self._renew_at = None
+        self._last_ms = -1
+        self._sequence = 0
+
+    @property
+    def worker_id(self):
+        if self._worker_id is None:
+            self._worker_id = configured_worker_id()
+        if self._worker_id is None or self._owner is not None:
+            self._renew_lease()
+        return self._worker_id
+
+    def _renew_lease(self):
+        if self._owner is None:
+            self._owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        elif time.monotonic() < self._renew_at:
+            return
+        elif cache.get(_lease_key(self._worker_id)) == self._owner:
+            cache.touch(_lease_key(self._worker_id), WORKER_LEASE_TTL)
+            self._renew_at = time.monotonic() + WORKER_LEASE_RENEW
+            return
+        self._worker_id = acquire_worker_lease(self._owner)
+        self._renew_at = time.monotonic() + WORKER_LEASE_RENEW
+
+    def release(self):
+        """Освобождает арендованный номер воркера (при завершении процесса)."""
+        with self._lock:
+            if self._owner is not None and cache.get(_lease_key(self._worker_id)) == self._owner:
+                cache.delete(_lease_key(self._worker_id))
+            self._worker_id = self._owner = None
+
+    def reset(self):
+        """
+        Сбрасывает состояние (вызывается в дочернем процессе после fork, чтобы получить свой номер воркера). Аренда
+        родителя остается за родителем.
+        """
+        self._lock = threading.Lock()
+        self._worker_id = None
+        self._owner = None
+        self._renew_at = None
+        self._last_ms = -1
+        self._sequence = 0
+
+    def _next_id(self):
+        now = int(time.time() * 1000) - EPOCH_MS
+        # Если часы ушли назад, продолжаем от последней метки, чтобы сохранить монотонность
+        if now <= self._last_ms:
+            now = self._last_ms
+            self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+            if self._sequence == 0:
+                # Счетчик переполнен — занимаем следующую миллисекунду
+                now += 1
+        else:
+            self._sequence = 0
+        self._last_ms = now
+        return (now << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+    def generate(self):
+        with self._lock:
+            return encode(self._next_id())
+
+    def allocate(self, count):
+        """Выдает count кодов за один захват блокировки (например, для массового импорта заказов)."""
+        with self._lock:
+            return [encode(self._next_id()) for _ in range(count)]
+
+
+code_generator = CodeGenerator()
+os.register_at_fork(after_in_child=code_generator.reset)
+atexit.register(code_generator.release)
+
+
+def generate_code():
+    """Возвращает новый уникальный код без обращения к БД."""
+    return code_generator.generate()
+
+
+def generate_codes(count):
+    """Возвращает список из count новых уникальных кодов."""
+    return code_generator.allocate(count)
+
+
+def save_with_unique_code(instance, field, save, attempts=3):
+    """
+    Вызывает save() в точке сохранения транзакции. Если вставка упала на уникальности поля field (код выделен заранее
+    и уже занят, или у двух процессов все же оказался один номер воркера), генерирует новый код и повторяет попытку
+    вместо предварительной проверки exists() перед каждой вставкой.
+    """
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            value = getattr(instance, field)
+            conflict = type(instance)._base_manager.filter(**{field: value}).exists()
+            if not conflict or attempt == attempts - 1:
+                raise
+            setattr(instance, field, generate_code())
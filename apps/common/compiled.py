@@ -0,0 +1,222 @@
+"""
+Компиляция сериализаторов только для чтения.
+
+compile_serializer() превращает класс Serializer в функцию, сгенерированную один раз на класс: она читает атрибуты
+объекта напрямую (в том числе по source с точками, например "user.avatar"), сразу приводит значения простых полей
+(CharField, IntegerField, FloatField, UUIDField, DecimalField, FileField/ImageField, RenditionField) и вызывает
+скомпилированные функции вложенных сериализаторов. Остальные поля отдаются их собственному to_representation().
+
+Результат совпадает с serializer.data побайтно после JSONRenderer: порядок ключей, None для пустых значений,
+форматирование Decimal и URL файлов — те же. Если атрибут не найден или является методом, поле обрабатывается общим
+путем DRF (default, allow_null, SkipField и текст ошибки не меняются). Контекст сериализатора не передается, поэтому
+компилировать можно только ответы, не зависящие от request (URL файлов — относительные, как без контекста).
+"""
+import decimal
+import functools
+import keyword
+import threading
+import types
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from apps.common.images import rendition_url, storage_url
+from apps.common.serializers import RenditionField
+
+# Значения, которые DRF может вызвать при чтении атрибута (is_simple_callable): их разбирает общий путь
+CALLABLE_TYPES = frozenset({
+    types.FunctionType, types.MethodType, types.BuiltinFunctionType, types.BuiltinMethodType, functools.partial,
+})
+
+_compiled = {}
+_lock = threading.Lock()
+
+
+class _Fallback(Exception):
+    """Поле нужно разобрать общим путем DRF."""
+
+
+def file_url(value):
+    """value.url непустого файла (см. storage_url())."""
+    return storage_url(value.storage, value.name)
+
+
+def _file_url(value):
+    if not value:
+        return None
+    try:
+        return file_url(value)
+    except AttributeError:
+        return None
+
+
+def _file_name(value):
+    if not value:
+        return None
+    return value.name
+
+
+def _decimal_converter(field):
+    """DecimalField.to_representation() для строкового вывода без локализации и normalize_output."""
+    exponent = decimal.Decimal(".1") ** field.decimal_places
+    max_digits, rounding = field.max_digits, field.rounding
+
+    def convert(value):
+        if value.__class__ is not decimal.Decimal:
+            value = decimal.Decimal(str(value).strip())
+        context = decimal.getcontext().copy()
+        if max_digits is not None:
+            context.prec = max_digits
+        return "{:f}".format(value.quantize(exponent, rounding=rounding, context=context))
+
+    return convert
+
+
+def _rendition_converter(field):
+    """RenditionField.to_representation() без request в контексте."""
+    rendition = field.rendition
+
+    def convert(value):
+        if not value:
+            return None
+        return rendition_url(value.name, rendition, value.storage) or file_url(value)
+
+    return convert
+
+
+def _generic(field):
+    """Поле целиком общим путем DRF: то же, что делает Serializer.to_representation() для одного поля."""
+
+    def represent(instance, ret):
+        try:
+            attribute = field.get_attribute(instance)
+        except SkipField:
+            return
+        check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        ret[field.field_name] = None if check_for_none is None else field.to_representation(attribute)
+
+    return represent
+
+
+def _list_converter(child):
+    def convert(value):
+        iterable = value.all() if isinstance(value, models.manager.BaseManager) else value
+        return [child(item) for item in iterable]
+
+    return convert
+
+
+def _is_compilable(serializer):
+    return type(serializer).to_representation is serializers.Serializer.to_representation
+
+
+def _converter(field):
+    """Выражение приведения значения поля или None, если поле приводится своим to_representation()."""
+    method = type(field).to_representation
+    if isinstance(field, serializers.ListSerializer):
+        if method is serializers.ListSerializer.to_representation and _is_compilable(field.child):
+            return _list_converter(_build(field.child))
+        return None
+    if isinstance(field, serializers.Serializer):
+        return _build(field) if _is_compilable(field) else None
+    if method is serializers.CharField.to_representation:
+        return str
+    if method is serializers.IntegerField.to_representation:
+        return int
+    if method is serializers.FloatField.to_representation:
+        return float
+    if method is serializers.UUIDField.to_representation and field.uuid_format == "hex_verbose":
+        return str
+    if method is serializers.FileField.to_representation:
+        return _file_url if getattr(field, "use_url", api_settings.UPLOADED_FILES_USE_URL) else _file_name
+    if (
+        method is serializers.DecimalField.to_representation
+        and getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING)
+        and not field.localize and not field.normalize_output and field.decimal_places is not None
+    ):
+        return _decimal_converter(field)
+    if method is RenditionField.to_representation:
+        return _rendition_converter(field)
+    return None
+
+
+def _access(attr):
+    if attr.isidentifier() and not keyword.iskeyword(attr):
+        return f"value[{attr!r}] if value.__class__ is dict else value.{attr}"
+    return f"value[{attr!r}] if value.__class__ is dict else getattr(value, {attr!r})"
+
+
+def _build(serializer):
+    """Генерирует функцию instance -> dict для связанного (bound) экземпляра сериализатора."""
+    namespace = {
+        "ObjectDoesNotExist": ObjectDoesNotExist, "Fallback": _Fallback, "CALLABLE_TYPES": CALLABLE_TYPES,
+    }
+    lines = ["def to_representation(instance):", "    ret = {}"]
+    for i, field in enumerate(serializer._readable_fields):
+        generic = f"generic_{i}"
+        namespace[generic] = _generic(field)
+        if type(field).get_attribute is not serializers.Field.get_attribute:
+            lines.append(f"    {generic}(instance, ret)")
+            continue
+
+        convert = _converter(field)
+        if convert is None:
+            convert = field.to_representation
+        namespace[f"convert_{i}"] = convert
+        name = repr(field.field_name)
+        lines += ["    try:", "        value = instance"]
+        for attr in field.source_attrs:
+            lines += [
+                f"        value = {_access(attr)}",
+                "        if value.__class__ in CALLABLE_TYPES:",
+                "            raise Fallback",
+            ]
+        lines += [
+            "    except ObjectDoesNotExist:",
+            f"        ret[{name}] = None",
+            "    except (AttributeError, KeyError, Fallback):",
+            f"        {generic}(instance, ret)",
+            "    else:",
+            f"        ret[{name}] = None if value is None else convert_{i}(value)",
+        ]
+    lines.append("    return ret")
+    exec(compile("\n".join(lines), f"<compiled {type(serializer).__name__}>", "exec"), namespace)
+    return namespace["to_representation"]
+
+
+class CompiledSerializer:
+    """Скомпилированное представление класса сериализатора. Создается через compile_serializer()."""
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        if not _is_compilable(serializer):
+            raise TypeError(f"{serializer_class.__name__} переопределяет to_representation() и не компилируется")
+        self.serializer_class = serializer_class
+        self.to_representation = _build(serializer)
+
+    def many(self, instances):
+        """Список словарей, как serializer_class(instances, many=True).data."""
+        to_representation = self.to_representation
+        iterable = instances.all() if isinstance(instances, models.manager.BaseManager) else instances
+        return [to_representation(instance) for instance in iterable]
+
+    def render(self, instance, many=False):
+        """JSON-байты, как JSONRenderer().render(serializer_class(instance, many=many).data)."""
+        data = self.many(instance) if many else self.to_representation(instance)
+        return JSONRenderer().render(data)
+
+
+def compile_serializer(serializer_class):
+    """Скомпилированный сериализатор для класса serializer_class (генерируется при первом вызове)."""
+    compiled = _compiled.get(serializer_class)
+    if compiled is None:
+        with _lock:
+            compiled = _compiled.get(serializer_class)
+            if compiled is None:
+                compiled = _compiled[serializer_class] = CompiledSerializer(serializer_class)
+    return compiled
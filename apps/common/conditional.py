@@ -0,0 +1,86 @@
+"""
+Условные GET-запросы (ETag / Last-Modified) для представлений, которые сериализуют модели из БД.
+
+Валидатор ответа считается до сериализации: для списка — одним агрегирующим запросом Max("updated_at") + Count
+(счетчик нужен, чтобы заметить удаление строк), для объекта — по его updated_at. Если клиент прислал совпадающий
+If-None-Match (или If-Modified-Since не раньше Last-Modified), представление отвечает 304 без тела, и список не
+загружается и не сериализуется.
+"""
+import hashlib
+from dataclasses import dataclass, replace
+from datetime import datetime
+
+from django.db.models import Count, Max
+from django.http import HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe
+
+from apps.common.cache import etag_matches
+
+
+@dataclass(frozen=True)
+class Validator:
+    etag: str
+    last_modified: datetime | None
+    # Число строк списка (только для list_validator())
+    count: int | None = None
+
+
+class ConditionalGetMixin:
+    """
+    Примесь к APIView. Обработчик GET вычисляет валидатор (list_validator() или object_validator()) и, если
+    not_modified_response() вернул 304, отдает его; иначе сериализует данные и добавляет заголовки валидатора через
+    set_validator_headers(). В ETag входят класс представления, путь с параметрами и пользователь, поэтому разные
+    представления одних данных не получают одинаковый ETag.
+    """
+
+    # Поля связанных моделей, которые попадают в ответ: их изменение тоже должно менять валидатор списка
+    conditional_related_fields = ()
+
+    def make_validator(self, last_modified, *parts):
+        key = "|".join(str(part) for part in (
+            type(self).__name__, self.request.get_full_path(), self.request.user.pk, last_modified, *parts,
+        ))
+        # Слабый ETag: валидатор описывает данные, а не байты ответа
+        return Validator(f'W/"{hashlib.md5(key.encode()).hexdigest()}"', last_modified)
+
+    def _list_aggregates(self):
+        aggregates = {"count": Count("pk"), "last_modified": Max("updated_at")}
+        for i, field in enumerate(self.conditional_related_fields):
+            aggregates[f"related_{i}"] = Max(field)
+        return aggregates
+
+    def _validator_from_aggregates(self, values):
+        related = [values[f"related_{i}"] for i in range(len(self.conditional_related_fields))]
+        last_modified = max((value for value in (values["last_modified"], *related) if value), default=None)
+        return replace(self.make_validator(last_modified, values["count"], *related), count=values["count"])
+
+    def list_validator(self, queryset):
+        """Валидатор списка одним запросом: число строк и максимальный updated_at (в т. ч. связанных моделей)."""
+        return self._validator_from_aggregates(queryset.order_by().aggregate(**self._list_aggregates()))
+
+    async def alist_validator(self, queryset):
+        return self._validator_from_aggregates(await queryset.order_by().aaggregate(**self._list_aggregates()))
+
+    def object_validator(self, obj):
+        return self.make_validator(obj.updated_at, obj.pk)
+
+    def is_not_modified(self, validator):
+        request = self.request
+        if "If-None-Match" in request.headers:
+            return etag_matches(request, validator.etag)
+        if_modified_since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+        if if_modified_since is None or validator.last_modified is None:
+            return False
+        return int(validator.last_modified.timestamp()) <= if_modified_since
+
+    def set_validator_headers(self, response, validator):
+        response["ETag"] = validator.etag
+        if validator.last_modified is not None:
+            response["Last-Modified"] = http_date(validator.last_modified.timestamp())
+        return response
+
+    def not_modified_response(self, validator):
+        """Ответ 304, если данные клиента актуальны, иначе None — представление строит обычный ответ."""
+        if self.is_not_modified(validator):
+            return self.set_validator_headers(HttpResponseNotModified(), validator)
+        return None
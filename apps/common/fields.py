@@ -0,0 +1,35 @@
+from autoslug import AutoSlugField
+
+from apps.common.managers import live_and_archived
+
+
+class SlugRivals:
+    """
+    Источник строк для проверки уникальности slug'а: все строки модели, включая мягко удаленные и перенесенные в
+    архив (apps.common.archive). Менеджер objects скрывает удаленные строки, и их slug'и выдавались бы повторно.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    def filter(self, *args, **kwargs):
+        return live_and_archived(self.model, self.model._base_manager.all()).filter(*args, **kwargs)
+
+
+class BulkAutoSlugField(AutoSlugField):
+    """
+    AutoSlugField, который не проверяет уникальность, если slug уже зарезервирован вызывающим кодом
+    (instance._slug_reserved = True). Стандартное поле делает по одному запросу на объект даже внутри bulk_create,
+    а массовый импорт резервирует slug'и для всей пачки одним запросом. Если manager не задан, уникальность
+    проверяется по всем строкам модели вместе с архивом (SlugRivals).
+    """
+
+    def contribute_to_class(self, cls, name, *args, **kwargs):
+        super().contribute_to_class(cls, name, *args, **kwargs)
+        if self.manager is None and self.manager_name is None:
+            self.manager = SlugRivals(cls)
+
+    def pre_save(self, instance, add):
+        if getattr(instance, "_slug_reserved", False):
+            return getattr(instance, self.attname)
+        return super().pre_save(instance, add)
@@ -0,0 +1,185 @@
+"""
+Повтор запросов с заголовком Idempotency-Key.
+
+Клиент передает в POST-запросе уникальный ключ; при повторе того же запроса с тем же ключом (например, после обрыва
+сети) представление не выполняется еще раз, а отдается сохраненный ответ. Ключ принадлежит пользователю из
+access-токена (токен проверяется без обращения к БД) и хранится в таблице IdempotencyKey вместе с отпечатком запроса
+и ответом до истечения TTL. Строка ключа вставляется до выполнения представления и служит блокировкой: параллельный
+дубликат получает 409 и повторяет запрос позже, а повтор с тем же ключом, но другим телом — 422.
+
+Сохраняются только окончательные ответы представления. Ответы, после которых клиент должен повторить запрос (5xx,
+401/403 при проблемах с аутентификацией, 409 конфликта и нехватки товара, 429 ограничения частоты), ключ освобождают.
+Вместе с телом сохраняются заголовки из HEADERS (Location, Retry-After, ETag и т. п.), повтор отдает их без изменений.
+Представления из EXCLUDED_URL_NAMES (выдача и обновление JWT) ключ не обрабатывает: их ответы нельзя хранить в БД.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.http.multipartparser import MultiPartParserError
+from django.urls import Resolver404, resolve
+from django.utils import timezone
+from rest_framework.throttling import BaseThrottle
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from apps.common.models import IdempotencyKey
+
+HEADER = "HTTP_IDEMPOTENCY_KEY"
+MAX_KEY_LENGTH = 255
+
+DEFAULTS = {
+    "TTL": 24 * 60 * 60,  # сколько секунд хранится ответ
+    "LOCK_TIMEOUT": 60,  # через сколько секунд незавершенный запрос (например, упавший процесс) перестает держать ключ
+    "METHODS": ("POST",),
+    # Ответы, которые не сохраняются: после них клиент повторяет запрос, и повтор должен выполниться заново
+    "NOT_STORED_STATUSES": (401, 403, 408, 409, 425, 429),
+    # Заголовки ответа, которые сохраняются вместе с телом и отдаются при повторе
+    "HEADERS": (
+        "Content-Type", "Location", "Retry-After", "ETag", "Last-Modified", "Cache-Control", "Vary", "Allow",
+        "Content-Language", "Content-Disposition",
+    ),
+    # Имена маршрутов, к которым ключ не применяется: их ответы содержат токены
+    "EXCLUDED_URL_NAMES": ("token_obtain_pair", "token_refresh", "token_verify"),
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "IDEMPOTENCY", {})}
+
+
+class KeyInProgress(Exception):
+    """Запрос с этим ключом еще выполняется."""
+
+
+class KeyMismatch(Exception):
+    """Ключ уже использован для другого запроса."""
+
+
+def is_excluded(request):
+    """Запрос к маршруту из EXCLUDED_URL_NAMES (или к несуществующему маршруту) обрабатывается без ключа."""
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return True
+    return match.url_name in get_config()["EXCLUDED_URL_NAMES"]
+
+
+def get_scope(request):
+    """
+    Владелец ключа: id пользователя из access-токена или адрес клиента для запросов без токена (адрес определяется так
+    же, как в ограничении частоты DRF, с учетом NUM_PROXIES). None — токен невалиден; такой запрос выполняется как
+    обычно и получает 401 от представления.
+    """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        return f"anonymous:{BaseThrottle().get_ident(request)}"
+    raw_token = authentication.get_raw_token(header)
+    if raw_token is None:
+        return None
+    try:
+        token = authentication.get_validated_token(raw_token)
+    except InvalidToken:
+        return None
+    return f"user:{token.get(api_settings.USER_ID_CLAIM)}"
+
+
+def get_fingerprint(request):
+    """
+    Отпечаток запроса: метод, путь с query string и тело. Сырое тело multipart не учитывается: клиенты генерируют новую
+    границу частей при каждом повторе. Вместо него в отпечаток входят разобранные поля формы и имя и размер каждого
+    файла (содержимое файлов не читается). Django разбирает форму только у POST, у других методов поля не учитываются.
+    """
+    content_type = request.content_type or ""
+    digest = hashlib.sha256(f"{request.method} {request.get_full_path()} {content_type}".encode())
+    if content_type != "multipart/form-data":
+        digest.update(request.body)
+        return digest.hexdigest()
+    try:
+        fields, files = request.POST, request.FILES
+    except MultiPartParserError:
+        # Битое тело: представление ответит ошибкой валидации, отпечаток строится без полей
+        return digest.hexdigest()
+    for name in sorted(fields):
+        digest.update(repr((name, fields.getlist(name))).encode())
+    for name in sorted(files):
+        digest.update(repr((name, [(file.name, file.size) for file in files.getlist(name)])).encode())
+    return digest.hexdigest()
+
+
+def begin(scope, key, fingerprint, now=None):
+    """
+    Захватывает ключ. Возвращает (digest, None), если запрос нужно выполнить, или (digest, record) с сохраненным
+    ответом. Выбрасывает KeyInProgress и KeyMismatch.
+    """
+    config = get_config()
+    now = now or timezone.now()
+    digest = hashlib.sha256(f"{scope}\n{key}".encode()).hexdigest()
+    expires_at = now + timedelta(seconds=config["TTL"])
+
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(key=digest, fingerprint=fingerprint, created_at=now, expires_at=expires_at)
+            return digest, None
+        except IntegrityError:
+            pass
+
+        record = IdempotencyKey.objects.filter(key=digest).first()
+        if record is None:
+            # Ключ успели удалить между вставкой и чтением — пробуем вставить еще раз
+            continue
+        stale = record.status_code is None and record.created_at <= now - timedelta(seconds=config["LOCK_TIMEOUT"])
+        if record.expires_at <= now or stale:
+            # Условный UPDATE: из нескольких параллельных запросов ключ перехватит только один
+            taken = IdempotencyKey.objects.filter(key=digest, created_at=record.created_at).update(
+                fingerprint=fingerprint, status_code=None, content_type="", headers={}, body=b"", created_at=now,
+                expires_at=expires_at,
+            )
+            if taken:
+                return digest, None
+            raise KeyInProgress()
+        if record.fingerprint != fingerprint:
+            raise KeyMismatch()
+        if record.status_code is None:
+            raise KeyInProgress()
+        return digest, record
+    raise KeyInProgress()
+
+
+def finish(digest, response):
+    """
+    Сохраняет ответ для повторов. Ответы 5xx, ответы из NOT_STORED_STATUSES и потоковые не сохраняются: ключ
+    освобождается, и повтор выполнит запрос заново.
+    """
+    config = get_config()
+    if response.streaming or response.status_code >= 500 or response.status_code in config["NOT_STORED_STATUSES"]:
+        release(digest)
+        return
+    headers = {name: response[name] for name in config["HEADERS"] if response.has_header(name)}
+    IdempotencyKey.objects.filter(key=digest).update(
+        status_code=response.status_code, content_type=response.get("Content-Type", ""), headers=headers,
+        body=response.content,
+    )
+
+
+def release(digest):
+    IdempotencyKey.objects.filter(key=digest, status_code__isnull=True).delete()
+
+
+def replay(record):
+    response = HttpResponse(bytes(record.body), status=record.status_code, content_type=record.content_type)
+    for name, value in record.headers.items():
+        response[name] = value
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def purge_expired(now=None):
+    """Удаляет ключи с истекшим TTL. Возвращает число удаленных строк."""
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
@@ -0,0 +1,329 @@
+"""
+Производные изображения (миниатюры) для ImageField.
+
+Файлы рендиций хранятся по хэшу содержимого исходника (`renditions/blobs/<sha256>/<rendition>.<ext>`), поэтому
+одинаковые загрузки обрабатываются и хранятся один раз. Для каждого исходного файла создается жесткая ссылка
+`renditions/<путь исходника>.<rendition>.<ext>` на общий файл: путь загруженного файла в Django не переиспользуется,
+поэтому URL миниатюры вычисляется из имени исходника. Хранилища без локальных путей (S3 и т. п.) получают рендицию
+копией по тому же имени, без дедупликации.
+
+Готовность рендиций записывается в кэш при генерации, а процесс запоминает готовые исходники в памяти. Поэтому
+rendition_url() в списках не обращается ни к файловой системе, ни к хранилищу: только если исходник процессу еще не
+известен, читается кэш (и, если ключ потерян, один раз проверяется хранилище). URL строится через storage.url().
+
+Когда рендиции строки модели впервые созданы, у нее обновляется updated_at и отправляется сигнал renditions_ready:
+URL миниатюры в ответе меняется, поэтому должны смениться и ETag/Last-Modified и кэши, собранные из этой строки.
+"""
+import functools
+import hashlib
+import io
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import ImageField
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from apps.common.signals import renditions_ready
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "EXECUTOR": "thread",  # thread, process или sync (синхронно, для тестов и management-команд)
+    "WORKERS": 2,
+    "FORMAT": "WEBP",  # WEBP или JPEG
+    "QUALITY": 80,
+    "SIZES": {"thumb": (320, 320), "medium": (800, 800)},
+}
+EXTENSIONS = {"WEBP": "webp", "JPEG": "jpg"}
+
+# Имя файла, которое FileSystemStorage.url() не меняет: ASCII без %-кодирования, без сегментов "." и ".."
+SAFE_FILE_NAME_RE = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9_.-]*(?:/[A-Za-z0-9_-][A-Za-z0-9_.-]*)*")
+# Сколько секунд процесс не перепроверяет исходник, у которого готовы не все рендиции
+MISSING_RECHECK = 30
+# Сколько исходников процесс помнит в памяти; при переполнении память очищается и заполняется заново из кэша
+MEMO_SIZE = 100_000
+
+_ready = set()  # исходники, у которых готовы все рендиции
+_partial = {}  # исходник -> (момент перепроверки, готовые рендиции)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "IMAGE_RENDITIONS", {})}
+
+
+def rendition_name(source_name, rendition):
+    """Имя рендиции в хранилище для исходного файла source_name."""
+    extension = EXTENSIONS[get_config()["FORMAT"]]
+    return f"renditions/{source_name}.{rendition}.{extension}"
+
+
+def storage_url(storage, name):
+    """
+    storage.url(name). Для FileSystemStorage и безопасного имени результат urljoin(base_url, name) равен
+    base_url + name, поэтому URL собирается без разбора и кодирования.
+    """
+    if storage.__class__ is FileSystemStorage and SAFE_FILE_NAME_RE.fullmatch(name):
+        return storage.base_url + name
+    return storage.url(name)
+
+
+def _availability_key(source_name):
+    return f"renditions:{hashlib.sha1(source_name.encode()).hexdigest()}"
+
+
+def _remember(source_name, renditions):
+    if len(_ready) + len(_partial) >= MEMO_SIZE:
+        forget_availability()
+    if renditions >= set(get_config()["SIZES"]):
+        _ready.add(source_name)
+        _partial.pop(source_name, None)
+    else:
+        _partial[source_name] = (time.monotonic() + MISSING_RECHECK, renditions)
+
+
+def mark_available(source_name, renditions):
+    """Записывает в кэш и в память процесса, что рендиции renditions исходника source_name готовы."""
+    renditions = frozenset(renditions)
+    cache.set(_availability_key(source_name), sorted(renditions), timeout=None)
+    _remember(source_name, renditions)
+
+
+def available_renditions(source_name, storage=None):
+    """Готовые рендиции исходника: из памяти процесса, затем из кэша, а если ключа в кэше нет — из хранилища."""
+    if source_name in _ready:
+        return frozenset(get_config()["SIZES"])
+    partial = _partial.get(source_name)
+    if partial is not None and partial[0] > time.monotonic():
+        return partial[1]
+
+    stored = cache.get(_availability_key(source_name))
+    if stored is not None:
+        renditions = frozenset(stored)
+        _remember(source_name, renditions)
+    else:
+        # Ключ вытеснен из кэша (или рендиции созданы до появления реестра): проверяем хранилище один раз
+        storage = storage or default_storage
+        renditions = frozenset(
+            rendition for rendition in get_config()["SIZES"]
+            if storage.exists(rendition_name(source_name, rendition))
+        )
+        if renditions:
+            mark_available(source_name, renditions)
+        else:
+            _remember(source_name, renditions)
+    return renditions
+
+
+def forget_availability():
+    """Очищает память процесса о готовых рендициях (кэш не трогает)."""
+    _ready.clear()
+    _partial.clear()
+
+
+def rendition_url(source_name, rendition, storage=None):
+    """URL рендиции или None, если она еще не сгенерирована."""
+    if rendition not in available_renditions(source_name, storage):
+        return None
+    return storage_url(storage or default_storage, rendition_name(source_name, rendition))
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _link(blob_path, alias_path):
+    os.makedirs(os.path.dirname(alias_path), exist_ok=True)
+    try:
+        os.link(blob_path, alias_path)
+    except FileExistsError:
+        pass
+    except OSError:
+        # Файловая система не поддерживает жесткие ссылки — копируем
+        shutil.copyfile(blob_path, alias_path)
+
+
+def _render(image, rendition, config):
+    """Байты рендиции rendition, уменьшенной из открытого изображения image."""
+    resized = image.copy()
+    resized.thumbnail(config["SIZES"][rendition], Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    resized.save(buffer, config["FORMAT"], quality=config["QUALITY"])
+    return buffer.getvalue()
+
+
+def _open_image(file, config):
+    image = ImageOps.exif_transpose(Image.open(file))
+    if config["FORMAT"] == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    return image
+
+
+def _generate_local(storage, source_name, missing, config):
+    """Рендиции в локальном хранилище: общий файл по хэшу исходника и жесткие ссылки на него."""
+    extension = EXTENSIONS[config["FORMAT"]]
+    source_path = storage.path(source_name)
+    if not os.path.isfile(source_path):
+        return False
+    blob_dir = storage.path(f"renditions/blobs/{_file_digest(source_path)}")
+    os.makedirs(blob_dir, exist_ok=True)
+    image = None
+    for rendition in missing:
+        blob_path = os.path.join(blob_dir, f"{rendition}.{extension}")
+        if not os.path.exists(blob_path):
+            if image is None:
+                image = _open_image(source_path, config)
+            # Пишем во временный файл и переименовываем, чтобы параллельный воркер не увидел половину файла
+            tmp_path = f"{blob_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as file:
+                file.write(_render(image, rendition, config))
+            os.replace(tmp_path, blob_path)
+        _link(blob_path, storage.path(rendition_name(source_name, rendition)))
+    return True
+
+
+def _generate_remote(storage, source_name, missing, config):
+    """Рендиции в хранилище без локальных путей: копия под именем рендиции."""
+    if not storage.exists(source_name):
+        return False
+    with storage.open(source_name, "rb") as file:
+        image = _open_image(file, config)
+        for rendition in missing:
+            name = rendition_name(source_name, rendition)
+            saved = storage.save(name, ContentFile(_render(image, rendition, config)))
+            if saved != name:
+                # Параллельный воркер уже сохранил эту рендицию — копия с другим именем не нужна
+                storage.delete(saved)
+    return True
+
+
+def _is_local(storage):
+    try:
+        storage.path("")
+    except NotImplementedError:
+        return False
+    return True
+
+
+def generate_renditions(source_name, storage=None):
+    """
+    Генерирует все рендиции для файла source_name (имя в хранилище, по умолчанию default_storage) и отмечает их
+    готовность. Уже существующие рендиции не пересоздаются, но отмечаются. Возвращает True, если создана хотя бы одна
+    рендиция. Выполняется в пуле воркеров, поэтому не бросает исключений, а пишет их в лог.
+    """
+    config = get_config()
+    storage = storage or default_storage
+    try:
+        missing = [
+            rendition for rendition in config["SIZES"] if not storage.exists(rendition_name(source_name, rendition))
+        ]
+        if missing:
+            generate = _generate_local if _is_local(storage) else _generate_remote
+            if not generate(storage, source_name, missing, config):
+                return False
+        mark_available(source_name, config["SIZES"])
+        return bool(missing)
+    except (OSError, ValueError, SuspiciousFileOperation) as exc:
+        logger.warning("Не удалось создать миниатюры для %s: %s", source_name, exc)
+        return False
+
+
+def _generate_all(source_names):
+    generated = False
+    for name in source_names:
+        generated |= generate_renditions(name)
+    return generated
+
+
+def touch_owners(model, pks):
+    """
+    Обновляет updated_at строк pks модели model, у которых появились рендиции, и отправляет renditions_ready.
+    """
+    if not pks:
+        return
+    if any(field.name == "updated_at" for field in model._meta.concrete_fields):
+        model._base_manager.filter(pk__in=pks).update(updated_at=timezone.now())
+    renditions_ready.send(sender=model, pks=list(pks))
+
+
+def _touch_owner(owner):
+    try:
+        touch_owners(*owner)
+    except DatabaseError as exc:
+        logger.warning("Не удалось отметить готовые миниатюры %s: %s", owner, exc)
+
+
+def _generate_in_thread(source_names, owner):
+    if _generate_all(source_names) and owner:
+        # Поток пула живет дольше запросов: соединение могло устареть или закрыться
+        close_old_connections()
+        _touch_owner(owner)
+
+
+def _after_process(owner, future):
+    if owner and not future.cancelled() and future.exception() is None and future.result():
+        _touch_owner(owner)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                config = get_config()
+                executor_class = ProcessPoolExecutor if config["EXECUTOR"] == "process" else ThreadPoolExecutor
+                _executor = executor_class(max_workers=config["WORKERS"])
+    return _executor
+
+
+def schedule_renditions(source_names, owner=None):
+    """
+    Ставит генерацию рендиций в пул воркеров (вне обработки запроса). owner — пара (модель, список pk) строк, которым
+    принадлежат изображения: если рендиции созданы, для них вызывается touch_owners().
+    """
+    source_names = [name for name in source_names if name]
+    if not source_names:
+        return
+    config = get_config()
+    if config["EXECUTOR"] == "sync":
+        if _generate_all(source_names) and owner:
+            touch_owners(*owner)
+        return
+    executor = get_executor()
+    if config["EXECUTOR"] == "process":
+        # Дочерний процесс только пишет файлы, строку обновляет родитель
+        executor.submit(_generate_all, source_names).add_done_callback(functools.partial(_after_process, owner))
+    else:
+        executor.submit(_generate_in_thread, source_names, owner)
+
+
+def schedule_instance_renditions(instance):
+    """
+    Планирует рендиции для всех ImageField экземпляра модели после фиксации транзакции. Подключается к post_save
+    моделей с изображениями.
+    """
+    names = [
+        getattr(instance, field.attname).name
+        for field in instance._meta.concrete_fields if isinstance(field, ImageField)
+    ]
+    owner = (instance._meta.concrete_model, [instance.pk])
+    transaction.on_commit(lambda: schedule_renditions(names, owner))
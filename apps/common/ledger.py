@@ -0,0 +1,64 @@
+"""
+Идемпотентный учет оплаченных заказов в производных таблицах (свертки аналитики продавцов, матрица рекомендаций).
+
+Каждый потребитель ведет свой журнал — модель с полем order, в которой заказ появляется вместе с первым учетом.
+record() в одной транзакции записывает в журнал новые оплаченные заказы и прибавляет их к производным таблицам,
+поэтому повторные сигналы и перезапуск пересчета не учитывают заказ дважды. paid_order_pages() перебирает оплаченные
+заказы по ключу (created_at, id) для пересчета истории пачками.
+"""
+from django.db import IntegrityError, transaction
+
+from apps.profiles.models import Order
+
+PAID = "SUCCESSFUL"
+BACKFILL_BATCH_SIZE = 500
+# Сколько раз повторять учет пачки, если параллельная транзакция создала ту же производную строку
+MAX_ATTEMPTS = 3
+
+
+def claim(journal, order_ids):
+    """Записывает в журнал journal еще не учтенные оплаченные заказы из order_ids и возвращает их id."""
+    paid = set(Order.objects.filter(id__in=order_ids, payment_status=PAID).values_list("id", flat=True))
+    if not paid:
+        return set()
+    claimed = paid - set(journal.objects.filter(order_id__in=paid).values_list("order_id", flat=True))
+    journal.objects.bulk_create([journal(order_id=order_id) for order_id in claimed])
+    return claimed
+
+
+def record(journal, order_ids, apply):
+    """
+    В одной транзакции записывает в журнал journal новые оплаченные заказы из order_ids и вызывает apply(claimed).
+    Если недостающую строку успела создать другая транзакция, IntegrityError откатывает пачку, и она повторяется
+    целиком (до MAX_ATTEMPTS раз). Возвращает (id учтенных заказов, результат apply) или (set(), None), если учитывать
+    нечего.
+    """
+    order_ids = list(order_ids)
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                claimed = claim(journal, order_ids)
+                if not claimed:
+                    return set(), None
+                return claimed, apply(claimed)
+        except IntegrityError:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+
+
+def paid_order_pages(batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Списки id оплаченных заказов пачками по batch_size в порядке (created_at, id). Следующая пачка выбирается
+    условием по ключу последнего заказа, а не смещением, поэтому глубокие пачки не дороже первой.
+    """
+    orders = Order.objects.filter(payment_status=PAID).order_by("created_at", "id")
+    last = None
+    while True:
+        batch = orders
+        if last is not None:
+            batch = batch.filter(created_at__gte=last[0]).exclude(created_at=last[0], id__lte=last[1])
+        page = list(batch.values_list("created_at", "id")[:batch_size])
+        if not page:
+            return
+        yield [order_id for _, order_id in page]
+        last = page[-1]
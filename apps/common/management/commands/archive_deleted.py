@@ -0,0 +1,33 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.archive import archive_deleted, get_archived_models
+
+
+class Command(BaseCommand):
+    help = "Переносит мягко удаленные строки старше окна хранения из рабочих таблиц в архивные"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", action="append", help="Модель в формате app_label.Model (по умолчанию все)")
+        parser.add_argument("--retention-days", type=int)
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument("--pause", type=float, help="Пауза между пачками в секундах")
+
+    def handle(self, *args, **options):
+        models = get_archived_models()
+        if options["model"]:
+            try:
+                selected = [apps.get_model(label) for label in options["model"]]
+            except (LookupError, ValueError) as exc:
+                raise CommandError(str(exc))
+            unsupported = [model._meta.label for model in selected if model not in models]
+            if unsupported:
+                raise CommandError(f"У моделей нет архива: {', '.join(unsupported)}")
+            models = selected
+
+        for model in models:
+            moved = archive_deleted(
+                model, retention_days=options["retention_days"], batch_size=options["batch_size"],
+                pause=options["pause"],
+            )
+            self.stdout.write(self.style.SUCCESS(f"{model._meta.label}: перенесено в архив: {moved}"))
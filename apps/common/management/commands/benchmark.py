@@ -0,0 +1,133 @@
+import json
+import platform
+import sys
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from apps.common import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный прогон API на детерминированном синтетическом наборе данных во временной тестовой базе. "
+        "Выводит JSON с пропускной способностью, перцентилями задержки и числом SQL-запросов по каждому сценарию"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--sellers", type=int, default=20)
+        parser.add_argument("--categories", type=int, default=10)
+        parser.add_argument("--products", type=int, default=2000)
+        parser.add_argument("--orders", type=int, default=500)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--iterations", type=int, default=200, help="Запросов на сценарий")
+        parser.add_argument("--warmup", type=int, default=10, help="Запросов прогрева, не попадающих в результат")
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument(
+            "--server", action="store_true",
+            help="Прогон через локальный WSGI-сервер по HTTP вместо тестового клиента в процессе",
+        )
+        mode.add_argument(
+            "--asgi", action="store_true",
+            help="Прогон через ASGI-приложение с параллельными запросами в одном event loop (как под uvicorn)",
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=4, help="Параллельных клиентов в режимах --server и --asgi"
+        )
+        parser.add_argument(
+            "--views", choices=["sync", "async", "both"], default="sync",
+            help="Варианты представлений (settings.ASYNC_VIEWS); both — замер обоих и сравнение async с sync",
+        )
+        parser.add_argument("--scenario", action="append", help="Запустить только указанные сценарии")
+        parser.add_argument(
+            "--serializer-products", type=int, default=1000,
+            help=(
+                "Товаров в списке для сравнения DRF- и скомпилированной сериализации и рендереров JSON "
+                "(0 — не сравнивать)"
+            ),
+        )
+        parser.add_argument("--output", help="Записать JSON в файл вместо stdout")
+        parser.add_argument("--compare", help="JSON предыдущего прогона для сравнения")
+
+    def handle(self, *args, **options):
+        if options["sellers"] < 1 or options["users"] <= options["sellers"] or options["categories"] < 1:
+            raise CommandError("Нужен хотя бы один продавец, одна категория и покупатель (--users > --sellers)")
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as file:
+                baseline = json.load(file)
+
+        # Замер всегда идет во временной базе, рабочая база не затрагивается
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Лимиты endpoint'ов токенов отключены: замеряется стоимость запроса, а не срабатывание лимита
+            with override_settings(
+                DEBUG=False, ALLOWED_HOSTS=["testserver", "127.0.0.1", "localhost"], LOGIN_RATE_LIMITS={},
+            ):
+                dataset = benchmark.seed(
+                    users=options["users"], sellers=options["sellers"], categories=options["categories"],
+                    products=options["products"], orders=options["orders"], seed_value=options["seed"],
+                )
+                scenarios = benchmark.build_scenarios(dataset)
+                if options["scenario"]:
+                    unknown = set(options["scenario"]) - {scenario.name for scenario in scenarios}
+                    if unknown:
+                        raise CommandError(f"Неизвестные сценарии: {', '.join(sorted(unknown))}")
+                    scenarios = [scenario for scenario in scenarios if scenario.name in options["scenario"]]
+                serialization = rendering = None
+                if options["serializer_products"] > 0:
+                    serialization = benchmark.compare_serializers(products=options["serializer_products"])
+                    rendering = benchmark.compare_renderers(products=options["serializer_products"])
+                results = {}
+                variants = ["sync", "async"] if options["views"] == "both" else [options["views"]]
+                for variant in variants:
+                    with benchmark.use_async_views(variant == "async"):
+                        results[variant] = self.run(scenarios, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        mode = "server" if options["server"] else "asgi" if options["asgi"] else "in-process"
+        report = {
+            "meta": {
+                "mode": mode,
+                "views": options["views"],
+                "concurrency": 1 if mode == "in-process" else options["concurrency"],
+                "iterations": options["iterations"],
+                "warmup": options["warmup"],
+                "dataset": {
+                    key: options[key] for key in ("users", "sellers", "categories", "products", "orders", "seed")
+                },
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+            },
+            "results": results[variants[0]],
+        }
+        if serialization is not None:
+            report["serialization"] = serialization
+            report["rendering"] = rendering
+        if options["views"] == "both":
+            report["async_results"] = results["async"]
+            report["async_vs_sync"] = benchmark.compare(report, {"results": results["async"]})
+        if baseline is not None:
+            report["comparison"] = benchmark.compare(baseline, report)
+
+        content = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(content + "\n")
+            self.stderr.write(self.style.SUCCESS(f"Результаты записаны в {options['output']}"))
+        else:
+            sys.stdout.write(content + "\n")
+
+    def run(self, scenarios, options):
+        if options["server"]:
+            return benchmark.run_against_server(
+                scenarios, options["iterations"], options["warmup"], options["concurrency"]
+            )
+        if options["asgi"]:
+            return benchmark.run_asgi(scenarios, options["iterations"], options["warmup"], options["concurrency"])
+        return benchmark.run_in_process(scenarios, options["iterations"], options["warmup"])
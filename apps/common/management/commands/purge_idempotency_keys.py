@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from apps.common.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Удаляет сохраненные ответы Idempotency-Key с истекшим сроком хранения"
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f"Удалено ключей: {purge_expired()}"))
@@ -1,6 +1,11 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
+from apps.common.signals import restored, soft_deleted
+
+# Размер пачки для soft_delete() / restore() по умолчанию
+SOFT_DELETE_BATCH_SIZE = 1000
+
 
 class GetOrNoneQuerySet(models.QuerySet):
     """Custom QuerySet that supports get_or_none()"""
@@ -27,7 +32,155 @@ class IsDeletedQuerySet(GetOrNoneQuerySet):
         if hard_delete:
             return super().delete()
         else:
-            return self.update(is_deleted=True, deleted_at=timezone.now())
+            return self.soft_delete()
+
+    def soft_delete(self, batch_size=SOFT_DELETE_BATCH_SIZE):
+        """
+        Мягко удаляет строки пачками по batch_size в порядке первичного ключа, каждую пачку в своей короткой
+        транзакции, и на каждую пачку отправляет сигнал apps.common.signals.soft_deleted. Возвращает число
+        удаленных строк.
+        """
+        return self._set_deleted(True, soft_deleted, batch_size)
+
+    def restore(self, batch_size=SOFT_DELETE_BATCH_SIZE):
+        """
+        Восстанавливает мягко удаленные строки так же пачками, с сигналом apps.common.signals.restored.
+        Менеджер objects скрывает удаленные строки, поэтому восстанавливать нужно через objects.unfiltered().
+        """
+        return self._set_deleted(False, restored, batch_size)
+
+    def _set_deleted(self, is_deleted, signal, batch_size):
+        queryset = self.filter(is_deleted=not is_deleted).order_by("pk")
+        sender = self.model._meta.concrete_model
+        changed = 0
+        last_pk = None
+        while True:
+            batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            with transaction.atomic(using=self.db):
+                ids = list(batch.values_list("pk", flat=True)[:batch_size])
+                if not ids:
+                    return changed
+                now = timezone.now()
+                changed += self.model._base_manager.using(self.db).filter(
+                    pk__in=ids, is_deleted=not is_deleted
+                ).update(is_deleted=is_deleted, deleted_at=now if is_deleted else None, updated_at=now)
+                signal.send(sender=sender, ids=ids, using=self.db)
+            if len(ids) < batch_size:
+                return changed
+            last_pk = ids[-1]
+
+
+class LiveAndArchivedQuerySet:
+    """
+    Набор строк из рабочей таблицы и ее архива (apps.common.archive). Фильтры применяются к обеим таблицам, чтение
+    идет одним UNION ALL, изменения выполняются в каждой таблице отдельно. Поддерживает подмножество API QuerySet,
+    которое используется с with_archived(); связи в фильтрах — только прямые (у архива нет обратных связей).
+    """
+
+    def __init__(self, live, archived, ordering=()):
+        self.live = live
+        self.archived = archived
+        self.ordering = ordering
+        self.model = live.model
+
+    def _chain(self, method, *args, **kwargs):
+        return type(self)(
+            getattr(self.live, method)(*args, **kwargs), getattr(self.archived, method)(*args, **kwargs),
+            self.ordering,
+        )
+
+    def all(self):
+        return self._chain("all")
+
+    def filter(self, *args, **kwargs):
+        return self._chain("filter", *args, **kwargs)
+
+    def exclude(self, *args, **kwargs):
+        return self._chain("exclude", *args, **kwargs)
+
+    def only(self, *fields):
+        return self._chain("only", *fields)
+
+    def values(self, *fields, **expressions):
+        return self._chain("values", *fields, **expressions)
+
+    def values_list(self, *fields, **kwargs):
+        return self._chain("values_list", *fields, **kwargs)
+
+    def using(self, alias):
+        return self._chain("using", alias)
+
+    def order_by(self, *fields):
+        # Сортировка применяется к результату UNION, а не к его частям
+        return type(self)(self.live, self.archived, fields)
+
+    def _union(self):
+        queryset = self.live.order_by().union(self.archived.order_by(), all=True)
+        return queryset.order_by(*self.ordering) if self.ordering else queryset
+
+    def __iter__(self):
+        return iter(self._union())
+
+    def __getitem__(self, item):
+        return self._union()[item]
+
+    def iterator(self, chunk_size=None):
+        return self._union().iterator(chunk_size=chunk_size)
+
+    def count(self):
+        return self.live.count() + self.archived.count()
+
+    def exists(self):
+        return self.live.exists() or self.archived.exists()
+
+    def __bool__(self):
+        return self.exists()
+
+    def first(self):
+        return next(iter(self._union()[:1]), None)
+
+    def get(self, *args, **kwargs):
+        rows = list(self.filter(*args, **kwargs)[:2])
+        if not rows:
+            raise self.model.DoesNotExist(f"{self.model._meta.object_name} matching query does not exist.")
+        if len(rows) > 1:
+            raise self.model.MultipleObjectsReturned(f"get() returned more than one {self.model._meta.object_name}")
+        return rows[0]
+
+    def get_or_none(self, *args, **kwargs):
+        try:
+            return self.get(*args, **kwargs)
+        except self.model.DoesNotExist:
+            return None
+
+    def update(self, **kwargs):
+        return self.live.update(**kwargs) + self.archived.update(**kwargs)
+
+    def soft_delete(self, batch_size=SOFT_DELETE_BATCH_SIZE):
+        return self.live.soft_delete(batch_size=batch_size)
+
+    def restore(self, batch_size=SOFT_DELETE_BATCH_SIZE):
+        # Строки из архива не восстанавливаются: они удалены дольше окна хранения
+        return self.live.restore(batch_size=batch_size)
+
+    def delete(self, hard_delete=False):
+        # Мягкое удаление касается только рабочей таблицы: в архиве все строки уже удалены
+        if not hard_delete:
+            return self.live.soft_delete()
+        live_deleted, live_counts = self.live.delete(hard_delete=True)
+        archived_deleted, archived_counts = self.archived.delete()
+        return live_deleted + archived_deleted, {**live_counts, **archived_counts}
+
+
+def live_and_archived(model, queryset):
+    """
+    Строки queryset вместе со строками архива модели (apps.common.archive) одним UNION ALL. Если у модели нет
+    архива, возвращается сам queryset.
+    """
+    archive = getattr(model, "archive_model", None)
+    if archive is None:
+        return queryset
+    return LiveAndArchivedQuerySet(queryset, archive._base_manager.all())
 
 
 class IsDeletedManager(GetOrNoneManager):
@@ -35,7 +188,18 @@ class IsDeletedManager(GetOrNoneManager):
         return IsDeletedQuerySet(self.model).filter(is_deleted=False)
 
     def unfiltered(self):
+        """
+        Все строки рабочей таблицы, включая мягко удаленные. Строк, перенесенных в архив, здесь нет: это обычный
+        QuerySet с полным API, а читать вместе с архивом нужно через with_archived() (например, проверки уникальности).
+        """
         return IsDeletedQuerySet(self.model)
 
+    def with_archived(self):
+        """
+        Все строки рабочей таблицы и (если у модели есть архив) перенесенные в архив. Это LiveAndArchivedQuerySet
+        с подмножеством API QuerySet, поэтому для select_related(), annotate() и т. п. нужен unfiltered().
+        """
+        return live_and_archived(self.model, self.unfiltered())
+
     def hard_delete(self):
-        return self.unfiltered().delete(hard_delete=True)
\ No newline at end of file
+        return self.with_archived().delete(hard_delete=True)
@@ -0,0 +1,97 @@
+import bisect
+import threading
+
+# Верхние границы корзин гистограмм: миллисекунды для времени, штуки для запросов
+TIME_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float("inf"))
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, float("inf"))
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами: O(1) памяти на метрику и приблизительные перцентили."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        """Верхняя граница корзины, в которую попадает перцентиль (для последней корзины — максимум)."""
+        if not self.total:
+            return None
+        threshold = self.total * percent / 100
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= threshold:
+                return self.max if bound == float("inf") else min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.total,
+            "avg": round(self.sum / self.total, 3) if self.total else None,
+            "p50": round(self.percentile(50), 3) if self.total else None,
+            "p95": round(self.percentile(95), 3) if self.total else None,
+            "p99": round(self.percentile(99), 3) if self.total else None,
+            "max": round(self.max, 3),
+        }
+
+
+class EndpointStats:
+    def __init__(self):
+        self.wall_ms = Histogram(TIME_BUCKETS)
+        self.db_ms = Histogram(TIME_BUCKETS)
+        self.queries = Histogram(COUNT_BUCKETS)
+        self.duplicate_queries = Histogram(COUNT_BUCKETS)
+        self.response_bytes = 0
+        self.budget_exceeded = 0
+
+    def as_dict(self):
+        return {
+            "requests": self.wall_ms.total,
+            "wall_ms": self.wall_ms.as_dict(),
+            "db_ms": self.db_ms.as_dict(),
+            "queries": self.queries.as_dict(),
+            "duplicate_queries": self.duplicate_queries.as_dict(),
+            "avg_response_bytes": round(self.response_bytes / self.wall_ms.total) if self.wall_ms.total else None,
+            "budget_exceeded": self.budget_exceeded,
+        }
+
+
+class MetricsRegistry:
+    """Потокобезопасное хранилище агрегированных метрик по endpoint'ам в памяти процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, key, wall_ms, db_ms, queries, duplicate_queries, response_bytes, budget_exceeded=False):
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = EndpointStats()
+            stats.wall_ms.observe(wall_ms)
+            stats.db_ms.observe(db_ms)
+            stats.queries.observe(queries)
+            stats.duplicate_queries.observe(duplicate_queries)
+            stats.response_bytes += response_bytes or 0
+            stats.budget_exceeded += budget_exceeded
+
+    def snapshot(self):
+        with self._lock:
+            return {key: stats.as_dict() for key, stats in sorted(self._stats.items())}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,217 @@
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import JsonResponse
+
+from apps.common import idempotency
+from apps.common.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Представление выполнило больше SQL-запросов, чем объявлено в его query_budget."""
+
+
+class QueryCollector:
+    """
+    execute_wrapper, который считает запросы, их суммарное время и повторы одного и того же SQL-шаблона
+    (характерный признак N+1).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+
+def get_view_class(request):
+    match = getattr(request, "resolver_match", None)
+    return getattr(match.func, "view_class", None) if match else None
+
+
+def get_endpoint_name(request):
+    """Имя endpoint'а для метрик: метод + класс представления (или имя URL)."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return f"{request.method} <unresolved>"
+    view_class = get_view_class(request)
+    name = view_class.__name__ if view_class else (match.view_name or match._func_path)
+    return f"{request.method} {name}"
+
+
+def get_query_budget(request):
+    """
+    Бюджет запросов представления из атрибута query_budget: число для всех методов или словарь по методам,
+    например {"GET": 3}.
+    """
+    budget = getattr(get_view_class(request), "query_budget", None)
+    if isinstance(budget, dict):
+        budget = budget.get(request.method)
+    return budget
+
+
+class PerformanceMiddleware:
+    """
+    Замеряет для каждого запроса общее время, время и количество SQL-запросов, количество повторяющихся запросов и
+    размер ответа. Результаты агрегируются в apps.common.metrics.registry и отдаются в заголовке Server-Timing.
+    Если у представления объявлен query_budget и PERF_ENFORCE_QUERY_BUDGETS включен (так делает тестовый раннер),
+    превышение бюджета приводит к исключению QueryBudgetExceeded. Поддерживает и WSGI, и ASGI (без переключения
+    async-цепочки в поток).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PERF_METRICS_ENABLED", True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def collect_queries(collector):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(collector))
+        return stack
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        collector = QueryCollector()
+        start = time.perf_counter()
+        with self.collect_queries(collector):
+            response = self.get_response(request)
+        return self.process(request, response, collector, start)
+
+    async def __acall__(self, request):
+        collector = QueryCollector()
+        start = time.perf_counter()
+        # Соединения с БД привязаны к потоку, а async ORM выполняет запросы в потоке sync_to_async
+        # (thread_sensitive, один на запрос), поэтому обертки устанавливаются в нем же
+        stack = await sync_to_async(self.collect_queries)(collector)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.process(request, response, collector, start)
+
+    def process(self, request, response, collector, start):
+        wall_ms = (time.perf_counter() - start) * 1000
+        db_ms = collector.duration * 1000
+
+        response_bytes = None if response.streaming else len(response.content)
+        budget = get_query_budget(request)
+        budget_exceeded = budget is not None and collector.count > budget
+        endpoint = get_endpoint_name(request)
+        registry.record(endpoint, wall_ms, db_ms, collector.count, collector.duplicates, response_bytes, budget_exceeded)
+
+        if getattr(settings, "PERF_SERVER_TIMING", True):
+            response["Server-Timing"] = (
+                f'app;dur={wall_ms:.1f}, db;dur={db_ms:.1f};desc="{collector.count} queries, '
+                f'{collector.duplicates} duplicates"'
+            )
+
+        if budget_exceeded:
+            message = f"{endpoint}: {collector.count} SQL queries, budget is {budget}"
+            if getattr(settings, "PERF_ENFORCE_QUERY_BUDGETS", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class IdempotencyMiddleware:
+    """
+    Обрабатывает заголовок Idempotency-Key (apps.common.idempotency): повтор запроса с тем же ключом получает
+    сохраненный ответ без повторного выполнения представления. Методы и сроки хранения задает settings.IDEMPOTENCY.
+    Работает и под WSGI, и под ASGI (обращения к БД выполняются в потоке).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.methods = set(idempotency.get_config()["METHODS"])
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response, digest = self.start(request)
+        if response is not None:
+            return response
+        try:
+            response = self.get_response(request)
+        except Exception:
+            if digest:
+                idempotency.release(digest)
+            raise
+        if digest:
+            idempotency.finish(digest, response)
+        return response
+
+    async def __acall__(self, request):
+        response, digest = await sync_to_async(self.start)(request)
+        if response is not None:
+            return response
+        try:
+            response = await self.get_response(request)
+        except Exception:
+            if digest:
+                await sync_to_async(idempotency.release)(digest)
+            raise
+        if digest:
+            await sync_to_async(idempotency.finish)(digest, response)
+        return response
+
+    def start(self, request):
+        """
+        Возвращает (response, digest): готовый ответ (повтор или ошибку ключа) либо digest захваченного ключа.
+        (None, None) — запрос обрабатывается без идемпотентности.
+        """
+        key = request.META.get(idempotency.HEADER)
+        if not key or request.method not in self.methods:
+            return None, None
+        if len(key) > idempotency.MAX_KEY_LENGTH:
+            return JsonResponse({"message": "Idempotency-Key is too long"}, status=400), None
+        if idempotency.is_excluded(request):
+            return None, None
+        scope = idempotency.get_scope(request)
+        if scope is None:
+            return None, None
+
+        try:
+            digest, record = idempotency.begin(scope, key, idempotency.get_fingerprint(request))
+        except idempotency.KeyInProgress:
+            response = JsonResponse({"message": "A request with this Idempotency-Key is in progress"}, status=409)
+            response["Retry-After"] = "1"
+            return response, None
+        except idempotency.KeyMismatch:
+            message = "Idempotency-Key has already been used for a different request"
+            return JsonResponse({"message": message}, status=422), None
+        if record is not None:
+            return idempotency.replay(record), None
+        return None, digest
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0001_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='headers',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -1,9 +1,11 @@
 import uuid
 
 from django.db import models
+from django.db.models import Q
 from django.utils import timezone
 
 from apps.common.managers import GetOrNoneManager, IsDeletedManager
+from apps.common.signals import restored, soft_deleted
 
 
 class BaseModel(models.Model):
@@ -32,6 +34,13 @@ class IsDeletedModel(BaseModel):
 
     class Meta:
         abstract = True
+        # Частичный индекс только по удаленным строкам: по нему архивирование (apps.common.archive) находит строки
+        # с истекшим сроком хранения, не просматривая живые. Индекс по живым строкам обслуживает менеджер objects,
+        # который всегда фильтрует is_deleted=False: подсчет и выборки по времени создания не задевают удаленные строки
+        indexes = [
+            models.Index(fields=["deleted_at"], condition=Q(is_deleted=True), name="%(app_label)s_%(class)s_deleted_idx"),
+            models.Index(fields=["created_at"], condition=Q(is_deleted=False), name="%(app_label)s_%(class)s_live_idx"),
+        ]
 
     objects = IsDeletedManager()
 
@@ -39,7 +48,33 @@ class IsDeletedModel(BaseModel):
         """Мягкое удаление с помощью параметра is_deleted=True"""
         self.is_deleted = True
         self.deleted_at = timezone.now()
-        self.save(update_fields=["is_deleted", "deleted_at"])
+        self.save(update_fields=["is_deleted", "deleted_at", "updated_at"])
+        soft_deleted.send(sender=self._meta.concrete_model, ids=[self.pk], using=self._state.db)
+
+    def restore(self):
+        """Отмена мягкого удаления"""
+        self.is_deleted = False
+        self.deleted_at = None
+        self.save(update_fields=["is_deleted", "deleted_at", "updated_at"])
+        restored.send(sender=self._meta.concrete_model, ids=[self.pk], using=self._state.db)
 
     def hard_delete(self, *args, **kwargs):
         super().delete(*args, **kwargs)
+
+
+class IdempotencyKey(models.Model):
+    """
+    Сохраненный ответ на запрос с заголовком Idempotency-Key (apps.common.idempotency). Строка без status_code
+    означает, что запрос еще выполняется.
+    """
+
+    # sha256 от владельца и ключа клиента: фиксированная длина независимо от ключа
+    key = models.CharField(max_length=64, primary_key=True)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    content_type = models.CharField(max_length=255, blank=True)
+    # Заголовки ответа, которые отдаются при повторе (idempotency.DEFAULTS["HEADERS"])
+    headers = models.JSONField(default=dict, blank=True)
+    body = models.BinaryField(blank=True)
+    created_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
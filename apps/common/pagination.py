@@ -0,0 +1,74 @@
+import base64
+import json
+import uuid
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    """Курсор не удалось декодировать."""
+
+
+class KeysetPagination:
+    """
+    Пагинация по ключу (keyset/cursor) для сортировки по паре (created_at, id) в порядке убывания.
+
+    В отличие от LIMIT/OFFSET, следующая страница выбирается условием
+    `(created_at, id) < (last_created_at, last_id)`, поэтому стоимость глубокой страницы совпадает со стоимостью первой
+    (при наличии составного индекса). Общее количество строк не считается — вместо COUNT(*) запрашивается на одну
+    строку больше, чтобы понять, есть ли следующая страница.
+    """
+
+    ordering = ("-created_at", "-id")
+    # Столбцы, из которых строится курсор: их нужно выбрать, если страница читается через .values()
+    cursor_fields = ("created_at", "id")
+    default_limit = 20
+    max_limit = 100
+
+    def __init__(self, limit=None):
+        limit = limit or self.default_limit
+        self.limit = max(1, min(limit, self.max_limit))
+
+    @staticmethod
+    def encode_cursor(obj):
+        created_at, pk = (obj["created_at"], obj["id"]) if isinstance(obj, dict) else (obj.created_at, obj.id)
+        payload = json.dumps([created_at.isoformat(), str(pk)])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            created_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            created_at = parse_datetime(created_at)
+            pk = uuid.UUID(pk)
+        except (TypeError, ValueError):
+            raise InvalidCursor("Invalid cursor")
+        if created_at is None:
+            raise InvalidCursor("Invalid cursor")
+        return created_at, pk
+
+    def page_queryset(self, queryset, cursor=None):
+        """Запрос страницы: на один объект больше лимита, чтобы узнать, есть ли следующая страница."""
+        queryset = queryset.order_by(*self.ordering)
+        if cursor:
+            created_at, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        return queryset[:self.limit + 1]
+
+    def split_page(self, page):
+        next_cursor = None
+        if len(page) > self.limit:
+            page = page[:self.limit]
+            next_cursor = self.encode_cursor(page[-1])
+        return page, next_cursor
+
+    def paginate_queryset(self, queryset, cursor=None):
+        """
+        Возвращает кортеж (список объектов страницы, курсор следующей страницы или None).
+        """
+        return self.split_page(list(self.page_queryset(queryset, cursor)))
+
+    async def apaginate_queryset(self, queryset, cursor=None):
+        """Асинхронный вариант paginate_queryset() для async-представлений."""
+        return self.split_page([obj async for obj in self.page_queryset(queryset, cursor)])
@@ -0,0 +1,164 @@
+"""
+Проекция запросов под сериализатор.
+
+get_projection() выводит из объявленных полей сериализатора набор столбцов и соединений: source с точками
+("user.avatar") и вложенные сериализаторы на прямых ForeignKey/OneToOne становятся путями вида "seller__user__avatar".
+Projection.values() выбирает только эти столбцы через .values() и отдает строки вложенными словарями
+({"seller": {"user": {"avatar": ...}}}) — модели не создаются, а сериализаторы DRF и compile_serializer() читают
+словари так же, как атрибуты. Поля-файлы оборачиваются в FieldFile, как это делает дескриптор модели, поэтому URL
+и имена файлов не меняются. Если связь пустая (NULL во внешнем ключе), вместо словаря подставляется None.
+
+Поля, которые нельзя вывести из столбцов (свойства, методы, обратные связи, source="*"), делают проекцию неполной:
+для нее доступен только Projection.only() — объекты моделей с select_related(), но без ограничения столбцов.
+"""
+import threading
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models.query import ValuesIterable
+from rest_framework import serializers
+
+_projections = {}
+_lock = threading.Lock()
+
+
+class _Node:
+    """Столбцы и связи одной модели в проекции."""
+
+    def __init__(self, model, prefix):
+        self.model = model
+        self.prefix = prefix
+        self.columns = {}  # ключ словаря -> (путь в .values(), поле-файл или None)
+        self.relations = {}  # ключ словаря -> (путь внешнего ключа, _Node)
+
+    def path(self, name):
+        return f"{self.prefix}__{name}" if self.prefix else name
+
+    def relation(self, name, model_field):
+        if name not in self.relations:
+            self.relations[name] = (self.path(name), _Node(model_field.related_model, self.path(name)))
+        return self.relations[name][1]
+
+    def paths(self):
+        for path, _ in self.columns.values():
+            yield path
+        for fk_path, node in self.relations.values():
+            yield fk_path
+            yield from node.paths()
+
+    def build(self, row):
+        obj = {}
+        for key, (path, file_field) in self.columns.items():
+            value = row[path]
+            obj[key] = value if file_field is None else file_field.attr_class(None, file_field, value)
+        for key, (fk_path, node) in self.relations.items():
+            obj[key] = None if row[fk_path] is None else node.build(row)
+        return obj
+
+
+def _forward_relation(model_field, attr):
+    """Прямой ForeignKey/OneToOne, по которому можно соединить таблицы (не attname вида seller_id)."""
+    return (
+        model_field.is_relation and model_field.concrete and (model_field.many_to_one or model_field.one_to_one)
+        and attr == model_field.name
+    )
+
+
+class ProjectedValuesIterable(ValuesIterable):
+    """Строки .values(), собранные во вложенные словари. Подкласс с projection создается на каждую проекцию."""
+
+    projection = None
+
+    def __iter__(self):
+        build = self.projection.root.build
+        for row in super().__iter__():
+            yield build(row)
+
+
+class Projection:
+    """
+    Столбцы и соединения, нужные сериализатору serializer_class для запросов к модели model. extra — столбцы
+    корневой модели, которые нужны представлению помимо сериализатора (например, ключи курсора пагинации).
+    """
+
+    def __init__(self, model, serializer_class, extra=()):
+        self.model = model
+        self.serializer_class = serializer_class
+        self.root = _Node(model, "")
+        self.unresolved = []
+        self._resolve(serializer_class(), self.root)
+        for name in extra:
+            self.root.columns.setdefault(name, (name, None))
+        self.relations = tuple(self._relation_paths(self.root))
+        self.fields = tuple(dict.fromkeys(self.root.paths()))
+        self._iterable_class = type("ProjectedValuesIterable", (ProjectedValuesIterable,), {"projection": self})
+
+    @property
+    def complete(self):
+        return not self.unresolved
+
+    def _resolve(self, serializer, node):
+        for field in serializer._readable_fields:
+            if type(field).get_attribute is not serializers.Field.get_attribute or not self._resolve_field(field, node):
+                self.unresolved.append(f"{type(serializer).__name__}.{field.field_name}")
+
+    def _resolve_field(self, field, node):
+        attrs = field.source_attrs
+        if not attrs:
+            return False
+        for i, attr in enumerate(attrs):
+            if attr == "pk":
+                model_field = node.model._meta.pk
+            else:
+                try:
+                    model_field = node.model._meta.get_field(attr)
+                except FieldDoesNotExist:
+                    return False
+            last = i == len(attrs) - 1
+            if _forward_relation(model_field, attr):
+                node = node.relation(attr, model_field)
+                if last:
+                    if isinstance(field, serializers.ListSerializer) or not isinstance(field, serializers.Serializer):
+                        return False
+                    self._resolve(field, node)
+                continue
+            if not last or not model_field.concrete or model_field.many_to_many:
+                return False
+            file_field = model_field if isinstance(model_field, models.FileField) else None
+            node.columns[attr] = (node.path(attr), file_field)
+        return True
+
+    def _relation_paths(self, node):
+        for fk_path, child in node.relations.values():
+            yield fk_path
+            yield from self._relation_paths(child)
+
+    def values(self, queryset):
+        """
+        Ленивый QuerySet вложенных словарей только с нужными столбцами. После вызова его можно фильтровать,
+        сортировать и срезать как обычно.
+        """
+        if not self.complete:
+            raise TypeError(f"Поля {', '.join(self.unresolved)} не выводятся из столбцов модели {self.model.__name__}")
+        queryset = queryset.values(*self.fields)
+        queryset._iterable_class = self._iterable_class
+        return queryset
+
+    def only(self, queryset):
+        """Объекты моделей с select_related() по связям сериализатора и, если проекция полная, только его столбцами."""
+        queryset = queryset.select_related(*self.relations)
+        if self.complete:
+            queryset = queryset.only(*self.fields)
+        return queryset
+
+
+def get_projection(model, serializer_class, extra=()):
+    """Проекция serializer_class на модель model (вычисляется один раз)."""
+    key = (model, serializer_class, tuple(extra))
+    projection = _projections.get(key)
+    if projection is None:
+        with _lock:
+            projection = _projections.get(key)
+            if projection is None:
+                projection = _projections[key] = Projection(model, serializer_class, extra)
+    return projection
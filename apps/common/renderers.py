@@ -0,0 +1,80 @@
+"""
+JSON через orjson.
+
+ORJSONRenderer и ORJSONParser заменяют JSONRenderer и JSONParser DRF (см. REST_FRAMEWORK в настройках). orjson сам
+кодирует UUID, datetime, date и time и сразу возвращает UTF-8 байты. Типы, которых он не знает (Decimal, timedelta,
+ленивые строки, QuerySet), приводятся так же, как в JSONEncoder DRF. Без пакета orjson и для данных, которые он не
+кодирует (например, целые больше 64 бит), используется стандартная реализация DRF.
+
+stream_json_array() отдает JSON-массив частями по мере чтения строк из итератора запроса. Так пиковая память ответа
+не зависит от числа строк.
+"""
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from apps.common.utils import chunked
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Сколько элементов массива кодируется и отдается клиенту за раз
+STREAM_CHUNK_SIZE = 500
+
+_encoder = JSONEncoder()
+
+
+def dumps(data, indent=False):
+    """JSON-байты data в компактном виде (или с отступом в 2 пробела)."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(data, default=_encoder.default, option=option)
+        except orjson.JSONEncodeError:
+            pass
+    return JSONRenderer().render(data, renderer_context={"indent": 2 if indent else None})
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        return dumps(data, indent=bool(indent))
+
+
+class ORJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", "utf-8")
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+def stream_json_array(rows, to_representation=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Генератор байтов JSON-массива из rows (например, queryset.iterator()). Элементы приводятся через
+    to_representation и кодируются пачками по chunk_size. Результат совпадает с dumps(list(...)).
+    """
+    yield b"["
+    separator = b""
+    for block in chunked(rows, chunk_size):
+        if to_representation is not None:
+            block = [to_representation(row) for row in block]
+        yield separator + dumps(block)[1:-1]
+        separator = b","
+    yield b"]"
+
+
+def streaming_json_response(rows, to_representation=None, chunk_size=STREAM_CHUNK_SIZE):
+    """Потоковый ответ application/json с массивом из stream_json_array()."""
+    return StreamingHttpResponse(
+        stream_json_array(rows, to_representation, chunk_size), content_type="application/json"
+    )
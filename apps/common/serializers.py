@@ -0,0 +1,24 @@
+from rest_framework import serializers
+
+from apps.common.images import rendition_url, storage_url
+
+
+class RenditionField(serializers.Field):
+    """
+    Только для чтения: URL рендиции (миниатюры) изображения. Пока рендиция не сгенерирована, возвращается URL
+    оригинала, чтобы клиент всегда получал рабочую ссылку.
+    """
+
+    def __init__(self, rendition="thumb", **kwargs):
+        self.rendition = rendition
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        url = rendition_url(value.name, self.rendition, value.storage) or storage_url(value.storage, value.name)
+        request = self.context.get("request")
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
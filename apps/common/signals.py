@@ -0,0 +1,11 @@
+from django.dispatch import Signal
+
+# Отправляются IsDeletedQuerySet.soft_delete() / restore() (и IsDeletedModel.delete() / restore()) на каждую
+# обработанную пачку внутри ее транзакции. Аргументы: sender — модель (для прокси — исходная), ids — первичные ключи
+# измененных строк, using — алиас БД. Внешние побочные эффекты обработчикам следует откладывать в on_commit.
+soft_deleted = Signal()
+restored = Signal()
+
+# Отправляется apps.common.images.touch_owners(), когда у строк модели впервые появились рендиции изображений.
+# Аргументы: sender — модель, pks — первичные ключи строк (их updated_at уже обновлен).
+renditions_ready = Signal()
@@ -0,0 +1,158 @@
+"""
+Легковесные стеммеры для русского (упрощенный Snowball) и английского (упрощенный Porter) языков. Используются
+полнотекстовым поиском: одни и те же функции применяются и к документам, и к запросам, поэтому важнее согласованность,
+чем лингвистическая точность.
+"""
+import re
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+CYRILLIC_RE = re.compile(r"[а-я]")
+
+# --- Русский язык -----------------------------------------------------------------------------------------------------
+
+RU_VOWELS = "аеиоуыэюя"
+
+RU_PERFECTIVE_GERUND = re.compile(r"((?<=[ая])(в|вши|вшись)|(ив|ивши|ившись|ыв|ывши|ывшись))$")
+RU_REFLEXIVE = re.compile(r"(с[яь])$")
+RU_ADJECTIVE = re.compile(r"(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|ую|юю|ая|яя|ою|ею)$")
+RU_PARTICIPLE = re.compile(r"((?<=[ая])(ем|нн|вш|ющ|щ)|(ивш|ывш|ующ))$")
+RU_VERB = re.compile(
+    r"((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)|"
+    r"(ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю))$"
+)
+RU_NOUN = re.compile(
+    r"(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$"
+)
+RU_DERIVATIONAL = re.compile(r"(ост|ость)$")
+RU_SUPERLATIVE = re.compile(r"(ейше|ейш)$")
+
+
+def _ru_regions(word):
+    """Возвращает начало областей RV и R2 (индексы в слове)."""
+    rv = len(word)
+    for i, char in enumerate(word):
+        if char in RU_VOWELS:
+            rv = i + 1
+            break
+
+    def next_region(start):
+        for i in range(start + 1, len(word)):
+            if word[i] not in RU_VOWELS and word[i - 1] in RU_VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = next_region(0)
+    r2 = next_region(r1)
+    return rv, r2
+
+
+def _strip(pattern, word, start):
+    """Удаляет окончание, подходящее под pattern, только если оно целиком лежит в области word[start:]."""
+    match = pattern.search(word[start:])
+    if not match:
+        return word, False
+    return word[:start + match.start()], True
+
+
+def stem_russian(word):
+    word = word.replace("ё", "е")
+    rv, r2 = _ru_regions(word)
+    if rv >= len(word):
+        return word
+
+    # Шаг 1
+    word, found = _strip(RU_PERFECTIVE_GERUND, word, rv)
+    if not found:
+        word, _ = _strip(RU_REFLEXIVE, word, rv)
+        word, found = _strip(RU_ADJECTIVE, word, rv)
+        if found:
+            word, _ = _strip(RU_PARTICIPLE, word, rv)
+        else:
+            word, found = _strip(RU_VERB, word, rv)
+            if not found:
+                word, _ = _strip(RU_NOUN, word, rv)
+
+    # Шаг 2
+    if word[rv:].endswith("и"):
+        word = word[:-1]
+
+    # Шаг 3
+    if r2 < len(word):
+        word, _ = _strip(RU_DERIVATIONAL, word, r2)
+
+    # Шаг 4
+    if word[rv:].endswith("нн"):
+        word = word[:-1]
+    else:
+        word, found = _strip(RU_SUPERLATIVE, word, rv)
+        if found and word.endswith("нн"):
+            word = word[:-1]
+        elif word[rv:].endswith("ь"):
+            word = word[:-1]
+    return word
+
+
+# --- Английский язык --------------------------------------------------------------------------------------------------
+
+EN_VOWEL_RE = re.compile(r"[aeiouy]")
+EN_SUFFIXES = (
+    ("ational", "ate"), ("tional", "tion"), ("ization", "ize"), ("iveness", "ive"), ("fulness", "ful"),
+    ("ousness", "ous"), ("ation", "ate"), ("alism", "al"), ("ality", "al"), ("ivity", "ive"), ("bility", "ble"),
+    ("ness", ""), ("ment", ""), ("ful", ""), ("able", ""), ("ible", ""), ("ator", "ate"),
+)
+
+
+def stem_english(word):
+    if len(word) <= 3 or not word.isalpha():
+        return word
+
+    # Множественное число
+    if word.endswith("sses"):
+        word = word[:-2]
+    elif word.endswith("ies"):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith(("ss", "us")) and EN_VOWEL_RE.search(word[:-2]):
+        word = word[:-1]
+
+    # Прошедшее время и герундий
+    for suffix in ("eed", "ed", "ing"):
+        if word.endswith(suffix):
+            stem = word[:-len(suffix)]
+            if suffix == "eed":
+                word = stem + "ee"
+            elif EN_VOWEL_RE.search(stem) and len(stem) > 2:
+                if stem.endswith(("at", "bl", "iz")):
+                    stem += "e"
+                elif len(stem) > 1 and stem[-1] == stem[-2] and stem[-1] not in "lsz":
+                    stem = stem[:-1]
+                word = stem
+            break
+
+    if word.endswith("y") and len(word) > 2 and word[-2] not in "aeiou":
+        word = word[:-1] + "i"
+
+    for suffix, replacement in EN_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) > 2:
+            word = word[:-len(suffix)] + replacement
+            break
+
+    if word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Разбивает текст на слова в нижнем регистре."""
+    return TOKEN_RE.findall((text or "").lower().replace("ё", "е"))
+
+
+def stem(token):
+    """Выбирает стеммер по алфавиту слова."""
+    if CYRILLIC_RE.search(token):
+        return stem_russian(token)
+    return stem_english(token)
+
+
+def analyze(text):
+    """Токенизирует текст и приводит каждое слово к основе."""
+    return [stem(token) for token in tokenize(text)]
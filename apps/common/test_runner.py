@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """
+    Тестовый раннер, который включает проверку query_budget представлений: любой тест, вызвавший представление
+    с превышением бюджета запросов, падает с QueryBudgetExceeded. Тесты идут в одном процессе с кэшем в памяти, поэтому
+    номер воркера генератора кодов задается явно, если не задан в окружении.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.PERF_ENFORCE_QUERY_BUDGETS = True
+        if settings.CODE_WORKER_ID is None:
+            settings.CODE_WORKER_ID = 0
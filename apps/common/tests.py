@@ -1,3 +1,615 @@
-from django.test import TestCase
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from PIL import Image
+from rest_framework.exceptions import ParseError
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.common import benchmark, codes, idempotency, images
+from apps.accounts.models import User
+from apps.common.cache import (
+    DjangoCacheBackend, LocMemLRUBackend, VersionedCache, cached_json_response, get_cache_backend,
+)
+from apps.common.compiled import compile_serializer
+from apps.common.serializers import RenditionField
+from apps.common.metrics import Histogram, registry
+from apps.common.projection import get_projection
+from apps.common.renderers import ORJSONParser, ORJSONRenderer, stream_json_array
+from apps.common.middleware import QueryBudgetExceeded
+from apps.common.models import IdempotencyKey
+from apps.profiles.models import Order, OrderItem, ShippingAddress
+from apps.profiles.serializers import ShippingAddressSerializer
+from apps.sellers.models import Seller
+from apps.shop.cache import categories_cache
+from apps.shop.models import Category, Product
+from apps.shop.serializers import CategorySerializer, ProductSerializer
+from apps.shop.views import ProductsView
+
+
+class PerformanceMiddlewareTest(TestCase):
+    def setUp(self):
+        registry.reset()
+        Category.objects.create(name="Phones", image="category_images/apple.jpg")
+
+    def test_server_timing_and_metrics(self):
+        response = self.client.get("/shop/products/")
+        self.assertIn('db;dur=', response["Server-Timing"])
+        self.assertIn("1 queries", response["Server-Timing"])
+
+        stats = registry.snapshot()["GET ProductsView"]
+        self.assertEqual(stats["requests"], 1)
+        self.assertEqual(stats["queries"]["max"], 1)
+        self.assertEqual(stats["avg_response_bytes"], len(response.content))
+
+    def test_query_budget_is_enforced_in_tests(self):
+        with mock.patch.object(ProductsView, "query_budget", {"GET": 0}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get("/shop/products/")
+
+
+class HistogramTest(TestCase):
+    def test_percentiles(self):
+        histogram = Histogram((1, 10, 100, float("inf")))
+        for value in [0.5] * 90 + [50] * 9 + [500]:
+            histogram.observe(value)
+        self.assertEqual(histogram.percentile(50), 1)
+        self.assertEqual(histogram.percentile(95), 100)
+        self.assertEqual(histogram.percentile(100), 500)
+
+
+class BenchmarkTest(TestCase):
+    def test_scenarios_run_without_errors(self):
+        dataset = benchmark.seed(users=6, sellers=2, categories=2, products=10, orders=3)
+        scenarios = [s for s in benchmark.build_scenarios(dataset) if s.name != "token_obtain"]
+        results = benchmark.run_in_process(scenarios, iterations=2, warmup=1)
+
+        self.assertEqual(set(results), {s.name for s in scenarios})
+        for name, result in results.items():
+            self.assertEqual(result["errors"], 0, name)
+            self.assertEqual(result["requests"], 2, name)
+
+
+class AsyncViewsTest(TestCase):
+    paths = ["/shop/categories/", "/shop/products/", "/profiles/", "/profiles/shipping_addresses/"]
+
+    def setUp(self):
+        user = User.objects.create_user("Ivan", "Petrov", "buyer@example.com", "password123")
+        ShippingAddress.objects.create(user=user, full_name="Ivan Petrov", email="buyer@example.com")
+        category = Category.objects.create(name="Phones", image="category_images/apple.jpg")
+        Product.objects.create(
+            name="Phone", desc="desc", price_current=Decimal("10.00"), category=category, image1="p.jpg",
+        )
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+
+    async def test_async_views_match_sync_views(self):
+        expected = []
+        for path in self.paths:
+            response = await sync_to_async(self.client.get)(path, headers=self.headers)
+            expected.append((response.status_code, response.content))
+
+        with benchmark.use_async_views(True):
+            actual = []
+            for path in self.paths:
+                response = await self.async_client.get(path, headers=self.headers)
+                self.assertTrue(response.resolver_match.func.view_class.__name__.startswith("Async"))
+                actual.append((response.status_code, response.content))
+        self.assertEqual(actual, expected)
+
+
+    async def test_renditions_are_not_looked_up_on_the_event_loop(self):
+        lookups = []
+
+        def available_renditions(source_name, storage=None):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                lookups.append(source_name)
+                return frozenset()
+            raise AssertionError(f"Проверка миниатюр {source_name} в event loop")
+
+        await sync_to_async(categories_cache.invalidate)()
+        with benchmark.use_async_views(True), mock.patch.object(images, "available_renditions", available_renditions):
+            for path in self.paths:
+                response = await self.async_client.get(path, headers=self.headers)
+                self.assertEqual(response.status_code, 200, path)
+        self.assertIn("category_images/apple.jpg", lookups)
+        self.assertIn("p.jpg", lookups)
+
+class IdempotencyTest(TestCase):
+    """Добавление в корзину не идемпотентно: каждый выполненный запрос увеличивает количество товара."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("Ivan", "Petrov", "buyer@example.com", "password123")
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}", "Idempotency-Key": "retry-1"}
+        category = Category.objects.create(name="Phones", image="category_images/apple.jpg")
+        self.product = Product.objects.create(
+            name="Phone", desc="desc", price_current=Decimal("10.00"), category=category, in_stock=10, image1="p.jpg",
+        )
+        self.data = {"product_slug": self.product.slug, "quantity": 1}
+
+    def post(self, data=None, headers=None):
+        return self.client.post(
+            "/profiles/cart/", data or self.data, content_type="application/json", headers=headers or self.headers,
+        )
+
+    def cart_quantity(self):
+        return sum(OrderItem.objects.values_list("quantity", flat=True))
+
+    def test_retry_replays_stored_response(self):
+        first = self.post()
+        second = self.post()
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((second.status_code, second.content), (first.status_code, first.content))
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(self.cart_quantity(), 1)
+
+        # Ключи разных пользователей не пересекаются
+        other = User.objects.create_user("Petr", "Ivanov", "other@example.com", "password123")
+        self.post(headers={**self.headers, "Authorization": f"Bearer {AccessToken.for_user(other)}"})
+        self.assertEqual(self.cart_quantity(), 2)
+
+    def test_key_reused_for_different_request(self):
+        self.post()
+        response = self.post({**self.data, "quantity": 2})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.cart_quantity(), 1)
+
+    def test_concurrent_duplicate_and_stale_lock(self):
+        self.post()
+        record = IdempotencyKey.objects.get()
+        IdempotencyKey.objects.update(status_code=None)
+        response = self.post()
+        self.assertEqual((response.status_code, response["Retry-After"]), (409, "1"))
+
+        # Запрос, не завершившийся за LOCK_TIMEOUT, больше не держит ключ
+        IdempotencyKey.objects.update(created_at=record.created_at - timedelta(minutes=5))
+        self.assertEqual(self.post().status_code, 201)
+        self.assertEqual(self.cart_quantity(), 2)
+
+    def test_expired_keys(self):
+        self.post()
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        self.assertEqual(self.post().status_code, 201)
+        self.assertEqual(self.cart_quantity(), 2)
+        self.assertEqual(idempotency.purge_expired(now=timezone.now() + timedelta(days=2)), 1)
+
+    def test_retryable_responses_are_not_stored(self):
+        address = ShippingAddress.objects.create(
+            user=self.user, full_name="Ivan Petrov", email="buyer@example.com", phone="123", address="Lenina 1",
+            city="Moscow", country="Russia", zipcode=101000,
+        )
+        self.post()
+        Product.objects.update(in_stock=0)
+        headers = {**self.headers, "Idempotency-Key": "checkout-1"}
+        checkout = {"shipping_id": str(address.id)}
+        response = self.client.post("/profiles/checkout/", checkout, content_type="application/json", headers=headers)
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(IdempotencyKey.objects.filter(status_code=409).exists())
+
+        # После пополнения склада повтор с тем же ключом оформляет заказ, а не получает сохраненный 409
+        Product.objects.update(in_stock=10)
+        response = self.client.post("/profiles/checkout/", checkout, content_type="application/json", headers=headers)
+        self.assertEqual(response.status_code, 201)
+
+        digest, _ = idempotency.begin("user:1", "throttled", "fingerprint")
+        throttled = HttpResponse(status=429)
+        throttled["Retry-After"] = "30"
+        idempotency.finish(digest, throttled)
+        self.assertEqual(idempotency.begin("user:1", "throttled", "fingerprint"), (digest, None))
+
+    def test_replay_restores_headers(self):
+        digest, _ = idempotency.begin("user:1", "created", "fingerprint")
+        created = HttpResponse(b'{"id": 1}', status=201, content_type="application/json")
+        created["Location"] = "/profiles/orders/1/"
+        created["ETag"] = '"abc"'
+        created["X-Request-Id"] = "not-replayed"
+        idempotency.finish(digest, created)
+
+        _, record = idempotency.begin("user:1", "created", "fingerprint")
+        replayed = idempotency.replay(record)
+        self.assertEqual((replayed.status_code, replayed.content), (201, b'{"id": 1}'))
+        self.assertEqual(
+            (replayed["Content-Type"], replayed["Location"], replayed["ETag"]),
+            ("application/json", "/profiles/orders/1/", '"abc"'),
+        )
+        self.assertFalse(replayed.has_header("X-Request-Id"))
+
+    def test_anonymous_keys_are_scoped_by_client(self):
+        factory = RequestFactory()
+        first = idempotency.get_scope(factory.post("/auth/", REMOTE_ADDR="10.0.0.1"))
+        second = idempotency.get_scope(factory.post("/auth/", REMOTE_ADDR="10.0.0.2"))
+        self.assertNotEqual(first, second)
+        self.assertEqual(first, idempotency.get_scope(factory.post("/auth/", REMOTE_ADDR="10.0.0.1")))
+
+    def test_token_responses_are_not_stored(self):
+        credentials = {"email": "buyer@example.com", "password": "password123"}
+        headers = {"Idempotency-Key": "login-1"}
+        for _ in range(2):
+            response = self.client.post("/auth/token/", credentials, content_type="application/json", headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.has_header("Idempotent-Replayed"))
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    async def test_async_retry_replays_stored_response(self):
+        kwargs = {"content_type": "application/json", "headers": self.headers}
+        first = await self.async_client.post("/profiles/cart/", self.data, **kwargs)
+        second = await self.async_client.post("/profiles/cart/", self.data, **kwargs)
+        self.assertEqual((second.status_code, second.content), (first.status_code, first.content))
+        self.assertEqual(await sync_to_async(self.cart_quantity)(), 1)
+
+
+class CompiledSerializerTest(TestCase):
+    def test_matches_drf_output(self):
+        benchmark.seed(users=6, sellers=2, categories=2, products=10, orders=0)
+        Product.objects.filter(slug="product-0").update(seller=None, price_old=None, image2="product_images/a b.jpg")
+        products = list(Product.objects.select_related("category", "seller", "seller__user"))
+
+        for serializer_class, instances in [
+            (ProductSerializer, products),
+            (CategorySerializer, Category.objects.all()),
+            (ShippingAddressSerializer, ShippingAddress.objects.all()),
+        ]:
+            expected = JSONRenderer().render(serializer_class(instances, many=True).data)
+            self.assertEqual(compile_serializer(serializer_class).render(instances, many=True), expected)
+        self.assertEqual(benchmark.compare_serializers(products=10, repeat=1)["products"], 10)
+
+    def test_generic_fallbacks(self):
+        class ItemSerializer(serializers.Serializer):
+            name = serializers.CharField()
+
+        class OwnerSerializer(serializers.Serializer):
+            full_name = serializers.CharField(source="get_full_name")
+            city = serializers.CharField(source="address.city", default="-")
+            phone = serializers.CharField(source="address.phone", required=False)
+            items = ItemSerializer(many=True)
+            created = serializers.DateTimeField(source="joined")
+
+        owner = SimpleNamespace(
+            get_full_name=lambda: "Ivan Petrov", address=None, items=[{"name": "a"}, SimpleNamespace(name=1)],
+            joined=timezone.now(),
+        )
+        for instance in (owner, {**vars(owner), "address": {"city": "Moscow", "phone": "+7"}}):
+            self.assertEqual(compile_serializer(OwnerSerializer).to_representation(instance),
+                             OwnerSerializer(instance).data)
+
+
+class ProjectionTest(TestCase):
+    def test_values_rows_serialize_like_models(self):
+        benchmark.seed(users=6, sellers=2, categories=2, products=10, orders=0)
+        Product.objects.filter(slug="product-0").update(seller=None, image2="product_images/extra.jpg")
+        User.objects.filter(email="user1@bench.local").update(avatar=None)
+        projection = get_projection(Product, ProductSerializer)
+        self.assertIn("seller__user__avatar", projection.fields)
+        self.assertNotIn("seller__bank_name", projection.fields)
+
+        products = Product.objects.order_by("id")
+        with self.assertNumQueries(1):
+            rows = list(projection.values(products))
+        expected = JSONRenderer().render(
+            ProductSerializer(products.select_related("category", "seller", "seller__user"), many=True).data
+        )
+        self.assertEqual(JSONRenderer().render(ProductSerializer(rows, many=True).data), expected)
+        self.assertEqual(compile_serializer(ProductSerializer).render(rows, many=True), expected)
+        with self.assertNumQueries(1):
+            rendered = compile_serializer(ProductSerializer).render(projection.only(products), many=True)
+        self.assertEqual(rendered, expected)
+
+    def test_incomplete_projection(self):
+        class OrderItemTotalSerializer(serializers.Serializer):
+            product = ProductSerializer()
+            total = serializers.DecimalField(source="get_total", max_digits=12, decimal_places=2)
+
+        projection = get_projection(OrderItem, OrderItemTotalSerializer)
+        self.assertEqual(projection.unresolved, ["OrderItemTotalSerializer.total"])
+        self.assertIn("product__seller__user", projection.relations)
+        with self.assertRaises(TypeError):
+            projection.values(OrderItem.objects.all())
+        # Столбцы не ограничиваются: свойству get_total могут понадобиться любые поля
+        self.assertEqual(projection.only(OrderItem.objects.all()).query.deferred_loading, (frozenset(), True))
+
+
+class RendererTest(TestCase):
+    data = {
+        "price": Decimal("10.50"),
+        "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "created_at": datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+        "date": date(2025, 1, 2),
+        "label": gettext_lazy("Phones"),
+        "items": [{"name": "Телефон", "count": 1}, None, True],
+    }
+
+    def test_orjson_renderer_matches_drf(self):
+        self.assertEqual(ORJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_orjson_parser(self):
+        parsed = ORJSONParser().parse(io.BytesIO('{"name": "Телефон", "n": [1, 2.5]}'.encode()))
+        self.assertEqual(parsed, {"name": "Телефон", "n": [1, 2.5]})
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"name": NaN}'))
+
+    def test_stream_json_array(self):
+        rows = [{"n": i, "price": Decimal(i)} for i in range(7)]
+        for items in (rows, []):
+            streamed = b"".join(stream_json_array(iter(items), chunk_size=3))
+            self.assertEqual(streamed, JSONRenderer().render(items))
+
+
+class RenditionsTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root, IMAGE_RENDITIONS={"EXECUTOR": "sync"})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cache.clear()
+        images.forget_availability()
+        self.addCleanup(images.forget_availability)
+
+    def upload(self, name, color="red"):
+        buffer = io.BytesIO()
+        Image.new("RGB", (1000, 600), color).save(buffer, "JPEG")
+        return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    def test_generation_shares_blob_through_hard_links(self):
+        first, second = self.upload("products/a.jpg"), self.upload("products/b.jpg")
+        images.schedule_renditions([first, second])
+
+        for rendition, size in images.get_config()["SIZES"].items():
+            paths = [default_storage.path(images.rendition_name(name, rendition)) for name in (first, second)]
+            self.assertEqual(os.stat(paths[0]).st_ino, os.stat(paths[1]).st_ino)
+            self.assertGreaterEqual(os.stat(paths[0]).st_nlink, 3)  # блоб и две ссылки
+            with Image.open(paths[0]) as image:
+                self.assertLessEqual(image.width, size[0])
+        blobs = os.listdir(default_storage.path("renditions/blobs"))
+        self.assertEqual(len(blobs), 1)
+
+    def test_url_falls_back_to_original_until_generated(self):
+        name = self.upload("products/c.jpg")
+        field = RenditionField(rendition="thumb")
+        original = Category(name="Phones", image=name).image
+        self.assertEqual(field.to_representation(original), default_storage.url(name))
+
+        # Отсутствие рендиции запоминается: до перепроверки хранилище не опрашивается
+        with mock.patch.object(default_storage.__class__, "exists", side_effect=AssertionError):
+            self.assertIsNone(images.rendition_url(name, "thumb"))
+
+        images.forget_availability()
+        images.generate_renditions(name)
+        expected = default_storage.url(images.rendition_name(name, "thumb"))
+        self.assertEqual(field.to_representation(original), expected)
+        self.assertTrue(expected.startswith("/media/renditions/products/c.jpg.thumb."))
+
+    def test_availability_is_read_from_cache_without_storage_access(self):
+        name = self.upload("products/d.jpg")
+        images.generate_renditions(name)
+
+        with mock.patch.object(default_storage.__class__, "exists", side_effect=AssertionError), \
+                mock.patch("os.path.exists", side_effect=AssertionError):
+            images.forget_availability()  # другой процесс: сведения только в кэше
+            self.assertIsNotNone(images.rendition_url(name, "medium"))
+            cache.clear()  # в этом процессе исходник уже запомнен
+            self.assertIsNotNone(images.rendition_url(name, "thumb"))
+
+    def test_generated_renditions_change_list_validator(self):
+        user = User.objects.create_user("Ivan", "Petrov", "seller@example.com", "password123")
+        seller = Seller.objects.create(
+            user=user, business_name="Phone Shop", inn_identification_number="7700000000", phone_number="123",
+            business_description="desc", business_address="Lenina 1", city="Moscow", postal_code="101000",
+            bank_name="Bank", bank_bic_number="044525225", bank_account_number="1", bank_routing_number="1",
+            is_approved=True,
+        )
+        category = Category.objects.create(name="Phones", image="c.jpg")
+        name = self.upload("products/f.jpg")
+        with self.captureOnCommitCallbacks() as callbacks:
+            Product.objects.create(
+                seller=seller, name="Phone", desc="desc", price_current=Decimal("10.00"), category=category,
+                image1=name,
+            )
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get("/sellers/products/")
+        self.assertEqual(response.json()[0]["image1_thumb"], default_storage.url(name))
+
+        for callback in callbacks:
+            callback()
+        response = client.get("/sellers/products/", headers={"If-None-Match": response["ETag"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["image1_thumb"], default_storage.url(images.rendition_name(name, "thumb")))
+
+    def test_category_thumbnail_invalidates_categories_cache(self):
+        name = self.upload("category_images/g.jpg")
+        with self.captureOnCommitCallbacks() as callbacks:
+            Category.objects.create(name="Phones", image=name)
+        categories_cache.invalidate()
+        self.assertEqual(self.client.get("/shop/categories/").json()[0]["image_thumb"], default_storage.url(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for callback in callbacks:
+                callback()
+        thumb = default_storage.url(images.rendition_name(name, "thumb"))
+        self.assertEqual(self.client.get("/shop/categories/").json()[0]["image_thumb"], thumb)
+
+    def test_lost_cache_key_is_restored_from_storage(self):
+        name = self.upload("products/e.jpg")
+        images.generate_renditions(name)
+        cache.clear()
+        images.forget_availability()
+
+        self.assertIsNotNone(images.rendition_url(name, "thumb"))
+        self.assertEqual(set(cache.get(images._availability_key(name))), set(images.get_config()["SIZES"]))
+
+
+class VersionedCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.renders = 0
+
+    def render(self):
+        self.renders += 1
+        return f'{{"render": {self.renders}}}'.encode()
+
+    def test_default_backend_is_shared_django_cache(self):
+        self.assertIsInstance(get_cache_backend(), DjangoCacheBackend)
+
+    def test_read_through_and_version_bump(self):
+        for backend in (DjangoCacheBackend(), LocMemLRUBackend()):
+            self.renders = 0
+            with self.subTest(backend=type(backend).__name__), \
+                    mock.patch("apps.common.cache.get_cache_backend", return_value=backend):
+                versioned = VersionedCache("test:versioned")
+                first = versioned.get_or_set(self.render)
+                self.assertEqual(versioned.get_or_set(self.render).etag, first.etag)
+                self.assertEqual(self.renders, 1)
+
+                versioned.invalidate()
+                second = versioned.get_or_set(self.render)
+                self.assertEqual(self.renders, 2)
+                self.assertNotEqual(second.etag, first.etag)
+
+                payload = async_to_sync(versioned.aget_or_set)(sync_to_async(self.render))
+                self.assertEqual(payload.content, second.content)
+                self.assertEqual(self.renders, 2)
+
+    def test_version_is_shared_between_instances(self):
+        # Два экземпляра с одним пространством имен — как два процесса поверх одного кэша
+        writer, reader = VersionedCache("test:shared"), VersionedCache("test:shared")
+        first = reader.get_or_set(self.render)
+        writer.invalidate()
+        self.assertNotEqual(reader.get_or_set(self.render).content, first.content)
+
+    def test_evicted_version_does_not_revive_old_payload(self):
+        versioned = VersionedCache("test:evicted")
+        first = versioned.get_or_set(self.render)
+        cache.delete(versioned.version_key)
+        versioned.invalidate()
+        self.assertNotEqual(versioned.get_or_set(self.render).content, first.content)
+
+    def test_cached_json_response(self):
+        payload = VersionedCache("test:response").get_or_set(self.render)
+        factory = RequestFactory()
+
+        response = cached_json_response(factory.get("/"), payload)
+        self.assertEqual((response.status_code, response.content), (200, payload.content))
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response["ETag"], payload.etag)
+
+        for if_none_match in (payload.etag, f'"other", {payload.etag}', "*"):
+            response = cached_json_response(factory.get("/", HTTP_IF_NONE_MATCH=if_none_match), payload)
+            self.assertEqual((response.status_code, response.content), (304, b""))
+            self.assertEqual(response["ETag"], payload.etag)
+
+        response = cached_json_response(factory.get("/", HTTP_IF_NONE_MATCH='"other"'), payload)
+        self.assertEqual(response.status_code, 200)
+
+    def test_categories_etag_changes_after_invalidation(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="Phones", image="category_images/apple.jpg")
+        etag = self.client.get("/shop/categories/")["ETag"]
+        self.assertEqual(self.client.get("/shop/categories/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="Laptops", image="category_images/apple.jpg")
+        response = self.client.get("/shop/categories/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class CodeGeneratorTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def decode(self, code):
+        number = 0
+        for char in code:
+            number = number * 32 + codes.ALPHABET.index(char)
+        return number
+
+    def test_format_and_monotonicity(self):
+        generated = [codes.generate_code() for _ in range(100)] + codes.generate_codes(100)
+        self.assertTrue(all(len(code) == codes.CODE_LENGTH and set(code) <= set(codes.ALPHABET) for code in generated))
+        self.assertEqual(generated, sorted(generated))
+        self.assertEqual(len(set(generated)), len(generated))
+        self.assertEqual(codes.encode(0), "0" * codes.CODE_LENGTH)
+        self.assertEqual(self.decode(codes.encode(2 ** 63 + 5)), 2 ** 63 + 5)
+
+    def test_sequence_overflow_and_clock_going_back(self):
+        generator = codes.CodeGenerator(worker_id=7)
+        now = (codes.EPOCH_MS + 1000) / 1000
+        with mock.patch("apps.common.codes.time.time", return_value=now):
+            numbers = [self.decode(code) for code in generator.allocate(codes.MAX_SEQUENCE + 3)]
+        with mock.patch("apps.common.codes.time.time", return_value=now - 5):
+            numbers.append(self.decode(generator.generate()))
+
+        self.assertEqual(numbers, sorted(set(numbers)))
+        shift = codes.WORKER_BITS + codes.SEQUENCE_BITS
+        # Переполненный счетчик переносит коды в следующую миллисекунду, а не повторяет их
+        self.assertEqual([number >> shift for number in numbers[codes.MAX_SEQUENCE:]], [1000, 1001, 1001, 1001])
+        self.assertTrue(all((number >> codes.SEQUENCE_BITS) & codes.MAX_WORKER_ID == 7 for number in numbers))
+
+    def test_worker_ids_are_leased(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        shared = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": directory}}
+        with override_settings(CODE_WORKER_ID=None, CACHES=shared):
+            self.check_leases()
+
+        # Кэш в памяти у каждого процесса свой: аренда на нем выдала бы всем воркерам одни и те же номера
+        with override_settings(CODE_WORKER_ID=None):
+            with self.assertRaises(ImproperlyConfigured):
+                codes.CodeGenerator().worker_id
+
+    def check_leases(self):
+        first, second = codes.CodeGenerator(), codes.CodeGenerator()
+        self.assertNotEqual(first.worker_id, second.worker_id)
+        self.assertEqual(first.worker_id, first.worker_id)
+
+        # Аренда истекла и ее перехватил другой процесс: при продлении берется новый номер
+        taken = first.worker_id
+        cache.set(codes._lease_key(taken), "someone else")
+        first._renew_at = 0
+        self.assertNotEqual(first.worker_id, taken)
+
+        second_id = second.worker_id
+        second.release()
+        self.assertIsNone(cache.get(codes._lease_key(second_id)))
+
+    def test_configured_worker_id(self):
+        with override_settings(CODE_WORKER_ID=5):
+            self.assertEqual(codes.CodeGenerator().worker_id, 5)
+            self.assertIsNone(cache.get(codes._lease_key(5)))
+        with override_settings(CODE_WORKER_ID=codes.MAX_WORKER_ID + 1):
+            with self.assertRaises(ImproperlyConfigured):
+                codes.CodeGenerator().worker_id
+
+    def test_save_with_unique_code_retries_taken_code(self):
+        user = User.objects.create_user("Petr", "Ivanov", "buyer@example.com", "password123")
+        existing = Order.objects.create(user=user, address="Lenina 2")
+        order = Order.objects.create(user=user, address="Lenina 2", tx_ref=existing.tx_ref)
+        self.assertNotEqual(order.tx_ref, existing.tx_ref)
+        self.assertEqual(Order.objects.count(), 2)
+
+        with mock.patch("apps.common.codes.generate_code", return_value=existing.tx_ref):
+            with self.assertRaises(IntegrityError):
+                Order.objects.create(user=user, address="Lenina 2", tx_ref=existing.tx_ref)
@@ -1,3 +1,37 @@
-from django.shortcuts import render
+from drf_spectacular.utils import extend_schema
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from apps.common.metrics import registry
+
+tags = ["Common"]
+
+
+class PerformanceMetricsView(APIView):
+    """
+    Агрегированные метрики производительности по endpoint'ам текущего процесса (см. PerformanceMiddleware).
+    """
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        summary="Performance Metrics",
+        description="""
+            Этот endpoint возвращает гистограммы времени ответа, времени в БД, количества запросов и повторяющихся
+            запросов по каждому endpoint'у с момента запуска процесса.
+        """,
+        tags=tags,
+    )
+    def get(self, request, *args, **kwargs):
+        return Response(data=registry.snapshot())
+
+    @extend_schema(
+        summary="Reset Performance Metrics",
+        description="""
+            Этот endpoint сбрасывает накопленные метрики.
+        """,
+        tags=tags,
+    )
+    def delete(self, request, *args, **kwargs):
+        registry.reset()
+        return Response(data={"message": "Metrics reset"})
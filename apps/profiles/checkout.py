@@ -0,0 +1,91 @@
+"""
+Оформление заказа из корзины. Корзина — это позиции OrderItem пользователя без заказа (order=None).
+Все шаги выполняются в одной транзакции фиксированным числом запросов, независимо от размера корзины.
+"""
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+
+from apps.profiles.models import Order, OrderItem
+from apps.shop import stock
+
+# Поля адреса доставки, которые копируются в заказ
+ADDRESS_FIELDS = ("full_name", "email", "phone", "address", "city", "country", "zipcode")
+
+
+class EmptyCart(Exception):
+    """В корзине нет товаров."""
+
+
+class CartChanged(Exception):
+    """Позиции корзины изменились во время оформления (например, их уже оформил параллельный запрос)."""
+
+
+class ProductsUnavailable(Exception):
+    """В корзине есть товары, снятые с продажи (мягко удаленные) после добавления в корзину."""
+
+    def __init__(self, product_ids):
+        self.product_ids = product_ids
+        super().__init__(f"Products are no longer available: {', '.join(str(pk) for pk in product_ids)}")
+
+
+def cart_items(user):
+    return OrderItem.objects.filter(user=user, order__isnull=True)
+
+
+def cart_total(user):
+    """Сумма корзины одним агрегирующим запросом."""
+    line_total = F("quantity") * F("product__price_current")
+    return cart_items(user).aggregate(
+        total=Sum(line_total, output_field=DecimalField(max_digits=12, decimal_places=2), default=0)
+    )["total"]
+
+
+def checkout(user, shipping_address):
+    """
+    Создает заказ из корзины пользователя: списывает товары со склада, копирует адрес доставки в заказ и
+    привязывает к нему все позиции корзины одним update(), сохраняя в позициях снимок цены, а в заказе — итоги.
+    При нехватке товара выбрасывает apps.shop.stock.InsufficientStock, при пустой корзине — EmptyCart, если в корзине
+    есть снятые с продажи товары — ProductsUnavailable, если позиции успел оформить параллельный запрос — CartChanged;
+    во всех случаях ничего не меняется.
+    """
+    with transaction.atomic():
+        # Позиции блокируются до конца транзакции: параллельное оформление той же корзины ждет и видит их уже
+        # привязанными к заказу, а не списывает товары второй раз
+        rows = list(
+            cart_items(user).select_for_update(of=("self",))
+            .values_list("id", "product_id", "quantity", "product__price_current", "product__is_deleted")
+        )
+        if not rows:
+            raise EmptyCart()
+        # Удаленный товар не резервируется (резерв списывает только живые строки) и дал бы ложную нехватку на складе
+        unavailable = sorted({product_id for _, product_id, _, _, is_deleted in rows if is_deleted})
+        if unavailable:
+            raise ProductsUnavailable(unavailable)
+        lines = [row[:4] for row in rows]
+
+        reservation = stock.reserve([(product_id, quantity) for _, product_id, quantity, _ in lines], user=user)
+        stock.commit(reservation)
+
+        line_totals = {line_id: price * quantity for line_id, _, quantity, price in lines}
+        order = Order.objects.create(
+            user=user, total=sum(line_totals.values()), item_count=sum(quantity for _, _, quantity, _ in lines),
+            **{field: getattr(shipping_address, field) for field in ADDRESS_FIELDS},
+        )
+        # Привязываем только те позиции, что были прочитаны выше, чтобы не захватить добавленные параллельно. Если
+        # часть из них уже в другом заказе (БД без SELECT ... FOR UPDATE), транзакция откатывается вместе со списанием
+        attached = OrderItem.objects.filter(id__in=line_totals, order__isnull=True).update(
+            order=order,
+            unit_price=_per_line({line_id: price for line_id, _, _, price in lines}, max_digits=10),
+            line_total=_per_line(line_totals, max_digits=12),
+        )
+        if attached != len(lines):
+            raise CartChanged()
+    return order
+
+
+def _per_line(values, max_digits):
+    """CASE по id позиции: значение для каждой позиции в одном UPDATE."""
+    return Case(
+        *[When(id=line_id, then=Value(value)) for line_id, value in values.items()],
+        output_field=DecimalField(max_digits=max_digits, decimal_places=2),
+    )
@@ -0,0 +1,46 @@
+from django.db import models
+from django.db.models import DecimalField, OuterRef, Prefetch, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from apps.common.managers import GetOrNoneManager, GetOrNoneQuerySet
+
+
+class OrderQuerySet(GetOrNoneQuerySet):
+    """
+    QuerySet заказов. Итоги заказа (total, item_count) хранятся в самом заказе, поэтому история заказов читается без
+    соединения с позициями и товарами.
+    """
+
+    def refresh_totals(self):
+        """
+        Пересчитывает total и item_count заказов по снимкам цен позиций одним UPDATE. Вызывается после изменения
+        позиций в обход OrderItem.save() (bulk_create, update()).
+        """
+        order_item_model = self.model._meta.get_field("orderitems").related_model
+        items = order_item_model.objects.filter(order_id=OuterRef("pk")).order_by().values("order_id")
+        return self.update(
+            total=Coalesce(
+                Subquery(items.annotate(total=Sum("line_total")).values("total")),
+                Value(0),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+            item_count=Coalesce(Subquery(items.annotate(count=Sum("quantity")).values("count")), Value(0)),
+        )
+
+    def with_items(self):
+        """
+        Подгружает пользователя и позиции заказа вместе с товарами: два запроса на всю страницу независимо от
+        количества позиций.
+        """
+        order_item_model = self.model._meta.get_field("orderitems").related_model
+        return self.select_related("user").prefetch_related(
+            Prefetch("orderitems", queryset=order_item_model.objects.select_related("product"))
+        )
+
+
+class OrderManager(GetOrNoneManager):
+    def get_queryset(self):
+        return OrderQuerySet(self.model)
+
+    def with_items(self):
+        return self.get_queryset().with_items()
@@ -0,0 +1,56 @@
+from django.db import migrations, transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 1000
+
+
+def batches(queryset):
+    """id строк queryset пачками по BATCH_SIZE в порядке первичного ключа."""
+    last = None
+    while True:
+        page = queryset.order_by("pk") if last is None else queryset.filter(pk__gt=last).order_by("pk")
+        ids = list(page.values_list("pk", flat=True)[:BATCH_SIZE])
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+def backfill_price_snapshots(apps, schema_editor):
+    """
+    Заполняет снимки цен позиций существующих заказов текущей ценой товара (более точной цены не сохранилось) и
+    итоги заказов. Каждая пачка — отдельная транзакция, чтобы не держать блокировку таблицы на все время миграции.
+    """
+    Order = apps.get_model("profiles", "Order")
+    OrderItem = apps.get_model("profiles", "OrderItem")
+    Product = apps.get_model("shop", "Product")
+
+    price = Subquery(Product.objects.filter(pk=OuterRef("product_id")).values("price_current")[:1])
+    for ids in batches(OrderItem.objects.filter(order__isnull=False, unit_price__isnull=True)):
+        with transaction.atomic():
+            OrderItem.objects.filter(pk__in=ids).update(unit_price=price, line_total=F("quantity") * price)
+
+    items = OrderItem.objects.filter(order_id=OuterRef("pk")).order_by().values("order_id")
+    money = DecimalField(max_digits=12, decimal_places=2)
+    for ids in batches(Order.objects.all()):
+        with transaction.atomic():
+            Order.objects.filter(pk__in=ids).update(
+                total=Coalesce(Subquery(items.annotate(total=Sum("line_total")).values("total")), Value(0),
+                               output_field=money),
+                item_count=Coalesce(Subquery(items.annotate(count=Sum("quantity")).values("count")), Value(0)),
+            )
+
+
+class Migration(migrations.Migration):
+    # Пачки фиксируются по отдельности
+    atomic = False
+
+    dependencies = [
+        ('profiles', '0002_price_snapshots'),
+        ('shop', '0006_soft_delete_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_price_snapshots, migrations.RunPython.noop),
+    ]
@@ -2,7 +2,8 @@ from django.db import models
 
 from apps.accounts.models import User
 from apps.common.models import BaseModel
-from apps.common.utils import generate_unique_code
+from apps.common.codes import generate_code, save_with_unique_code
+from apps.profiles.managers import OrderManager
 from apps.shop.models import Product
 
 
@@ -69,12 +70,14 @@ class Order(BaseModel):
             user (ForeignKey): Пользователь, разместивший заказ;
             tx_ref (str): Уникальная ссылка на транзакцию;
             delivery_status (str): Статус доставки заказа;
-            payment_status (str): статус оплаты заказа.
+            payment_status (str): статус оплаты заказа;
+            total (Decimal): сумма снимков line_total всех позиций заказа;
+            item_count (int): общее количество единиц товара в заказе.
 
         Методы:
             __str__(): Возвращает строковое представление ссылки на транзакцию;
             save(*args, **kwargs): Переопределяет метод сохранения для создания уникальной ссылки на транзакцию при
-            создании нового заказа.
+            создании нового заказа (при конфликте уникальности код генерируется заново).
     """
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="orders")
@@ -83,6 +86,11 @@ class Order(BaseModel):
     payment_status = models.CharField(max_length=20, default="PENDING", choices=PAYMENT_STATUS_CHOICES)
     date_delivered = models.DateTimeField(null=True, blank=True)
 
+    # Денормализованные итоги по позициям: заполняются при оформлении заказа и пересчитываются
+    # OrderQuerySet.refresh_totals() при изменении позиций, поэтому история заказов не обращается к товарам
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_count = models.PositiveIntegerField(default=0)
+
     # Информация об адресе доставки
     full_name = models.CharField(max_length=1000, null=True)
     email = models.EmailField(null=True)
@@ -92,12 +100,17 @@ class Order(BaseModel):
     country = models.CharField(max_length=100, null=True)
     zipcode = models.IntegerField(null=True)
 
+    objects = OrderManager()
+
     def __str__(self):
         return f"{self.user.full_name}'s order"
 
     def save(self, *args, **kwargs):
         if self._state.adding:
-            self.tx_ref = generate_unique_code(Order, "tx_ref")
+            # Код может быть выделен заранее через generate_codes() при массовом создании заказов
+            if not self.tx_ref:
+                self.tx_ref = generate_code()
+            return save_with_unique_code(self, "tx_ref", lambda: super(Order, self).save(*args, **kwargs))
         super().save(*args, **kwargs)
 
 
@@ -108,7 +121,9 @@ class OrderItem(BaseModel):
         Attributes:
             order (ForeignKey): Заказ, к которому относится данный товар;
             product (ForeignKey): Продукт, связанный с данным товаром заказа;
-            quantity (int): Количество заказанного товара.
+            quantity (int): Количество заказанного товара;
+            unit_price (Decimal): Цена товара на момент оформления заказа (у позиций корзины не заполнена);
+            line_total (Decimal): Стоимость позиции на момент оформления заказа — unit_price * quantity.
     """
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
@@ -122,12 +137,28 @@ class OrderItem(BaseModel):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
 
+    # Снимок цены: после оформления заказа изменение цены товара не меняет стоимость заказа
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    line_total = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+
     @property
     def get_total(self):
+        if self.line_total is not None:
+            return self.line_total
+        # Позиция корзины стоит по текущей цене. Для списков подгружайте товары через select_related("product"),
+        # иначе каждый вызов загрузит товар отдельно
         return self.product.price_current * self.quantity
 
     class Meta:
         ordering = ["-created_at"]
 
+    def save(self, *args, **kwargs):
+        # Позиция, добавленная в заказ в обход checkout() (например, в админке), получает снимок текущей цены
+        if self.order_id and self.unit_price is None:
+            self.unit_price = self.product.price_current
+        if self.unit_price is not None:
+            self.line_total = self.unit_price * self.quantity
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return str(self.product.name)
\ No newline at end of file
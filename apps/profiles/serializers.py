@@ -28,3 +28,54 @@ class ShippingAddressSerializer(serializers.Serializer):
     country = serializers.CharField()
     zipcode = serializers.IntegerField()
 
+
+class OrderItemSerializer(serializers.Serializer):
+    """
+    Сериализатор позиции заказа: цена и стоимость берутся из снимка на момент оформления. Товар должен быть подгружен
+    заранее (Order.objects.with_items()).
+    """
+    product_name = serializers.CharField(source="product.name")
+    product_slug = serializers.CharField(source="product.slug")
+    price = serializers.DecimalField(source="unit_price", max_digits=10, decimal_places=2)
+    quantity = serializers.IntegerField()
+    total = serializers.DecimalField(source="get_total", max_digits=12, decimal_places=2)
+
+
+class OrderSerializer(serializers.Serializer):
+    """
+    Сериализатор заказа для истории заказов. Поля total и item_count хранятся в заказе.
+    """
+    tx_ref = serializers.CharField()
+    delivery_status = serializers.CharField()
+    payment_status = serializers.CharField()
+    date_delivered = serializers.DateTimeField()
+    created_at = serializers.DateTimeField()
+    total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    item_count = serializers.IntegerField()
+    orderitems = OrderItemSerializer(many=True)
+
+
+class CartItemSerializer(OrderItemSerializer):
+    """
+    Сериализатор позиции корзины (OrderItem без заказа): цена текущая, снимка еще нет.
+    """
+    price = serializers.DecimalField(source="product.price_current", max_digits=10, decimal_places=2)
+    id = serializers.UUIDField(read_only=True)
+
+
+class CartSerializer(serializers.Serializer):
+    items = CartItemSerializer(many=True)
+    total = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class AddToCartSerializer(serializers.Serializer):
+    product_slug = serializers.SlugField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class UpdateCartItemSerializer(serializers.Serializer):
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class CheckoutSerializer(serializers.Serializer):
+    shipping_id = serializers.UUIDField()
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.profiles.models import Order, OrderItem
+
+
+@receiver([post_save, post_delete], sender=OrderItem)
+def refresh_order_totals(sender, instance, **kwargs):
+    """Пересчитывает итоги заказа после изменения или удаления его позиции (позиции корзины пропускаются)."""
+    if instance.order_id:
+        Order.objects.filter(pk=instance.order_id).refresh_totals()
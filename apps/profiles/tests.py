@@ -1,3 +1,276 @@
-from django.test import TestCase
+import threading
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.db import OperationalError, connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from apps.accounts.models import User
+from apps.profiles import checkout
+from apps.profiles.models import Order, OrderItem, ShippingAddress
+from apps.shop.models import Category, Product
+
+
+class OrdersViewTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("Ivan", "Petrov", "buyer@example.com", "password123")
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name="Phones", image="category_images/apple.jpg")
+        self.products = [
+            Product.objects.create(
+                name=f"Phone {i}", desc="desc", price_current=Decimal("10.50") + i, category=category, image1="p.jpg"
+            )
+            for i in range(10)
+        ]
+
+    def create_order(self, items_count):
+        order = Order.objects.create(user=self.user, address="Moscow")
+        OrderItem.objects.bulk_create(
+            OrderItem(
+                user=self.user, order=order, product=product, quantity=2, unit_price=product.price_current,
+                line_total=product.price_current * 2,
+            )
+            for product in self.products[:items_count]
+        )
+        Order.objects.filter(pk=order.pk).refresh_totals()
+        return order
+
+    def fetch_orders_query_count(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/profiles/orders/")
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_totals_are_aggregated_in_db(self):
+        self.create_order(3)
+        response, _ = self.fetch_orders_query_count()
+        order = response.data["results"][0]
+        self.assertEqual(order["item_count"], 6)
+        self.assertEqual(Decimal(order["total"]), (Decimal("10.50") + Decimal("11.50") + Decimal("12.50")) * 2)
+        self.assertEqual(len(order["orderitems"]), 3)
+
+    def test_item_changes_refresh_order_totals(self):
+        order = Order.objects.create(user=self.user, address="Moscow")
+        item = OrderItem.objects.create(user=self.user, order=order, product=self.products[0], quantity=1)
+        self.assertEqual((item.unit_price, item.line_total), (Decimal("10.50"), Decimal("10.50")))
+
+        item.quantity = 3
+        item.save()
+        order.refresh_from_db()
+        self.assertEqual((order.total, order.item_count), (Decimal("31.50"), 3))
+
+        item.delete()
+        order.refresh_from_db()
+        self.assertEqual((order.total, order.item_count), (Decimal("0.00"), 0))
+
+    def test_query_count_does_not_depend_on_items(self):
+        self.create_order(1)
+        _, small_count = self.fetch_orders_query_count()
+
+        for _ in range(5):
+            self.create_order(10)
+        response, large_count = self.fetch_orders_query_count()
+
+        self.assertEqual(len(response.data["results"]), 6)
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(large_count, 2)
+
+
+class CheckoutViewTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("Ivan", "Petrov", "buyer@example.com", "password123")
+        self.client.force_authenticate(self.user)
+        self.address = ShippingAddress.objects.create(
+            user=self.user, full_name="Ivan Petrov", email="buyer@example.com", phone="123", address="Lenina 1",
+            city="Moscow", country="Russia", zipcode=101000,
+        )
+        self.category = Category.objects.create(name="Phones", image="category_images/apple.jpg")
+
+    def fill_cart(self, size):
+        for i in range(size):
+            product = Product.objects.create(
+                name=f"Phone {i}", desc="desc", price_current=Decimal("10.00"), category=self.category, in_stock=3,
+                image1="p.jpg",
+            )
+            response = self.client.post("/profiles/cart/", {"product_slug": product.slug, "quantity": 2})
+            self.assertEqual(response.status_code, 201)
+
+    def checkout_query_count(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post("/profiles/checkout/", {"shipping_id": self.address.id})
+        self.assertEqual(response.status_code, 201, response.data)
+        return response, len(context.captured_queries)
+
+    def test_checkout_creates_order_from_cart(self):
+        self.fill_cart(3)
+        response, _ = self.checkout_query_count()
+
+        self.assertEqual(response.data["item_count"], 6)
+        self.assertEqual(Decimal(response.data["total"]), Decimal("60.00"))
+        order = Order.objects.get()
+        self.assertEqual((order.full_name, order.city, order.zipcode), ("Ivan Petrov", "Moscow", 101000))
+        self.assertFalse(OrderItem.objects.filter(order__isnull=True).exists())
+        self.assertEqual(list(Product.objects.values_list("in_stock", flat=True).distinct()), [1])
+
+    def test_repricing_does_not_change_placed_order(self):
+        self.fill_cart(2)
+        self.checkout_query_count()
+        Product.objects.update(price_current=Decimal("99.00"))
+
+        response = self.client.get("/profiles/orders/")
+        order = response.data["results"][0]
+        self.assertEqual(Decimal(order["total"]), Decimal("40.00"))
+        self.assertEqual({item["price"] for item in order["orderitems"]}, {"10.00"})
+        self.assertEqual({item["total"] for item in order["orderitems"]}, {"20.00"})
+
+    def test_query_count_does_not_depend_on_cart_size(self):
+        self.fill_cart(1)
+        _, small_count = self.checkout_query_count()
+
+        self.fill_cart(20)
+        _, large_count = self.checkout_query_count()
+        self.assertEqual(small_count, large_count)
+
+    def test_insufficient_stock_keeps_cart(self):
+        self.fill_cart(1)
+        Product.objects.update(in_stock=1)
+        response = self.client.post("/profiles/checkout/", {"shipping_id": self.address.id})
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(OrderItem.objects.filter(order__isnull=True).count(), 1)
+
+    def test_deleted_products_are_reported(self):
+        self.fill_cart(2)
+        deleted = Product.objects.order_by("name").first()
+        deleted.delete()
+        response = self.client.post("/profiles/checkout/", {"shipping_id": self.address.id})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["products"], [str(deleted.id)])
+        self.assertEqual(response.data["message"], "Товары сняты с продажи, удалите их из корзины")
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(list(Product.objects.unfiltered().values_list("in_stock", flat=True).distinct()), [3])
+
+    def test_empty_cart(self):
+        response = self.client.post("/profiles/checkout/", {"shipping_id": self.address.id})
+        self.assertEqual(response.status_code, 400)
+
+    def test_add_to_cart_counts_quantity_already_in_cart(self):
+        self.fill_cart(1)
+        product = Product.objects.get()
+        response = self.client.post("/profiles/cart/", {"product_slug": product.slug, "quantity": 2})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post("/profiles/cart/", {"product_slug": product.slug, "quantity": 1})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["items"][0]["quantity"], 3)
+
+    def test_lines_taken_by_parallel_checkout_roll_back(self):
+        self.fill_cart(2)
+        other = Order.objects.create(user=self.user, address="Lenina 1")
+        commit = checkout.stock.commit
+
+        def commit_after_parallel_checkout(reservation):
+            # Параллельный запрос успел привязать позиции к своему заказу между чтением и привязкой
+            OrderItem.objects.filter(user=self.user, order__isnull=True).update(order=other)
+            return commit(reservation)
+
+        with mock.patch.object(checkout.stock, "commit", commit_after_parallel_checkout):
+            response = self.client.post("/profiles/checkout/", {"shipping_id": self.address.id})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(list(Order.objects.all()), [other])
+        self.assertEqual(OrderItem.objects.filter(order__isnull=True).count(), 2)
+        self.assertEqual(list(Product.objects.values_list("in_stock", flat=True).distinct()), [3])
+
+
+class CheckoutConcurrencyTest(TransactionTestCase):
+    threads = 4
+
+    def test_cart_is_checked_out_once(self):
+        user = User.objects.create_user("Ivan", "Petrov", "buyer@example.com", "password123")
+        address = ShippingAddress.objects.create(
+            user=user, full_name="Ivan Petrov", email="buyer@example.com", phone="123", address="Lenina 1",
+            city="Moscow", country="Russia", zipcode=101000,
+        )
+        category = Category.objects.create(name="Phones", image="category_images/apple.jpg")
+        product = Product.objects.create(
+            name="Phone", desc="desc", price_current=Decimal("10.00"), category=category, in_stock=10, image1="p.jpg",
+        )
+        OrderItem.objects.create(user=user, product=product, quantity=2)
+        results = []
+        barrier = threading.Barrier(self.threads)
+
+        def worker():
+            barrier.wait()
+            try:
+                while True:
+                    try:
+                        results.append(checkout.checkout(user, address))
+                    except (checkout.EmptyCart, checkout.CartChanged) as exc:
+                        results.append(exc)
+                    except OperationalError:
+                        # SQLite сериализует запись блокировкой базы — повторяем попытку
+                        continue
+                    break
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker) for _ in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        orders = [result for result in results if isinstance(result, Order)]
+        self.assertEqual(len(results), self.threads)
+        self.assertEqual(len(orders), 1)
+        order = Order.objects.get()
+        self.assertEqual((order.total, order.item_count), (Decimal("20.00"), 2))
+        self.assertEqual(order.orderitems.count(), 1)
+        product.refresh_from_db()
+        self.assertEqual(product.in_stock, 8)
+
+
+class ConditionalGetTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("Ivan", "Petrov", "buyer@example.com", "password123")
+        self.client.force_authenticate(self.user)
+        self.address = ShippingAddress.objects.create(user=self.user, full_name="Ivan Petrov", address="Lenina 1")
+
+    def get(self, path, **headers):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(path, headers=headers)
+        return response, len(context.captured_queries)
+
+    def test_unchanged_list_costs_one_aggregate(self):
+        response, _ = self.get("/profiles/shipping_addresses/")
+        etag = response["ETag"]
+        self.assertEqual(response.status_code, 200)
+
+        response, queries = self.get("/profiles/shipping_addresses/", if_none_match=etag)
+        self.assertEqual((response.status_code, response.content, response["ETag"]), (304, b"", etag))
+        self.assertEqual(queries, 1)
+
+        ShippingAddress.objects.create(user=self.user, full_name="Ivan Petrov", address="Lenina 2")
+        response, _ = self.get("/profiles/shipping_addresses/", if_none_match=etag)
+        self.assertEqual((response.status_code, len(response.data)), (200, 2))
+        self.assertNotEqual(response["ETag"], etag)
+
+        # Удаление строки меняет счетчик, даже если максимальный updated_at остался прежним
+        etag = response["ETag"]
+        self.address.delete()
+        self.assertEqual(self.get("/profiles/shipping_addresses/", if_none_match=etag)[0].status_code, 200)
+
+    def test_object_validators(self):
+        path = f"/profiles/shipping_addresses/detail/{self.address.id}/"
+        response, _ = self.get(path)
+        response, _ = self.get(path, if_modified_since=response["Last-Modified"])
+        self.assertEqual(response.status_code, 304)
+
+        response, _ = self.get("/profiles/")
+        etag = response["ETag"]
+        self.assertEqual(self.get("/profiles/", if_none_match=etag)[0].status_code, 304)
+        self.user.first_name = "Petr"
+        self.user.save()
+        response, _ = self.get("/profiles/", if_none_match=etag)
+        self.assertEqual((response.status_code, response.data["first_name"]), (200, "Petr"))
@@ -1,9 +1,24 @@
 from django.urls import path
 
-from apps.profiles.views import ProfileView, ShippingAddressesView, ShippingAddressViewID
+from apps.common.async_views import select_view
+from apps.profiles.views import (
+    AsyncProfileView,
+    AsyncShippingAddressesView,
+    CartItemView,
+    CartView,
+    CheckoutView,
+    OrdersView,
+    ProfileView,
+    ShippingAddressesView,
+    ShippingAddressViewID,
+)
 
 urlpatterns = [
-    path('', ProfileView.as_view()),
-    path("shipping_addresses/", ShippingAddressesView.as_view()),
+    path('', select_view(ProfileView, AsyncProfileView)),
+    path("shipping_addresses/", select_view(ShippingAddressesView, AsyncShippingAddressesView)),
     path("shipping_addresses/detail/<uuid:id>/", ShippingAddressViewID.as_view()),
+    path("orders/", OrdersView.as_view()),
+    path("cart/", CartView.as_view()),
+    path("cart/<uuid:id>/", CartItemView.as_view()),
+    path("checkout/", CheckoutView.as_view()),
 ]
\ No newline at end of file
@@ -1,20 +1,40 @@
-from drf_spectacular.utils import extend_schema
+from django.db.models import F
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.common.async_views import AsyncAPIView
+from apps.common.compiled import compile_serializer
+from apps.common.conditional import ConditionalGetMixin
+from apps.common.pagination import InvalidCursor, KeysetPagination
+from apps.common.projection import get_projection
 from apps.common.utils import set_dict_attr
-from apps.profiles.models import ShippingAddress
-from apps.profiles.serializers import ProfileSerializer, ShippingAddressSerializer
+from apps.profiles.checkout import CartChanged, EmptyCart, ProductsUnavailable, cart_items, cart_total, checkout
+from apps.profiles.models import Order, OrderItem, ShippingAddress
+from apps.profiles.serializers import (
+    AddToCartSerializer,
+    CartItemSerializer,
+    CartSerializer,
+    CheckoutSerializer,
+    OrderSerializer,
+    ProfileSerializer,
+    ShippingAddressSerializer,
+    UpdateCartItemSerializer,
+)
+from apps.shop.models import Product
+from apps.shop.stock import InsufficientStock
 
 
 tags = ["Profiles"]
 
 
-class ProfileView(APIView):
+class ProfileView(ConditionalGetMixin, APIView):
     """
     Представление служит для управления профилем пользователя. Оно обрабатывает HTTP-запросы GET, PUT и DELETE:
     """
     serializer_class = ProfileSerializer
+    query_budget = {"GET": 1}
 
 
     @extend_schema(
@@ -27,13 +47,18 @@ class ProfileView(APIView):
     def get(self, request):
         """
         Этот метод обрабатывает GET-запрос. Он получает данные текущего пользователя (request.user), сериализует их с
-        помощью ProfileSerializer, и возвращает сериализованные данные в ответе (HTTP код 200). Этот метод используется
-        для получения информации о текущем профиле пользователя.
+        помощью ProfileSerializer, и возвращает сериализованные данные в ответе (HTTP код 200). Если профиль не
+        изменился с прошлого запроса клиента (ETag / Last-Modified по updated_at), возвращается 304 без тела. Этот метод
+        используется для получения информации о текущем профиле пользователя.
         """
         user = request.user
+        validator = self.object_validator(user)
+        not_modified = self.not_modified_response(validator)
+        if not_modified:
+            return not_modified
         serializer = self.serializer_class(user)
 
-        return Response(data=serializer.data, status=200)
+        return self.set_validator_headers(Response(data=serializer.data, status=200), validator)
 
 
     @extend_schema(
@@ -83,23 +108,53 @@ class ProfileView(APIView):
         return Response(data={"message": "User Account Deactivated"})
 
 
-class ShippingAddressesView(APIView):
+class AsyncProfileView(AsyncAPIView, ProfileView):
+    """Асинхронный вариант ProfileView для ASGI. PUT и DELETE наследуются и выполняются в потоке."""
+
+    @extend_schema(
+        summary="Retrieve Profile",
+        description="""
+                Этот endpoint позволяет пользователю получить доступ к своему профилю.
+            """,
+        tags=tags,
+    )
+    async def get(self, request):
+        user = request.user
+        if hasattr(user, "aload"):
+            await user.aload()
+        validator = self.object_validator(user)
+        not_modified = self.not_modified_response(validator)
+        if not_modified:
+            return not_modified
+        serializer = self.serializer_class(user)
+
+        return self.set_validator_headers(Response(data=serializer.data, status=200), validator)
+
+
+class ShippingAddressesView(ConditionalGetMixin, APIView):
     serializer_class = ShippingAddressSerializer
+    query_budget = {"GET": 3}
 
     @extend_schema(
         summary="Shipping Addresses Fetch",
         description="""
-                Этот endpoint возвращает все адреса доставки, связанные с пользователем.
+                Этот endpoint возвращает все адреса доставки, связанные с пользователем. Поддерживает условные
+                запросы (ETag / If-None-Match, Last-Modified / If-Modified-Since).
             """,
         tags=tags,
     )
     def get(self, request, *args, **kwargs):
         user = request.user
         shipping_addresses = ShippingAddress.objects.filter(user=user)
+        validator = self.list_validator(shipping_addresses)
+        not_modified = self.not_modified_response(validator)
+        if not_modified:
+            return not_modified
 
-        serializer = self.serializer_class(shipping_addresses, many=True)
+        rows = get_projection(ShippingAddress, self.serializer_class).values(shipping_addresses)
+        data = compile_serializer(self.serializer_class).many(rows)
 
-        return Response(data=serializer.data)
+        return self.set_validator_headers(Response(data=data), validator)
 
 
     @extend_schema(
@@ -120,11 +175,38 @@ class ShippingAddressesView(APIView):
         return Response(data=serializer.data, status=201)
 
 
-class ShippingAddressViewID(APIView):
+class AsyncShippingAddressesView(AsyncAPIView, ShippingAddressesView):
+    """Асинхронный вариант ShippingAddressesView для ASGI. POST наследуется и выполняется в потоке."""
+
+    @extend_schema(
+        summary="Shipping Addresses Fetch",
+        description="""
+                Этот endpoint возвращает все адреса доставки, связанные с пользователем. Поддерживает условные
+                запросы (ETag / If-None-Match, Last-Modified / If-Modified-Since).
+            """,
+        tags=tags,
+    )
+    async def get(self, request, *args, **kwargs):
+        user = request.user
+        queryset = ShippingAddress.objects.filter(user=user)
+        validator = await self.alist_validator(queryset)
+        not_modified = self.not_modified_response(validator)
+        if not_modified:
+            return not_modified
+        projection = get_projection(ShippingAddress, self.serializer_class)
+        shipping_addresses = [address async for address in projection.values(queryset)]
+
+        data = compile_serializer(self.serializer_class).many(shipping_addresses)
+
+        return self.set_validator_headers(Response(data=data), validator)
+
+
+class ShippingAddressViewID(ConditionalGetMixin, APIView):
     """
     Класс будет обрабатывать GET, PUT и DELETE запросы для конкретного адреса доставки, идентифицируемого по ID.
     """
     serializer_class = ShippingAddressSerializer
+    query_budget = {"GET": 2}
 
 
     # @staticmethod
@@ -145,10 +227,14 @@ class ShippingAddressViewID(APIView):
         shipping_address = self.get_object(user, kwargs["id"])
         if not shipping_address:
             return Response(data={"message": "Адреса доставки не существует!"}, status=404)
+        validator = self.object_validator(shipping_address)
+        not_modified = self.not_modified_response(validator)
+        if not_modified:
+            return not_modified
 
         serializer = self.serializer_class(shipping_address)
 
-        return Response(data=serializer.data)
+        return self.set_validator_headers(Response(data=serializer.data), validator)
 
 
     @extend_schema(
@@ -190,3 +276,178 @@ class ShippingAddressViewID(APIView):
         shipping_address.delete()
 
         return Response(data={"message": "Адрес доставки успешно удален"})
+
+
+class OrdersView(APIView):
+    """
+    История заказов текущего пользователя. Суммы и количество товаров хранятся в заказе, а позиции со снимками цен
+    подгружаются одним prefetch-запросом, поэтому стоимость страницы не зависит от количества позиций в заказах.
+    """
+    serializer_class = OrderSerializer
+    query_budget = {"GET": 3}
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    @extend_schema(
+        summary="Orders History Fetch",
+        description="""
+                Этот endpoint возвращает историю заказов пользователя постранично. Для получения следующей страницы
+                передайте значение `next` из ответа в параметре `cursor`.
+            """,
+        tags=tags,
+        parameters=[OpenApiParameter("cursor", str), OpenApiParameter("limit", int)],
+    )
+    def get(self, request, *args, **kwargs):
+        orders = Order.objects.with_items().filter(user=request.user)
+        try:
+            limit = int(request.query_params.get("limit", 0)) or None
+        except ValueError:
+            return Response(data={"message": "Invalid limit"}, status=400)
+        paginator = self.pagination_class(limit=limit)
+        try:
+            orders, next_cursor = paginator.paginate_queryset(orders, request.query_params.get("cursor"))
+        except InvalidCursor:
+            return Response(data={"message": "Invalid cursor"}, status=400)
+
+        serializer = self.serializer_class(orders, many=True)
+        return Response(data={"next": next_cursor, "results": serializer.data})
+
+
+class CartView(APIView):
+    """
+    Корзина текущего пользователя: просмотр и добавление товаров.
+    """
+    serializer_class = CartSerializer
+    query_budget = {"GET": 3, "POST": 6}
+    permission_classes = [IsAuthenticated]
+
+    def cart_response(self, user, status=200):
+        items = cart_items(user).select_related("product")
+        serializer = self.serializer_class({"items": items, "total": cart_total(user)})
+        return Response(data=serializer.data, status=status)
+
+    @extend_schema(
+        summary="Cart Fetch",
+        description="""
+                Этот endpoint возвращает товары в корзине пользователя и общую сумму.
+            """,
+        tags=tags,
+    )
+    def get(self, request, *args, **kwargs):
+        return self.cart_response(request.user)
+
+    @extend_schema(
+        summary="Add To Cart",
+        description="""
+                Этот endpoint добавляет товар в корзину. Если товар уже в корзине, его количество увеличивается.
+            """,
+        tags=tags,
+        request=AddToCartSerializer,
+    )
+    def post(self, request, *args, **kwargs):
+        user = request.user
+        serializer = AddToCartSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        product = Product.objects.get_or_none(slug=data["product_slug"])
+        if not product:
+            return Response(data={"message": "Product does not exist!"}, status=404)
+        # Остаток сравнивается со всем количеством товара в корзине, а не только с добавляемым
+        line = cart_items(user).filter(product=product).values_list("id", "quantity").first()
+        in_cart = line[1] if line else 0
+        if product.in_stock < in_cart + data["quantity"]:
+            return Response(data={"message": "Недостаточно товара на складе"}, status=400)
+
+        if line:
+            OrderItem.objects.filter(id=line[0]).update(quantity=F("quantity") + data["quantity"])
+        else:
+            OrderItem.objects.create(user=user, product=product, quantity=data["quantity"])
+        return self.cart_response(user, status=201)
+
+
+class CartItemView(APIView):
+    """
+    Изменение количества и удаление отдельной позиции корзины.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        summary="Update Cart Item",
+        description="""
+                Этот endpoint изменяет количество товара в корзине.
+            """,
+        tags=tags,
+        request=UpdateCartItemSerializer,
+        responses=CartItemSerializer,
+    )
+    def put(self, request, *args, **kwargs):
+        serializer = UpdateCartItemSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        item = cart_items(request.user).select_related("product").get_or_none(id=kwargs["id"])
+        if not item:
+            return Response(data={"message": "Cart item does not exist!"}, status=404)
+
+        item.quantity = serializer.validated_data["quantity"]
+        item.save(update_fields=["quantity", "updated_at"])
+        return Response(data=CartItemSerializer(item).data)
+
+    @extend_schema(
+        summary="Delete Cart Item",
+        description="""
+                Этот endpoint удаляет товар из корзины.
+            """,
+        tags=tags,
+    )
+    def delete(self, request, *args, **kwargs):
+        deleted, _ = cart_items(request.user).filter(id=kwargs["id"]).delete()
+        if not deleted:
+            return Response(data={"message": "Cart item does not exist!"}, status=404)
+        return Response(data={"message": "Товар удален из корзины"})
+
+
+class CheckoutView(APIView):
+    """
+    Оформление заказа из корзины. Выполняется в одной транзакции фиксированным числом запросов.
+    """
+    serializer_class = CheckoutSerializer
+    query_budget = {"POST": 20}
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        summary="Checkout",
+        description="""
+                Этот endpoint оформляет заказ из всех товаров корзины с доставкой по указанному адресу.
+            """,
+        tags=tags,
+        responses=OrderSerializer,
+    )
+    def post(self, request, *args, **kwargs):
+        user = request.user
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        shipping_address = ShippingAddress.objects.get_or_none(user=user, id=serializer.validated_data["shipping_id"])
+        if not shipping_address:
+            return Response(data={"message": "Адреса доставки не существует!"}, status=404)
+
+        try:
+            order = checkout(user, shipping_address)
+        except EmptyCart:
+            return Response(data={"message": "Корзина пуста"}, status=400)
+        except CartChanged:
+            return Response(data={"message": "Корзина изменилась во время оформления, повторите запрос"}, status=409)
+        except ProductsUnavailable as exc:
+            return Response(
+                data={"message": "Товары сняты с продажи, удалите их из корзины",
+                      "products": [str(pk) for pk in exc.product_ids]},
+                status=409,
+            )
+        except InsufficientStock as exc:
+            return Response(
+                data={"message": "Недостаточно товара на складе", "products": [str(pk) for pk in exc.product_ids]},
+                status=409,
+            )
+
+        order = Order.objects.with_items().get(id=order.id)
+        return Response(data=OrderSerializer(order).data, status=201)
@@ -0,0 +1,140 @@
+"""
+Аналитика продаж продавцов на дневных свертках.
+
+Оплаченный заказ (payment_status="SUCCESSFUL") один раз раскладывается по строкам ProductDailySales и
+SellerDailySales: к строкам (товар, день) и (продавец, день) прибавляются выручка, единицы и число заказов. День
+продажи — дата создания заказа в часовом поясе проекта, поэтому инкрементальный учет и пересчет с нуля дают одинаковый
+результат. Выручка считается по снимкам цен позиций (OrderItem.line_total). Отчет за период читает не больше одной
+строки на день и не зависит от числа заказов.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from apps.common import ledger
+from apps.common.utils import chunked
+from apps.profiles.models import OrderItem
+from apps.sellers.models import ProductDailySales, RecordedOrder, SellerDailySales
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+# Поля свертки, к которым прибавляются агрегаты заказов, и их типы в выражении CASE
+INCREMENTS = {"revenue": MONEY, "units": IntegerField(), "orders": IntegerField()}
+# Сколько строк свертки увеличивается одним UPDATE
+UPDATE_BATCH_SIZE = 500
+
+
+def _rollup_rows(order_ids, group_by):
+    """
+    Агрегаты позиций заказов order_ids по (group_by, день) одним запросом. Позиция без снимка цены (line_total —
+    NULL) считается по текущей цене товара, как OrderItem.get_total, иначе SUM пропустил бы ее выручку.
+    """
+    line_total = Coalesce("line_total", F("quantity") * F("product__price_current"), output_field=MONEY)
+    return (
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .annotate(seller_id=F("product__seller_id"), date=TruncDate("order__created_at"))
+        .values(*group_by, "date")
+        .annotate(revenue=Sum(line_total, output_field=MONEY), units=Sum("quantity"),
+                  orders=Count("order_id", distinct=True))
+        .order_by()
+    )
+
+
+def _apply(model, key_fields, rows, now):
+    """
+    Прибавляет агрегаты rows к строкам свертки model. Существующие строки увеличиваются через F() одним UPDATE на
+    пачку из UPDATE_BATCH_SIZE строк (приращение каждой строки выбирается через CASE по id), поэтому параллельные
+    учеты не теряют друг друга; недостающие создаются одним bulk_create. Если ту же строку успела создать другая
+    транзакция, IntegrityError пробрасывается, и ledger.record() повторяет пачку целиком.
+    """
+    rows = {tuple(row[field] for field in key_fields): row for row in rows}
+    if not rows:
+        return
+    lookup = {f"{field}__in": {key[i] for key in rows} for i, field in enumerate(key_fields)}
+    # Фильтр по каждому полю ключа отдельно выбирает и лишние сочетания: они отбрасываются проверкой key in rows
+    existing = {
+        tuple(key): pk
+        for pk, *key in model.objects.filter(**lookup).values_list("id", *key_fields) if tuple(key) in rows
+    }
+    for batch in chunked(existing.items(), UPDATE_BATCH_SIZE):
+        increments = {
+            field: F(field) + Case(
+                *[When(id=pk, then=Value(rows[key][field])) for key, pk in batch], output_field=output_field,
+            )
+            for field, output_field in INCREMENTS.items()
+        }
+        model.objects.filter(id__in=[pk for _, pk in batch]).update(**increments, updated_at=now)
+
+    model.objects.bulk_create([model(**row) for key, row in rows.items() if key not in existing])
+
+
+def _apply_orders(order_ids):
+    """Прибавляет заказы order_ids к сверткам товаров и продавцов."""
+    now = timezone.now()
+    _apply(ProductDailySales, ("product_id", "date"), [
+        row for row in _rollup_rows(order_ids, ("product_id", "seller_id")) if row["seller_id"]
+    ], now)
+    _apply(SellerDailySales, ("seller_id", "date"), [
+        row for row in _rollup_rows(order_ids, ("seller_id",)) if row["seller_id"]
+    ], now)
+
+
+def record_orders(order_ids):
+    """
+    Учитывает оплаченные заказы order_ids в свертках. Неоплаченные и уже учтенные заказы пропускаются, поэтому
+    функцию можно вызывать повторно. Возвращает число учтенных заказов.
+    """
+    claimed, _ = ledger.record(RecordedOrder, order_ids, _apply_orders)
+    return len(claimed)
+
+
+def backfill(batch_size=ledger.BACKFILL_BATCH_SIZE, rebuild=False):
+    """
+    Учитывает все оплаченные заказы, которых еще нет в журнале, пачками по batch_size в порядке (created_at, id):
+    заказы одного дня идут подряд, поэтому строки свертки почти всегда создаются bulk_create, а не обновляются.
+    rebuild=True предварительно очищает свертки и журнал. Возвращает число учтенных заказов.
+    """
+    if rebuild:
+        with transaction.atomic():
+            ProductDailySales.objects.all().delete()
+            SellerDailySales.objects.all().delete()
+            RecordedOrder.objects.all().delete()
+
+    return sum(record_orders(order_ids) for order_ids in ledger.paid_order_pages(batch_size))
+
+
+def seller_report(seller, date_from, date_to, products_limit):
+    """
+    Отчет продавца за [date_from, date_to]: итоги, ряд по дням (дни без продаж заполняются нулями) и товары,
+    отсортированные по выручке.
+    """
+    daily = {
+        row["date"]: row for row in SellerDailySales.objects.filter(
+            seller=seller, date__gte=date_from, date__lte=date_to
+        ).values("date", "revenue", "units", "orders")
+    }
+    days = []
+    totals = {"revenue": Decimal("0.00"), "units": 0, "orders": 0}
+    for offset in range((date_to - date_from).days + 1):
+        date = date_from + timedelta(days=offset)
+        row = daily.get(date, {"revenue": Decimal("0.00"), "units": 0, "orders": 0})
+        days.append({"date": date, "revenue": row["revenue"], "units": row["units"], "orders": row["orders"]})
+        for field in totals:
+            totals[field] += row[field]
+
+    products = (
+        ProductDailySales.objects.filter(seller=seller, date__gte=date_from, date__lte=date_to)
+        .values(slug=F("product__slug"), name=F("product__name"))
+        .annotate(revenue=Sum("revenue"), units=Sum("units"), orders=Sum("orders"))
+        .order_by("-revenue", "slug")[:products_limit]
+    )
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "totals": totals,
+        "days": days,
+        "products": list(products),
+    }
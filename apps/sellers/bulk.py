@@ -0,0 +1,191 @@
+import csv
+import io
+import json
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+
+from apps.common.codes import generate_codes
+from apps.common.images import schedule_renditions
+from apps.common.renderers import dumps
+from apps.common.utils import chunked
+from apps.shop.categories import adjust_counts
+from apps.shop.models import Category, Product
+from apps.shop.search import get_search_backend
+from apps.shop.serializers import ImportProductSerializer
+
+FORMATS = ("csv", "jsonl")
+EXPORT_FIELDS = (
+    "name", "slug", "desc", "price_current", "price_old", "category_slug", "in_stock", "image1", "image2", "image3",
+)
+DEFAULT_BATCH_SIZE = 500
+# Сколько раз пачка вставляется заново, если slug успел занять параллельный запрос
+MAX_ATTEMPTS = 3
+
+
+def detect_format(filename, default="csv"):
+    """Определяет формат файла по расширению."""
+    if filename and filename.lower().endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if filename and filename.lower().endswith(".csv"):
+        return "csv"
+    return default
+
+
+def parse_rows(stream, file_format):
+    """
+    Построчно читает товары из бинарного потока (загруженного файла или открытого файла), не загружая его в память
+    целиком. Возвращает генератор пар (номер строки, словарь); строка, которую не удалось разобрать, возвращается
+    с исключением вместо словаря.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if file_format == "csv":
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            # Пустые ячейки CSV считаем отсутствующими значениями
+            yield number, {key: value for key, value in row.items() if key and value not in ("", None)}
+    else:
+        for number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield number, exc
+                continue
+            yield number, row if isinstance(row, dict) else ValueError("Ожидался JSON-объект")
+
+
+class ProductImporter:
+    """
+    Массовый импорт товаров продавца. Строки обрабатываются пачками: каждая пачка валидируется, получает slug'и
+    одним запросом и вставляется через bulk_create в своей транзакции. Ошибки копятся в построчном отчете и не
+    прерывают импорт остальных строк.
+
+    Между резервированием slug'ов и вставкой их может занять параллельная запись. Тогда транзакция пачки
+    откатывается, slug'и резервируются заново и вставка повторяется (до MAX_ATTEMPTS раз); если пачка так и не
+    вставилась, все ее строки попадают в отчет об ошибках.
+    """
+
+    def __init__(self, seller, batch_size=DEFAULT_BATCH_SIZE):
+        self.seller = seller
+        self.batch_size = batch_size
+        # Все категории одним запросом: slug -> id
+        self.categories = dict(Category.objects.values_list("slug", "id"))
+        self.slug_field = Product._meta.get_field("slug")
+        self.created = 0
+        self.errors = []
+
+    def build_product(self, data):
+        data = dict(data)
+        category_id = self.categories.get(data.pop("category_slug"))
+        if category_id is None:
+            return None
+        return Product(seller=self.seller, category_id=category_id, **data)
+
+    def reserve_slugs(self, products):
+        """
+        Назначает уникальные slug'и всей пачке: один запрос проверяет занятые базовые slug'и, а для конфликтов к базе
+        добавляется уникальный код.
+        """
+        max_length = self.slug_field.max_length
+        bases = [self.slug_field.slugify(product.name)[:max_length] or "product" for product in products]
+        taken = set(Product.objects.with_archived().filter(slug__in=set(bases)).values_list("slug", flat=True))
+        suffixes = iter(generate_codes(len(products)))
+        for product, base in zip(products, bases):
+            slug = base
+            if slug in taken:
+                suffix = next(suffixes).lower()
+                slug = f"{base[:max_length - len(suffix) - 1]}-{suffix}"
+            taken.add(slug)
+            product.slug = slug
+            product._slug_reserved = True
+
+    def import_chunk(self, chunk):
+        numbers, products = [], []
+        for number, row in chunk:
+            if isinstance(row, Exception):
+                self.errors.append({"row": number, "errors": {"non_field_errors": [str(row)]}})
+                continue
+            serializer = ImportProductSerializer(data=row)
+            if not serializer.is_valid():
+                self.errors.append({"row": number, "errors": serializer.errors})
+                continue
+            product = self.build_product(serializer.validated_data)
+            if product is None:
+                self.errors.append({"row": number, "errors": {"category_slug": ["Category does not exist!"]}})
+                continue
+            numbers.append(number)
+            products.append(product)
+
+        if not products:
+            return
+        for _ in range(MAX_ATTEMPTS):
+            self.reserve_slugs(products)
+            try:
+                self.insert(products)
+                break
+            except IntegrityError as exc:
+                error = exc
+                for product in products:
+                    # Откат транзакции: объекты снова считаются несохраненными
+                    product._state.adding, product._state.db = True, None
+        else:
+            self.errors.extend({"row": number, "errors": {"non_field_errors": [str(error)]}} for number in numbers)
+            return
+        self.created += len(products)
+
+    def insert(self, products):
+        with transaction.atomic():
+            Product.objects.bulk_create(products, batch_size=self.batch_size)
+            # bulk_create не отправляет post_save, поэтому счетчики категорий правятся здесь же, одной пачкой
+            adjust_counts(Counter(product.category_id for product in products))
+            get_search_backend().index_many(products)
+            # И не ставит миниатюры в очередь: планируем их для всей пачки после фиксации
+            images = (image for product in products for image in (product.image1, product.image2, product.image3))
+            names = {image.name for image in images if image}
+            owner = (Product, [product.id for product in products])
+            transaction.on_commit(lambda: schedule_renditions(names, owner))
+
+    def run(self, rows):
+        for chunk in chunked(rows, self.batch_size):
+            self.import_chunk(chunk)
+        return self.report()
+
+    def report(self):
+        return {"created": self.created, "errors": self.errors}
+
+
+def export_products(seller, file_format, chunk_size=2000):
+    """
+    Потоково выгружает товары продавца в CSV или JSONL. Строки читаются через values_list().iterator(), поэтому в
+    памяти одновременно находится не больше одной пачки.
+    """
+    rows = (
+        Product.objects.filter(seller=seller)
+        .order_by("created_at", "id")
+        .values_list(
+            "name", "slug", "desc", "price_current", "price_old", "category__slug", "in_stock", "image1", "image2",
+            "image3",
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+    if file_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        for block in chunked(rows, chunk_size):
+            writer.writerows(block)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        yield buffer.getvalue()
+    else:
+        for block in chunked(rows, chunk_size):
+            lines = []
+            for row in block:
+                item = dict(zip(EXPORT_FIELDS, row))
+                for key in ("price_current", "price_old"):
+                    if item[key] is not None:
+                        item[key] = str(item[key])
+                lines.append(dumps(item))
+            yield b"\n".join(lines) + b"\n"
@@ -0,0 +1,30 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.sellers.bulk import DEFAULT_BATCH_SIZE, FORMATS, ProductImporter, detect_format, parse_rows
+from apps.sellers.models import Seller
+
+
+class Command(BaseCommand):
+    help = "Массовый импорт товаров продавца из файла CSV или JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("seller", help="slug продавца")
+        parser.add_argument("path", help="путь к файлу CSV или JSONL")
+        parser.add_argument("--format", choices=FORMATS, help="формат файла (по умолчанию — по расширению)")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        seller = Seller.objects.filter(slug=options["seller"]).first()
+        if not seller:
+            raise CommandError(f"Продавец {options['seller']} не найден")
+
+        file_format = options["format"] or detect_format(options["path"])
+        importer = ProductImporter(seller, batch_size=options["batch_size"])
+        with open(options["path"], "rb") as stream:
+            report = importer.run(parse_rows(stream, file_format))
+
+        for error in report["errors"]:
+            self.stderr.write(f"Строка {error['row']}: {json.dumps(error['errors'], ensure_ascii=False)}")
+        self.stdout.write(self.style.SUCCESS(f"Создано товаров: {report['created']}, ошибок: {len(report['errors'])}"))
@@ -36,4 +36,49 @@ class Seller(BaseModel):
     is_approved = models.BooleanField(default=False)
 
     def __str__(self):
-        return f"Seller for {self.business_name}"
\ No newline at end of file
+        return f"Seller for {self.business_name}"
+
+class ProductDailySales(BaseModel):
+    """
+    Дневная свертка продаж товара: выручка, проданные единицы и число оплаченных заказов с этим товаром за день.
+    Строки пополняются инкрементально (apps.sellers.analytics.record_orders) и пересчитываются командой
+    backfill_seller_analytics.
+    """
+
+    seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name="product_daily_sales")
+    product = models.ForeignKey("shop.Product", on_delete=models.CASCADE, related_name="daily_sales")
+    date = models.DateField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    units = models.PositiveIntegerField(default=0)
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["product", "date"], name="product_daily_sales_uniq")]
+        # Отчет продавца за период: выборка по (seller, date) без обхода чужих строк
+        indexes = [models.Index(fields=["seller", "date"], name="product_daily_sales_seller_idx")]
+
+
+class SellerDailySales(BaseModel):
+    """
+    Дневная свертка продаж продавца. Число заказов здесь — число различных заказов за день, поэтому его нельзя
+    получить суммированием ProductDailySales (один заказ может содержать несколько товаров продавца).
+    """
+
+    seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name="daily_sales")
+    date = models.DateField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    units = models.PositiveIntegerField(default=0)
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["seller", "date"], name="seller_daily_sales_uniq")]
+
+
+class RecordedOrder(models.Model):
+    """
+    Журнал заказов, уже учтенных в свертках. Заказ попадает в свертки только вместе с первой записью в журнале, поэтому
+    повторные сигналы и перезапуск пересчета не учитывают заказ дважды.
+    """
+
+    order = models.OneToOneField("profiles.Order", on_delete=models.CASCADE, primary_key=True, related_name="+")
+    recorded_at = models.DateTimeField(auto_now_add=True)
@@ -1,3 +1,6 @@
+from datetime import timedelta
+
+from django.utils import timezone
 from rest_framework import serializers
 
 
@@ -18,4 +21,67 @@ class SellerSerializer(serializers.Serializer):
     bank_account_number = serializers.CharField(max_length=50)
     bank_routing_number = serializers.CharField(max_length=50)
 
-    is_approved = serializers.BooleanField(read_only=True)
\ No newline at end of file
+    is_approved = serializers.BooleanField(read_only=True)
+
+
+class ProductImportSerializer(serializers.Serializer):
+    """
+    Параметры массового импорта товаров: файл CSV или JSONL (формат определяется по расширению, если не указан явно)
+    и размер пачки для bulk_create.
+    """
+    file = serializers.FileField()
+    file_format = serializers.ChoiceField(choices=["csv", "jsonl"], required=False)
+    batch_size = serializers.IntegerField(min_value=1, max_value=5000, required=False, default=500)
+
+
+class ProductExportSerializer(serializers.Serializer):
+    file_format = serializers.ChoiceField(choices=["csv", "jsonl"], required=False, default="csv")
+
+
+class ProductsDelistSerializer(serializers.Serializer):
+    """Slug'и товаров продавца, которые нужно снять с продажи (restore=True — вернуть в продажу)."""
+    slugs = serializers.ListField(child=serializers.SlugField(), allow_empty=False, max_length=10000)
+    restore = serializers.BooleanField(required=False, default=False)
+
+
+class SellerAnalyticsQuerySerializer(serializers.Serializer):
+    """
+    Период отчета (включительно). По умолчанию — последние 30 дней; период длиннее ANALYTICS_MAX_DAYS отклоняется.
+    """
+    ANALYTICS_MAX_DAYS = 366
+
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    products_limit = serializers.IntegerField(min_value=1, max_value=100, required=False, default=20)
+
+    def validate(self, attrs):
+        date_to = attrs.setdefault("date_to", timezone.localdate())
+        date_from = attrs.setdefault("date_from", date_to - timedelta(days=29))
+        if date_from > date_to:
+            raise serializers.ValidationError({"date_from": "date_from must not be later than date_to"})
+        if (date_to - date_from).days >= self.ANALYTICS_MAX_DAYS:
+            raise serializers.ValidationError({"date_from": f"Period must not exceed {self.ANALYTICS_MAX_DAYS} days"})
+        return attrs
+
+
+class SalesFiguresSerializer(serializers.Serializer):
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    units = serializers.IntegerField()
+    orders = serializers.IntegerField()
+
+
+class DailySalesSerializer(SalesFiguresSerializer):
+    date = serializers.DateField()
+
+
+class ProductSalesSerializer(SalesFiguresSerializer):
+    slug = serializers.CharField()
+    name = serializers.CharField()
+
+
+class SellerAnalyticsSerializer(serializers.Serializer):
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    totals = SalesFiguresSerializer()
+    days = DailySalesSerializer(many=True)
+    products = ProductSalesSerializer(many=True)
@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from apps.common.ledger import PAID
+from apps.profiles.models import Order
+from apps.sellers.analytics import record_orders
+
+
+@receiver(post_save, sender=Order)
+def record_paid_order(sender, instance, **kwargs):
+    """
+    Учитывает оплаченный заказ в дневных свертках продавцов после фиксации транзакции. Повторные сохранения
+    оплаченного заказа ничего не меняют: record_orders() пропускает уже учтенные заказы.
+    """
+    if instance.payment_status == PAID:
+        transaction.on_commit(lambda: record_orders([instance.pk]))
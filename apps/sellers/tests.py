@@ -1,3 +1,367 @@
-from django.test import TestCase
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from apps.accounts.models import User
+from apps.profiles.models import Order, OrderItem, ShippingAddress
+from apps.sellers.analytics import backfill
+from apps.sellers.bulk import MAX_ATTEMPTS, ProductImporter, export_products, parse_rows
+from apps.sellers.models import ProductDailySales, Seller, SellerDailySales
+from apps.sellers.views import ProductsBySellerView
+from apps.shop import stock
+from apps.shop.models import Category, Product
+
+
+class ProductsBySellerViewTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("Ivan", "Petrov", "seller@example.com", "password123")
+        self.seller = Seller.objects.create(
+            user=self.user, business_name="Phone Shop", inn_identification_number="7700000000", phone_number="123",
+            business_description="desc", business_address="Lenina 1", city="Moscow", postal_code="101000",
+            bank_name="Bank", bank_bic_number="044525225", bank_account_number="1", bank_routing_number="1",
+            is_approved=True,
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_stays_within_query_budget(self):
+        # QueryBudgetTestRunner превращает превышение ProductsBySellerView.query_budget в падение теста
+        categories = [Category.objects.create(name=f"Category {i}", image="c.jpg") for i in range(5)]
+        for i in range(30):
+            Product.objects.create(
+                seller=self.seller, name=f"Phone {i}", desc="desc", price_current=Decimal("10.00"),
+                category=categories[i % 5], image1="p.jpg",
+            )
+
+        response = self.client.get("/sellers/products/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 30)
+
+
+    def test_related_changes_invalidate_etag(self):
+        category = Category.objects.create(name="Phones", image="c.jpg")
+        Product.objects.create(
+            seller=self.seller, name="Phone", desc="desc", price_current=Decimal("10.00"), category=category,
+            image1="p.jpg",
+        )
+        etag = self.client.get("/sellers/products/")["ETag"]
+        self.assertEqual(self.client.get("/sellers/products/", headers={"If-None-Match": etag}).status_code, 304)
+
+        category.name = "Smartphones"
+        category.save()
+        response = self.client.get("/sellers/products/", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]["category"]["name"], "Smartphones")
+
+    def test_stock_changes_invalidate_etag(self):
+        category = Category.objects.create(name="Phones", image="c.jpg")
+        product = Product.objects.create(
+            seller=self.seller, name="Phone", desc="desc", price_current=Decimal("10.00"), category=category,
+            in_stock=5, image1="p.jpg",
+        )
+        etag = self.client.get("/sellers/products/")["ETag"]
+
+        buyer = User.objects.create_user("Petr", "Ivanov", "buyer@example.com", "password123")
+        address = ShippingAddress.objects.create(user=buyer, full_name="Petr Ivanov", address="Lenina 2")
+        self.client.force_authenticate(buyer)
+        self.client.post("/profiles/cart/", {"product_slug": product.slug, "quantity": 2})
+        self.assertEqual(self.client.post("/profiles/checkout/", {"shipping_id": address.id}).status_code, 201)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get("/sellers/products/", headers={"If-None-Match": etag})
+        self.assertEqual((response.status_code, response.data[0]["in_stock"]), (200, 3))
+
+        # Возврат брошенного резерва на склад тоже меняет валидатор
+        etag = response["ETag"]
+        stock.release(stock.reserve({product: 1}))
+        self.assertEqual(self.client.get("/sellers/products/", headers={"If-None-Match": etag}).status_code, 200)
+
+    def test_large_list_is_streamed(self):
+        category = Category.objects.create(name="Phones", image="c.jpg")
+        for i in range(3):
+            Product.objects.create(
+                seller=self.seller, name=f"Phone {i}", desc="desc", price_current=Decimal("10.00"), category=category,
+                image1="p.jpg",
+            )
+        expected = self.client.get("/sellers/products/")
+
+        with mock.patch.object(ProductsBySellerView, "stream_threshold", 2):
+            response = self.client.get("/sellers/products/")
+            self.assertTrue(response.streaming)
+            self.assertEqual(response["ETag"], expected["ETag"])
+            self.assertEqual(json.loads(b"".join(response.streaming_content)), expected.json())
+
+    def test_delist_and_restore_products(self):
+        category = Category.objects.create(name="Phones", image="c.jpg")
+        products = [
+            Product.objects.create(
+                seller=self.seller, name=f"Phone {i}", desc="desc", price_current=Decimal("10.00"),
+                category=category, image1="p.jpg",
+            )
+            for i in range(5)
+        ]
+        slugs = [product.slug for product in products[:3]]
+
+        response = self.client.post("/sellers/products/delist/", {"slugs": slugs}, format="json")
+        self.assertEqual(response.data, {"delisted": 3})
+        self.assertEqual(Product.objects.filter(seller=self.seller).count(), 2)
+
+        response = self.client.post("/sellers/products/delist/", {"slugs": slugs, "restore": True}, format="json")
+        self.assertEqual(response.data, {"restored": 3})
+        self.assertEqual(Product.objects.filter(seller=self.seller).count(), 5)
+
+
+class SellerAnalyticsTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("Ivan", "Petrov", "seller@example.com", "password123")
+        self.seller = Seller.objects.create(
+            user=self.user, business_name="Phone Shop", inn_identification_number="7700000000", phone_number="123",
+            business_description="desc", business_address="Lenina 1", city="Moscow", postal_code="101000",
+            bank_name="Bank", bank_bic_number="044525225", bank_account_number="1", bank_routing_number="1",
+            is_approved=True,
+        )
+        self.buyer = User.objects.create_user("Petr", "Ivanov", "buyer@example.com", "password123")
+        category = Category.objects.create(name="Phones", image="c.jpg")
+        self.phone, self.case = [
+            Product.objects.create(
+                seller=self.seller, name=name, desc="desc", price_current=price, category=category, image1="p.jpg",
+            )
+            for name, price in (("Phone", Decimal("100.00")), ("Case", Decimal("5.00")))
+        ]
+
+    def place_order(self, *lines):
+        order = Order.objects.create(user=self.buyer, address="Lenina 2")
+        for product, quantity in lines:
+            OrderItem.objects.create(user=self.buyer, order=order, product=product, quantity=quantity)
+        return order
+
+    def pay(self, order):
+        order.payment_status = "SUCCESSFUL"
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+
+    def rollups(self):
+        return (
+            sorted(ProductDailySales.objects.values_list("product_id", "date", "revenue", "units", "orders")),
+            sorted(SellerDailySales.objects.values_list("seller_id", "date", "revenue", "units", "orders")),
+        )
+
+    def test_paid_order_is_recorded_once(self):
+        pending = self.place_order((self.phone, 1))
+        self.pay(self.place_order((self.phone, 2), (self.case, 3)))
+        order = self.place_order((self.phone, 1))
+        self.pay(order)
+        self.pay(order)
+
+        day = SellerDailySales.objects.get(seller=self.seller)
+        self.assertEqual((day.revenue, day.units, day.orders), (Decimal("315.00"), 6, 2))
+        phone = ProductDailySales.objects.get(product=self.phone)
+        self.assertEqual((phone.revenue, phone.units, phone.orders), (Decimal("300.00"), 3, 2))
+        self.assertFalse(ProductDailySales.objects.filter(product=self.case, orders__gt=1).exists())
+        self.assertEqual(pending.payment_status, "PENDING")
+
+    def test_items_without_price_snapshot_count_at_current_price(self):
+        order = self.place_order((self.phone, 2), (self.case, 1))
+        OrderItem.objects.filter(order=order, product=self.phone).update(unit_price=None, line_total=None)
+        self.pay(order)
+
+        day = SellerDailySales.objects.get(seller=self.seller)
+        self.assertEqual((day.revenue, day.units), (Decimal("205.00"), 3))
+        self.assertEqual(ProductDailySales.objects.get(product=self.phone).revenue, Decimal("200.00"))
+
+    def test_backfill_matches_incremental(self):
+        orders = [self.place_order((self.phone, i + 1), (self.case, 1)) for i in range(5)]
+        for order in orders[:2]:
+            self.pay(order)
+        incremental_part = self.rollups()
+        # Оплата через update() обходит сигналы: такие заказы учитывает только backfill
+        Order.objects.filter(id__in=[order.id for order in orders[2:]]).update(payment_status="SUCCESSFUL")
+        self.assertEqual(self.rollups(), incremental_part)
+
+        # Пачка из двух заказов увеличивает существующие строки сверток одним UPDATE на модель
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(backfill(batch_size=2), 3)
+        updates = [query["sql"] for query in queries.captured_queries if query["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 4)  # две пачки x (товары, продавцы)
+        self.assertEqual(backfill(batch_size=2), 0)
+        caught_up = self.rollups()
+        self.assertEqual(backfill(batch_size=1, rebuild=True), 5)
+        self.assertEqual(self.rollups(), caught_up)
+        self.assertEqual(SellerDailySales.objects.get().orders, 5)
+
+    def test_analytics_report(self):
+        self.pay(self.place_order((self.phone, 1), (self.case, 2)))
+        today = SellerDailySales.objects.get().date
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get("/sellers/analytics/", {"date_from": today - timedelta(days=2), "date_to": today})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["totals"], {"revenue": "110.00", "units": 3, "orders": 1})
+        self.assertEqual([day["orders"] for day in response.data["days"]], [0, 0, 1])
+        self.assertEqual([product["slug"] for product in response.data["products"]], [self.phone.slug, self.case.slug])
+
+        response = self.client.get("/sellers/analytics/", {"date_from": today, "date_to": today - timedelta(days=1)})
+        self.assertEqual(response.status_code, 400)
+        self.client.force_authenticate(self.buyer)
+        self.assertEqual(self.client.get("/sellers/analytics/").status_code, 403)
+
+
+class ProductImportExportTest(APITestCase):
+    HEADER = "name,desc,price_current,price_old,category_slug,in_stock,image1\n"
+
+    def setUp(self):
+        self.user = User.objects.create_user("Ivan", "Petrov", "seller@example.com", "password123")
+        self.seller = Seller.objects.create(
+            user=self.user, business_name="Phone Shop", inn_identification_number="7700000000", phone_number="123",
+            business_description="desc", business_address="Lenina 1", city="Moscow", postal_code="101000",
+            bank_name="Bank", bank_bic_number="044525225", bank_account_number="1", bank_routing_number="1",
+            is_approved=True,
+        )
+        self.category = Category.objects.create(name="Phones", image="c.jpg")
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, content, **data):
+        file = SimpleUploadedFile(name, content.encode())
+        return self.client.post("/sellers/products/import/", {"file": file, **data}, format="multipart")
+
+    def rows(self, count, name="Phone"):
+        return [(number, {
+            "name": name, "desc": "desc", "price_current": "10.00", "category_slug": self.category.slug,
+            "in_stock": 1, "image1": "p.jpg",
+        }) for number in range(1, count + 1)]
+
+    def test_csv_import_reports_row_errors(self):
+        content = self.HEADER + (
+            f"Phone,desc,10.00,,{self.category.slug},3,p.jpg\n"
+            f"Phone,desc,abc,,{self.category.slug},3,p.jpg\n"
+            "Case,desc,5.00,,missing,1,p.jpg\n"
+            f"Phone,desc,12.50,15.00,{self.category.slug},1,p.jpg\n"
+        )
+        response = self.upload("products.csv", content, batch_size=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [2, 3])
+        self.assertIn("price_current", response.data["errors"][0]["errors"])
+        self.assertIn("category_slug", response.data["errors"][1]["errors"])
+
+        products = Product.objects.filter(seller=self.seller)
+        self.assertEqual(len({product.slug for product in products}), 2)
+        self.assertCountEqual(products.values_list("price_old", flat=True), [None, Decimal("15.00")])
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.product_count, 2)
+
+    def test_jsonl_import_reports_broken_lines(self):
+        line = json.dumps(dict(self.rows(1)[0][1]))
+        content = f'{line}\n\n{{"name": \n[1, 2]\n{line}\n'
+        response = self.upload("products.jsonl", content)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [3, 4])
+
+    def test_idempotency_key_covers_uploaded_file(self):
+        content = self.HEADER + f"Phone,desc,10.00,,{self.category.slug},3,p.jpg\n"
+        headers = {"Idempotency-Key": "import-1"}
+        first = self.client.post(
+            "/sellers/products/import/", {"file": SimpleUploadedFile("products.csv", content.encode())},
+            format="multipart", headers=headers,
+        )
+        replayed = self.client.post(
+            "/sellers/products/import/", {"file": SimpleUploadedFile("products.csv", content.encode())},
+            format="multipart", headers=headers,
+        )
+        self.assertEqual((replayed.content, replayed["Idempotent-Replayed"]), (first.content, "true"))
+
+        # Тот же ключ с другим файлом — ошибка клиента, а не повтор первого импорта
+        other = content + f"Case,desc,5.00,,{self.category.slug},1,p.jpg\n"
+        response = self.client.post(
+            "/sellers/products/import/", {"file": SimpleUploadedFile("products.csv", other.encode())},
+            format="multipart", headers=headers,
+        )
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Product.objects.filter(seller=self.seller).count(), 1)
+
+    def test_import_rejects_paths_outside_media_root(self):
+        rows = self.rows(3)
+        rows[1][1]["image1"] = "../x.jpg"
+        rows[2][1]["image1"] = "/etc/passwd"
+        report = ProductImporter(self.seller).run(rows)
+        self.assertEqual(report["created"], 1)
+        self.assertEqual([error["row"] for error in report["errors"]], [2, 3])
+        self.assertIn("image1", report["errors"][0]["errors"])
+
+    def test_imported_products_get_renditions_scheduled(self):
+        rows = self.rows(2)
+        rows[1][1]["image2"] = "q.jpg"
+        with mock.patch("apps.sellers.bulk.schedule_renditions") as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                ProductImporter(self.seller).run(rows)
+        schedule.assert_called_once()
+        names, (model, pks) = schedule.call_args.args
+        self.assertEqual(names, {"p.jpg", "q.jpg"})
+        self.assertEqual(model, Product)
+        self.assertCountEqual(pks, Product.objects.filter(seller=self.seller).values_list("id", flat=True))
+
+    def test_slug_taken_between_reserve_and_insert_is_retried(self):
+        seller, category = self.seller, self.category
+
+        class RacingImporter(ProductImporter):
+            raced = False
+
+            def reserve_slugs(self, products):
+                super().reserve_slugs(products)
+                if not self.raced:
+                    # Параллельный запрос занимает slug, уже выданный пачке
+                    self.raced = True
+                    Product.objects.create(
+                        seller=seller, name="Phone", desc="desc", price_current=Decimal("1.00"), category=category,
+                        image1="p.jpg",
+                    )
+
+        report = RacingImporter(self.seller, batch_size=3).run(self.rows(3))
+        self.assertEqual(report, {"created": 3, "errors": []})
+        self.assertEqual(Product.objects.filter(seller=self.seller).values("slug").distinct().count(), 4)
+
+    def test_failed_chunk_does_not_undo_committed_chunks(self):
+        importer = ProductImporter(self.seller, batch_size=2)
+        insert = importer.insert
+
+        def conflicting_insert(products):
+            if products[0].name == "Second":
+                raise IntegrityError("UNIQUE constraint failed: shop_product.slug")
+            insert(products)
+
+        with mock.patch.object(importer, "insert", side_effect=conflicting_insert) as patched:
+            report = importer.run(self.rows(2, "First") + [(3, self.rows(1, "Second")[0][1])])
+
+        self.assertEqual(report["created"], 2)
+        self.assertEqual([error["row"] for error in report["errors"]], [3])
+        self.assertEqual(patched.call_count, 1 + MAX_ATTEMPTS)
+        self.assertEqual(list(Product.objects.filter(seller=self.seller).values_list("name", flat=True)), ["First"] * 2)
+
+    def test_export_streams_csv_and_jsonl(self):
+        ProductImporter(self.seller).run(self.rows(5))
+        other = Category.objects.create(name="Other", image="c.jpg")
+        Product.objects.create(
+            name="Foreign", desc="desc", price_current=Decimal("1.00"), category=other, image1="p.jpg",
+        )
+
+        chunks = list(export_products(self.seller, "csv", chunk_size=2))
+        self.assertEqual(len(chunks), 4)  # три пачки и остаток буфера
+        exported = [row for _, row in parse_rows(io.BytesIO("".join(chunks).encode()), "csv")]
+        self.assertEqual(len(exported), 5)
+        self.assertEqual(exported[0]["category_slug"], self.category.slug)
+
+        response = self.client.get("/sellers/products/export/", {"file_format": "jsonl"})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).splitlines()
+        self.assertEqual([json.loads(line)["price_current"] for line in lines], ["10.00"] * 5)
+
+        # Выгрузка снова загружается без ошибок
+        response = self.upload("products.jsonl", b"\n".join(lines).decode())
+        self.assertEqual((response.data["created"], response.data["errors"]), (5, []))
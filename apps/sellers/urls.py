@@ -1,8 +1,19 @@
 from django.urls import path
 
-from apps.sellers.views import SellersView, ProductsBySellerView
+from apps.sellers.views import (
+    ProductsBySellerView,
+    ProductsDelistView,
+    ProductsExportView,
+    ProductsImportView,
+    SellerAnalyticsView,
+    SellersView,
+)
 
 urlpatterns = [
     path("", SellersView.as_view()),
     path("products/", ProductsBySellerView.as_view()),
+    path("products/import/", ProductsImportView.as_view()),
+    path("products/export/", ProductsExportView.as_view()),
+    path("products/delist/", ProductsDelistView.as_view()),
+    path("analytics/", SellerAnalyticsView.as_view()),
 ]
\ No newline at end of file
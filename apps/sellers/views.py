@@ -1,9 +1,24 @@
-from drf_spectacular.utils import extend_schema
+from django.http import StreamingHttpResponse
+from drf_spectacular.utils import OpenApiTypes, extend_schema
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.common.compiled import compile_serializer
+from apps.common.conditional import ConditionalGetMixin
+from apps.common.projection import get_projection
+from apps.common.renderers import STREAM_CHUNK_SIZE, streaming_json_response
+from apps.sellers.analytics import seller_report
+from apps.sellers.bulk import ProductImporter, detect_format, export_products, parse_rows
 from apps.sellers.models import Seller
-from apps.sellers.serializers import SellerSerializer
+from apps.sellers.serializers import (
+    ProductExportSerializer,
+    ProductImportSerializer,
+    ProductsDelistSerializer,
+    SellerAnalyticsQuerySerializer,
+    SellerAnalyticsSerializer,
+    SellerSerializer,
+)
 from apps.shop.models import Category, Product
 from apps.shop.serializers import CreateProductSerializer, ProductSerializer
 
@@ -34,18 +49,23 @@ class SellersView(APIView):
             return Response(data=serializer.errors, status=400)
 
 
-class ProductsBySellerView(APIView):
+class ProductsBySellerView(ConditionalGetMixin, APIView):
     """
     Представление, предназначенно для работы с продуктами конкретного продавца. Оно будет обрабатывать GET-запросы для
     получения списка продуктов продавца и POST-запросы для создания нового продукта.
     """
     serializer_class = ProductSerializer
+    query_budget = {"GET": 4}
+    # В ответ входят категория и магазин товара, поэтому их изменения тоже меняют ETag
+    conditional_related_fields = ("category__updated_at", "seller__updated_at", "seller__user__updated_at")
+    # Списки длиннее порога отдаются потоком: строки читаются итератором и кодируются пачками
+    stream_threshold = 1000
 
     @extend_schema(
         summary="Seller Products Fetch",
         description="""
             Этот endpoint возвращает все товары от продавца. 
-            Товары могут быть отфильтрованы по названию, размеру или цвету.
+            Товары могут быть отфильтрованы по названию, размеру или цвету. Большие списки отдаются потоком.
         """,
         tags=tags,
     )
@@ -53,9 +73,18 @@ class ProductsBySellerView(APIView):
         seller = Seller.objects.get_or_none(user=request.user, is_approved=True)
         if not seller:
             return Response(data={"message": "Access is denied"}, status=403)
-        products = Product.objects.select_related("category", "seller", "seller__user").filter(seller=seller)
-        serializer = self.serializer_class(products, many=True)
-        return Response(data=serializer.data, status=200)
+        products = Product.objects.filter(seller=seller)
+        validator = self.list_validator(products)
+        not_modified = self.not_modified_response(validator)
+        if not_modified:
+            return not_modified
+        rows = get_projection(Product, self.serializer_class).values(products)
+        compiled = compile_serializer(self.serializer_class)
+        if validator.count > self.stream_threshold:
+            response = streaming_json_response(rows.iterator(chunk_size=STREAM_CHUNK_SIZE), compiled.to_representation)
+        else:
+            response = Response(data=compiled.many(rows), status=200)
+        return self.set_validator_headers(response, validator)
 
     @extend_schema(
         summary="Create a product",
@@ -83,4 +112,122 @@ class ProductsBySellerView(APIView):
             serializer = self.serializer_class(new_prod)
             return Response(serializer.data, status=200)
         else:
-            return Response(serializer.errors, status=400)
\ No newline at end of file
+            return Response(serializer.errors, status=400)
+
+
+class ProductsImportView(APIView):
+    """
+    Массовый импорт товаров продавца из файла CSV или JSONL. Файл читается построчно, строки валидируются и
+    вставляются пачками, а в ответе возвращается количество созданных товаров и построчный отчет об ошибках.
+    """
+    serializer_class = ProductImportSerializer
+    parser_classes = [MultiPartParser]
+
+    @extend_schema(
+        summary="Import products",
+        description="""
+            Этот endpoint позволяет продавцу загрузить товары файлом CSV или JSONL. Колонки: name, desc,
+            price_current, price_old, category_slug, in_stock, image1, image2, image3.
+        """,
+        tags=tags,
+        request={"multipart/form-data": ProductImportSerializer},
+    )
+    def post(self, request, *args, **kwargs):
+        seller = Seller.objects.get_or_none(user=request.user, is_approved=True)
+        if not seller:
+            return Response(data={"message": "Access is denied"}, status=403)
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        upload = data["file"]
+        file_format = data.get("file_format") or detect_format(upload.name)
+        importer = ProductImporter(seller, batch_size=data["batch_size"])
+        report = importer.run(parse_rows(upload.file, file_format))
+        return Response(data=report, status=200)
+
+
+class ProductsExportView(APIView):
+    """
+    Потоковая выгрузка всех товаров продавца в CSV или JSONL.
+    """
+
+    @extend_schema(
+        summary="Export products",
+        description="""
+            Этот endpoint выгружает все товары продавца файлом CSV или JSONL. Ответ формируется потоково.
+        """,
+        tags=tags,
+        parameters=[ProductExportSerializer],
+        responses={(200, "text/csv"): OpenApiTypes.BINARY},
+    )
+    def get(self, request, *args, **kwargs):
+        seller = Seller.objects.get_or_none(user=request.user, is_approved=True)
+        if not seller:
+            return Response(data={"message": "Access is denied"}, status=403)
+        serializer = ProductExportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        file_format = serializer.validated_data["file_format"]
+
+        content_type = "text/csv" if file_format == "csv" else "application/x-ndjson"
+        response = StreamingHttpResponse(export_products(seller, file_format), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="products.{file_format}"'
+        return response
+
+
+class ProductsDelistView(APIView):
+    """
+    Массовое снятие товаров продавца с продажи (мягкое удаление) и возврат в продажу. Товары обрабатываются пачками
+    через IsDeletedQuerySet.soft_delete() / restore(), поэтому поисковый индекс и кэши остаются согласованными.
+    """
+    serializer_class = ProductsDelistSerializer
+
+    @extend_schema(
+        summary="Delist products",
+        description="""
+            Этот endpoint позволяет продавцу снять с продажи (или вернуть в продажу) сразу много своих товаров.
+        """,
+        tags=tags,
+    )
+    def post(self, request, *args, **kwargs):
+        seller = Seller.objects.get_or_none(user=request.user, is_approved=True)
+        if not seller:
+            return Response(data={"message": "Access is denied"}, status=403)
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        products = Product.objects.unfiltered().filter(seller=seller, slug__in=data["slugs"])
+        if data["restore"]:
+            return Response(data={"restored": products.restore()}, status=200)
+        return Response(data={"delisted": products.soft_delete()}, status=200)
+
+
+class SellerAnalyticsView(APIView):
+    """
+    Аналитика продаж продавца за период по дневным сверткам (apps.sellers.analytics): время ответа зависит от длины
+    периода, а не от числа заказов.
+    """
+    serializer_class = SellerAnalyticsSerializer
+    query_budget = {"GET": 3}
+
+    @extend_schema(
+        summary="Seller Analytics",
+        description="""
+            Этот endpoint возвращает выручку, количество проданных единиц и число оплаченных заказов продавца за
+            период: итоги, ряд по дням и товары, отсортированные по выручке.
+        """,
+        tags=tags,
+        parameters=[SellerAnalyticsQuerySerializer],
+    )
+    def get(self, request, *args, **kwargs):
+        seller = Seller.objects.get_or_none(user=request.user, is_approved=True)
+        if not seller:
+            return Response(data={"message": "Access is denied"}, status=403)
+        query_serializer = SellerAnalyticsQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        query = query_serializer.validated_data
+
+        report = seller_report(seller, query["date_from"], query["date_to"], query["products_limit"])
+        serializer = self.serializer_class(report)
+        return Response(data=serializer.data, status=200)
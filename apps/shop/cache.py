@@ -0,0 +1,4 @@
+from apps.common.cache import VersionedCache
+
+# Готовый JSON списка категорий. Инвалидируется сигналами модели Category (см. apps.shop.signals)
+categories_cache = VersionedCache("shop:categories")
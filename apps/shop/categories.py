@@ -0,0 +1,107 @@
+"""
+Дерево категорий.
+
+Category.path — материализованный путь (шаги id.hex + "/" от корня), поэтому «все категории поддерева» и «все товары
+поддерева» выбираются одним диапазоном по индексу path (subtree_lookup()). Путь поддерживает Category.save().
+
+Category.product_count — число живых товаров непосредственно в категории. Счетчики меняются инкрементально сигналами
+apps.shop.signals при создании товара, смене его категории, мягком удалении, восстановлении и удалении. Суммы по
+поддеревьям считаются при сборке дерева (category_tree()) из одного запроса, поэтому перенос ветки не требует правки
+счетчиков. rebuild() пересчитывает пути и счетчики с нуля (команда rebuild_category_tree).
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
+
+from apps.shop.cache import categories_cache
+from apps.shop.models import Category, Product
+
+# Столбцы категории, которые нужны для сборки дерева помимо полей сериализатора
+TREE_FIELDS = ("id", "parent_id", "path", "product_count")
+REBUILD_BATCH_SIZE = 500
+
+
+def adjust_counts(deltas, using=None):
+    """
+    Прибавляет к счетчикам категорий приращения deltas ({category_id: delta}) — по одному UPDATE с F() на каждое
+    различное приращение — и после фиксации транзакции сбрасывает кэш списка категорий. Счетчик не опускается ниже
+    нуля, даже если успел разойтись с данными (его исправит rebuild()).
+    """
+    by_delta = defaultdict(list)
+    for category_id, delta in deltas.items():
+        if category_id is not None and delta:
+            by_delta[delta].append(category_id)
+    if not by_delta:
+        return
+    categories = Category.objects.using(using)
+    for delta, ids in by_delta.items():
+        categories.filter(id__in=ids).update(product_count=Greatest(F("product_count") + delta, Value(0)))
+    transaction.on_commit(categories_cache.invalidate, using=using)
+
+
+def category_counts(product_ids, using=None):
+    """Число товаров product_ids по категориям, включая мягко удаленные строки: {category_id: count}."""
+    return Counter(dict(
+        Product._base_manager.using(using).filter(id__in=product_ids)
+        .values_list("category_id").annotate(count=Count("id")).order_by()
+    ))
+
+
+def category_tree(rows, to_representation):
+    """
+    Собирает дерево из строк категорий (словари с полями TREE_FIELDS) в порядке rows. Каждый узел — это
+    to_representation(row) с product_count, равным числу живых товаров во всем поддереве, и списком children.
+    Возвращает список корней.
+    """
+    nodes = {}
+    for row in rows:
+        node = to_representation(row)
+        node["product_count"] = row["product_count"]
+        node["children"] = []
+        nodes[row["id"]] = (row, node)
+
+    roots = []
+    for row, node in nodes.values():
+        parent = nodes.get(row["parent_id"])
+        (parent[1]["children"] if parent else roots).append(node)
+    # Потомки глубже предков, поэтому от листьев к корням суммы поддеревьев копятся за один проход
+    for row, node in sorted(nodes.values(), key=lambda item: len(item[0]["path"]), reverse=True):
+        parent = nodes.get(row["parent_id"])
+        if parent:
+            parent[1]["product_count"] += node["product_count"]
+    return roots
+
+
+def rebuild(batch_size=REBUILD_BATCH_SIZE):
+    """
+    Пересчитывает пути всех категорий по связям parent и счетчики живых товаров. Возвращает число категорий.
+    Категории, недостижимые от корней (цикл в parent), получают путь от самих себя и становятся корнями.
+    """
+    categories = {category.id: category for category in Category.objects.only("id", "parent_id")}
+    children = defaultdict(list)
+    for category in categories.values():
+        if category.parent_id in categories:
+            children[category.parent_id].append(category)
+
+    paths = {}
+    pending = [(category, "") for category in categories.values() if category.parent_id not in categories]
+    while pending or len(paths) < len(categories):
+        if not pending:
+            orphan = next(category for category in categories.values() if category.id not in paths)
+            orphan.parent_id = None
+            pending.append((orphan, ""))
+        category, parent_path = pending.pop()
+        paths[category.id] = category.path = f"{parent_path}{category.id.hex}/"
+        pending.extend((child, category.path) for child in children[category.id] if child.id not in paths)
+
+    counts = dict(Product.objects.values_list("category_id").annotate(count=Count("id")).order_by())
+    for category in categories.values():
+        category.product_count = counts.get(category.id, 0)
+    with transaction.atomic():
+        Category.objects.bulk_update(
+            categories.values(), ["parent", "path", "product_count"], batch_size=batch_size
+        )
+        transaction.on_commit(categories_cache.invalidate)
+    return len(categories)
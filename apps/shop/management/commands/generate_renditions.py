@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from apps.accounts.models import User
+from apps.common.images import generate_renditions, touch_owners
+from apps.common.utils import chunked
+from apps.shop.models import Category, Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерирует недостающие миниатюры для уже загруженных изображений товаров, категорий и аватаров "
+        "и отмечает готовые миниатюры в кэше"
+    )
+
+    def handle(self, *args, **options):
+        sources = [
+            (Product.objects.unfiltered(), ("image1", "image2", "image3")),
+            (Category.objects.all(), ("image",)),
+            (User.objects.all(), ("avatar",)),
+        ]
+        names = set()
+        for queryset, fields in sources:
+            for row in queryset.values_list(*fields).iterator(chunk_size=2000):
+                names.update(name for name in row if name)
+
+        generated = {name for name in sorted(names) if generate_renditions(name)}
+
+        # Строкам с новыми миниатюрами обновляется updated_at, чтобы сменились их ETag и кэши
+        if generated:
+            for queryset, fields in sources:
+                rows = queryset.values_list("pk", *fields).iterator(chunk_size=2000)
+                pks = [pk for pk, *row in rows if generated.intersection(row)]
+                for batch in chunked(pks, 2000):
+                    touch_owners(queryset.model, batch)
+        self.stdout.write(self.style.SUCCESS(
+            f"Обработано изображений: {len(names)}, создано миниатюр для {len(generated)}"
+        ))
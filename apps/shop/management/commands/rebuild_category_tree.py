@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.shop.categories import REBUILD_BATCH_SIZE, rebuild
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает материализованные пути категорий и счетчики живых товаров в них"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=REBUILD_BATCH_SIZE, help="категорий в одном UPDATE")
+
+    def handle(self, *args, **options):
+        count = rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано категорий: {count}"))
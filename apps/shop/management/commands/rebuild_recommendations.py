@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.common.ledger import BACKFILL_BATCH_SIZE
+from apps.shop.recommendations import backfill
+
+
+class Command(BaseCommand):
+    help = (
+        "Учитывает в матрице совместных покупок оплаченные заказы, которые еще не учтены, и пересчитывает "
+        "рекомендации затронутых товаров"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE, help="заказов за одну транзакцию")
+        parser.add_argument("--rebuild", action="store_true", help="очистить матрицу и рекомендации и пересчитать их")
+
+    def handle(self, *args, **options):
+        recorded = backfill(batch_size=options["batch_size"], rebuild=options["rebuild"])
+        self.stdout.write(self.style.SUCCESS(f"Учтено заказов: {recorded}"))
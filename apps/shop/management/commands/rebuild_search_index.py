@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from apps.shop.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Полностью перестраивает поисковый индекс товаров"
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        count = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"{type(backend).__name__}: проиндексировано товаров: {count}"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.shop.stock import release_expired
+
+
+class Command(BaseCommand):
+    help = "Возвращает на склад товары из резервов с истекшим сроком (брошенные корзины)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        released = release_expired(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Освобождено резервов: {released}"))
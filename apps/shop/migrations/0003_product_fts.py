@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def create_fts_table(apps, schema_editor):
+    # Виртуальная таблица FTS5 нужна только на SQLite; на других СУБД бэкенд задает settings.PRODUCT_SEARCH_BACKEND
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS shop_product_fts "
+        "USING fts5(product_id UNINDEXED, name, description, tokenize='unicode61 remove_diacritics 2')"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS shop_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0002_product_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:38
+
+import apps.common.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0003_product_fts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='slug',
+            field=apps.common.fields.BulkAutoSlugField(editable=False, populate_from='name', unique=True),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:53
+
+import apps.common.fields
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sellers', '0001_initial'),
+        ('shop', '0005_stock_reservation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedProduct',
+            fields=[
+                ('id', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('name', models.CharField(max_length=100)),
+                ('slug', apps.common.fields.BulkAutoSlugField(editable=False, populate_from='name')),
+                ('desc', models.TextField()),
+                ('price_old', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('price_current', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('in_stock', models.IntegerField(default=5)),
+                ('image1', models.ImageField(upload_to='product_images/')),
+                ('image2', models.ImageField(blank=True, upload_to='product_images/')),
+                ('image3', models.ImageField(blank=True, upload_to='product_images/')),
+            ],
+            options={
+                'verbose_name': 'archived product',
+                'db_table': 'shop_product_archive',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_created_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_cat_created_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_seller_created_id_idx',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at'], name='shop_product_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-created_at', '-id'], name='product_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['category', '-created_at', '-id'], name='product_cat_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['seller', '-created_at', '-id'], name='product_seller_created_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedproduct',
+            name='category',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='shop.category'),
+        ),
+        migrations.AddField(
+            model_name='archivedproduct',
+            name='seller',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='sellers.seller'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_paths_and_counts(apps, schema_editor):
+    """
+    Существующие категории плоские, поэтому все они становятся корнями дерева: путь — один шаг из id. Счетчики
+    заполняются числом живых товаров в категории.
+    """
+    Category = apps.get_model("shop", "Category")
+    Product = apps.get_model("shop", "Product")
+
+    categories = list(Category.objects.only("id"))
+    for category in categories:
+        category.path = f"{category.id.hex}/"
+    Category.objects.bulk_update(categories, ["path"], batch_size=500)
+
+    live = (
+        Product.objects.filter(category_id=OuterRef("pk"), is_deleted=False)
+        .order_by().values("category_id").annotate(count=Count("pk")).values("count")
+    )
+    Category.objects.update(product_count=Coalesce(Subquery(live), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0007_recommendations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='shop.category'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=330),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_paths_and_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+def create_fts_keys(apps, schema_editor):
+    """
+    Суррогатные rowid для FTS: раньше rowid вычислялся из старших 63 бит UUID товара и мог совпасть у разных товаров.
+    Существующие строки индекса переносятся под новые ключи.
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE TABLE IF NOT EXISTS shop_product_fts_keys (id INTEGER PRIMARY KEY, product_id TEXT NOT NULL UNIQUE)"
+    )
+    schema_editor.execute("INSERT OR IGNORE INTO shop_product_fts_keys (product_id) SELECT product_id FROM shop_product_fts")
+    schema_editor.execute("CREATE TEMP TABLE shop_product_fts_old AS SELECT product_id, name, description FROM shop_product_fts")
+    schema_editor.execute("DELETE FROM shop_product_fts")
+    schema_editor.execute(
+        "INSERT INTO shop_product_fts (rowid, product_id, name, description) "
+        "SELECT keys.id, old.product_id, old.name, old.description FROM shop_product_fts_old AS old "
+        "JOIN shop_product_fts_keys AS keys ON keys.product_id = old.product_id"
+    )
+    schema_editor.execute("DROP TABLE shop_product_fts_old")
+
+
+def drop_fts_keys(apps, schema_editor):
+    # Старый rowid вычислялся из UUID, поэтому индекс очищается: его нужно перестроить командой rebuild_search_index
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DELETE FROM shop_product_fts")
+    schema_editor.execute("DROP TABLE IF EXISTS shop_product_fts_keys")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0008_category_tree'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_keys, drop_fts_keys),
+    ]
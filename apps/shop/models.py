@@ -1,9 +1,34 @@
 from autoslug import AutoSlugField
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Max, Q, Value
+from django.db.models.functions import Concat, Length, Substr
 
+from apps.common.archive import archive_model
+from apps.common.fields import BulkAutoSlugField
 from apps.common.models import BaseModel, IsDeletedModel
 from apps.sellers.models import Seller
 
+# Условие частичных индексов по живым (не удаленным) строкам
+LIVE = Q(is_deleted=False)
+
+# Материализованный путь категории — шаги id.hex + "/" от корня до самой категории. Символ PATH_END больше любого
+# символа шага, поэтому поддерево с путем path — это диапазон [path, path + PATH_END) по индексу
+PATH_STEP_LENGTH = 33
+MAX_CATEGORY_DEPTH = 10
+PATH_END = "~"
+
+
+def subtree_lookup(path, field="path"):
+    """
+    Условие «категория в поддереве с путем path (включая его корень)» для поля пути field, например
+    "category__path" для товаров. path — строка или выражение (Subquery).
+    """
+    if hasattr(path, "resolve_expression"):
+        end = Concat(path, Value(PATH_END), output_field=models.CharField())
+    else:
+        end = path + PATH_END
+    return Q(**{f"{field}__gte": path, f"{field}__lt": end})
+
 
 class Category(BaseModel):
     """
@@ -12,7 +37,10 @@ class Category(BaseModel):
         Атрибуты:
             name (str): Название категории, уникальное для каждого экземпляра;
             slug (str): фрагмент, созданный на основе имени, используемый в URL-адресах;
-            image (поле Image): Изображение, представляющее категорию.
+            image (поле Image): Изображение, представляющее категорию;
+            parent (ForeignKey): Родительская категория, None для корневых;
+            path (str): Материализованный путь от корня, поддерживается save();
+            product_count (int): Число живых товаров непосредственно в категории (без подкатегорий).
 
         Методы:
             __str__(): Возвращает строковое представление названия категории.
@@ -20,10 +48,54 @@ class Category(BaseModel):
     name = models.CharField(max_length=100, unique=True)
     slug = AutoSlugField(populate_from="name", unique=True, always_update=True)
     image = models.ImageField(upload_to="category_images/")
+    parent = models.ForeignKey("self", on_delete=models.CASCADE, related_name="children", null=True, blank=True)
+    path = models.CharField(max_length=PATH_STEP_LENGTH * MAX_CATEGORY_DEPTH, db_index=True, editable=False)
+    # Счетчик меняется инкрементально сигналами apps.shop.signals (см. apps.shop.categories)
+    product_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return str(self.name)
 
+    @property
+    def depth(self):
+        return len(self.path) // PATH_STEP_LENGTH
+
+    def save(self, *args, **kwargs):
+        """
+        Пересчитывает путь по родителю. Если категория перенесена в другую ветку, пути всех ее потомков меняются
+        одним UPDATE по диапазону старого пути в той же транзакции, что и сохранение самой категории. Перенос
+        отклоняется, если самый глубокий потомок оказался бы глубже MAX_CATEGORY_DEPTH.
+        """
+        old_path = self.path
+        parent_path = self.parent.path if self.parent_id else ""
+        if old_path and parent_path.startswith(old_path):
+            raise ValueError("Категорию нельзя вложить в нее саму или в ее подкатегорию")
+        path = f"{parent_path}{self.id.hex}/"
+        deepest = len(path)
+        if old_path and old_path != path:
+            subtree = Category.objects.filter(subtree_lookup(old_path)).aggregate(deepest=Max(Length("path")))
+            deepest += (subtree["deepest"] or len(old_path)) - len(old_path)
+        if deepest > self._meta.get_field("path").max_length:
+            raise ValueError(f"Глубина дерева категорий не может превышать {MAX_CATEGORY_DEPTH}")
+        self.path = path
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "parent" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "path"}
+        elif update_fields is None and not self._state.adding:
+            # Счетчик меняется только через F() (apps.shop.categories.adjust_counts): запись значения из памяти
+            # затерла бы приращения, сделанные после чтения категории
+            skipped = {"product_count", *self.get_deferred_fields()}
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped and field.name not in skipped
+            ]
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if old_path and old_path != self.path:
+                Category.objects.filter(subtree_lookup(old_path)).exclude(pk=self.pk).update(
+                    path=Concat(Value(self.path), Substr("path", len(old_path) + 1))
+                )
+
     class Meta:
         verbose_name_plural = "Categories"
 
@@ -48,7 +120,7 @@ class Product(IsDeletedModel):
 
     seller = models.ForeignKey(Seller, on_delete=models.SET_NULL, related_name="products", null=True)
     name = models.CharField(max_length=100)
-    slug = AutoSlugField(populate_from="name", unique=True, db_index=True)
+    slug = BulkAutoSlugField(populate_from="name", unique=True, db_index=True)
     desc = models.TextField()
     price_old = models.DecimalField(max_digits=10, decimal_places=2, null=True)
     price_current = models.DecimalField(max_digits=10, decimal_places=2)
@@ -60,5 +132,109 @@ class Product(IsDeletedModel):
     image2 = models.ImageField(upload_to="product_images/", blank=True)
     image3 = models.ImageField(upload_to="product_images/", blank=True)
 
+    class Meta(IsDeletedModel.Meta):
+        # Составные индексы под пагинацию по курсору (created_at, id) в каталоге товаров. Каталог читает только
+        # живые строки, поэтому индексы частичные: удаленные товары в них не попадают
+        indexes = [
+            *IsDeletedModel.Meta.indexes,
+            models.Index(fields=["-created_at", "-id"], condition=LIVE, name="product_created_id_idx"),
+            models.Index(fields=["category", "-created_at", "-id"], condition=LIVE, name="product_cat_created_id_idx"),
+            models.Index(
+                fields=["seller", "-created_at", "-id"], condition=LIVE, name="product_seller_created_id_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return str(self.name)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Категория на момент чтения: по ней сигнал count_product_category замечает перенос товара. Если столбец
+        # не был выбран (only()/defer()), смена категории такого объекта счетчики не меняет
+        instance._saved_category_id = instance.__dict__.get("category_id")
+        return instance
+
+
+# Архив мягко удаленных товаров (apps.common.archive)
+ArchivedProduct = archive_model(Product)
+
+# Статусы резервирования товара
+RESERVATION_STATUS_CHOICES = (
+    ("ACTIVE", "ACTIVE"),
+    ("COMMITTED", "COMMITTED"),
+    ("RELEASED", "RELEASED"),
+    ("EXPIRED", "EXPIRED"),
+)
+
+
+class StockReservation(BaseModel):
+    """
+    Резерв товаров на складе (например, для корзины на время оформления заказа). Количество списывается с
+    Product.in_stock в момент резервирования и возвращается при отмене или истечении срока.
+
+    Атрибуты:
+        user (ForeignKey): Пользователь, для которого создан резерв;
+        status (str): Статус резерва;
+        expires_at (DateTimeField): Момент, после которого активный резерв считается брошенным.
+    """
+
+    user = models.ForeignKey("accounts.User", on_delete=models.CASCADE, null=True, blank=True)
+    status = models.CharField(max_length=20, default="ACTIVE", choices=RESERVATION_STATUS_CHOICES)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "expires_at"], name="reservation_status_expires_idx")]
+
     def __str__(self):
-        return str(self.name)
\ No newline at end of file
+        return f"Reservation {self.id} ({self.status})"
+
+
+class StockReservationItem(BaseModel):
+    """
+    Позиция резерва: товар и зарезервированное количество.
+    """
+
+    reservation = models.ForeignKey(StockReservation, on_delete=models.CASCADE, related_name="items")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="reservation_items")
+    quantity = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.product_id} x {self.quantity}"
+
+
+class ProductCooccurrence(models.Model):
+    """
+    Разреженная матрица совместных покупок: в скольких оплаченных заказах есть и product, и other. Матрица
+    симметрична и хранит обе пары; на диагонали (product == other) — число заказов с товаром, по нему выбираются
+    бестселлеры категории. Строки пополняются apps.shop.recommendations.record_orders().
+    """
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["product", "other"], name="product_cooccurrence_uniq")]
+
+
+class ProductRecommendations(models.Model):
+    """
+    Топ соседей товара по матрице совместных покупок, пересчитанный при ее изменении. Страница товара читает одну
+    строку по первичному ключу вместо агрегации позиций заказов.
+    """
+
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="recommendations")
+    # id товаров по убыванию числа совместных заказов
+    related = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class CooccurrenceOrder(models.Model):
+    """
+    Журнал заказов, уже учтенных в матрице совместных покупок: повторные сигналы и перезапуск пересчета не учитывают
+    заказ дважды.
+    """
+
+    order = models.OneToOneField("profiles.Order", on_delete=models.CASCADE, primary_key=True, related_name="+")
+    recorded_at = models.DateTimeField(auto_now_add=True)
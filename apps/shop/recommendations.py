@@ -0,0 +1,158 @@
+"""
+Рекомендации «с этим товаром покупают».
+
+Оплаченный заказ (payment_status="SUCCESSFUL") один раз раскладывается в разреженную матрицу совместных покупок
+ProductCooccurrence: к каждой паре (a, b) различных товаров заказа, включая диагональ (a, a), прибавляется 1.
+Пачка заказов сначала сворачивается в памяти (Counter по парам), затем записывается несколькими UPDATE с F() и одним
+bulk_create. Поэтому новые заказы учитываются инкрементально, без пересчета истории. Для товаров, чьи строки матрицы
+изменились, топ-K соседей (ProductRecommendations) пересчитывается одним запросом с оконной функцией.
+
+Страница товара читает готовый топ по первичному ключу. Если соседей меньше лимита (холодный старт), список
+дополняется бестселлерами той же категории: число заказов с товаром лежит на диагонали матрицы.
+"""
+import itertools
+import uuid
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When, Window
+from django.db.models.functions import RowNumber
+
+from apps.common import ledger
+from apps.common.utils import chunked
+from apps.profiles.models import OrderItem
+from apps.shop.models import CooccurrenceOrder, ProductCooccurrence, ProductRecommendations
+
+TOP_K = 10
+# Сколько товаров пересчитывается одним запросом топа и сколько строк матрицы меняется одним запросом
+REFRESH_BATCH_SIZE = 500
+UPDATE_BATCH_SIZE = 1000
+
+
+def _cooccurrences(order_ids):
+    """Приращения матрицы от заказов order_ids: {(a, b): число заказов с обоими товарами}."""
+    baskets = defaultdict(set)
+    for order_id, product_id in OrderItem.objects.filter(order_id__in=order_ids).values_list("order_id", "product_id"):
+        baskets[order_id].add(product_id)
+    counts = Counter()
+    for products in baskets.values():
+        counts.update(itertools.product(products, repeat=2))
+    return counts
+
+
+def _apply(counts):
+    """
+    Прибавляет counts к матрице и возвращает товары, чьи строки изменились. Существующие строки увеличиваются через
+    F() — по одному UPDATE на каждое различное приращение, поэтому параллельные учеты не теряют друг друга. Если
+    недостающую строку успела создать другая транзакция, IntegrityError пробрасывается, и ledger.record() повторяет
+    пачку целиком.
+    """
+    products = {product_id for product_id, _ in counts}
+    if not products:
+        return products
+    # Строки товаров читаются диапазонами индекса (product, other): фильтр еще и по other_id заставил бы SQLite
+    # проверять каждую пару product x other, что для пачки из сотен товаров на порядок дольше.
+    existing = {
+        (product_id, other_id): pk for pk, product_id, other_id in ProductCooccurrence.objects.filter(
+            product_id__in=products
+        ).values_list("id", "product_id", "other_id")
+    }
+    by_increment = defaultdict(list)
+    for key, pk in existing.items():
+        if key in counts:
+            by_increment[counts[key]].append(pk)
+    for increment, ids in by_increment.items():
+        for batch in chunked(ids, UPDATE_BATCH_SIZE):
+            ProductCooccurrence.objects.filter(id__in=batch).update(orders=F("orders") + increment)
+
+    ProductCooccurrence.objects.bulk_create([
+        ProductCooccurrence(product_id=product_id, other_id=other_id, orders=orders)
+        for (product_id, other_id), orders in counts.items() if (product_id, other_id) not in existing
+    ], batch_size=UPDATE_BATCH_SIZE)
+    return products
+
+
+def refresh(product_ids, top_k=TOP_K):
+    """Пересчитывает топ-K соседей товаров product_ids по текущей матрице."""
+    for ids in chunked(product_ids, REFRESH_BATCH_SIZE):
+        ranked = (
+            ProductCooccurrence.objects.filter(product_id__in=ids).exclude(other_id=F("product_id"))
+            .annotate(rank=Window(
+                RowNumber(), partition_by=F("product_id"), order_by=(F("orders").desc(), F("other_id").asc()),
+            ))
+            .filter(rank__lte=top_k)
+            .order_by("product_id", "rank")
+            .values_list("product_id", "other_id")
+        )
+        related = {product_id: [] for product_id in ids}
+        for product_id, other_id in ranked:
+            related[product_id].append(str(other_id))
+        ProductRecommendations.objects.bulk_create(
+            [ProductRecommendations(product_id=product_id, related=others) for product_id, others in related.items()],
+            update_conflicts=True, unique_fields=["product"], update_fields=["related", "updated_at"],
+        )
+
+
+def _record(order_ids):
+    """Учитывает заказы в матрице. Возвращает (число учтенных заказов, товары с измененными строками)."""
+    claimed, products = ledger.record(CooccurrenceOrder, order_ids, lambda claimed: _apply(_cooccurrences(claimed)))
+    return len(claimed), products or set()
+
+
+def record_orders(order_ids):
+    """
+    Учитывает оплаченные заказы order_ids в матрице и обновляет топ затронутых товаров. Неоплаченные и уже учтенные
+    заказы пропускаются, поэтому функцию можно вызывать повторно. Возвращает число учтенных заказов.
+    """
+    recorded, products = _record(order_ids)
+    refresh(products)
+    return recorded
+
+
+def backfill(batch_size=ledger.BACKFILL_BATCH_SIZE, rebuild=False):
+    """
+    Учитывает все оплаченные заказы, которых еще нет в журнале, пачками по batch_size в порядке (created_at, id), и
+    один раз в конце пересчитывает топ затронутых товаров. rebuild=True предварительно очищает матрицу, топы и журнал.
+    Возвращает число учтенных заказов.
+    """
+    if rebuild:
+        with transaction.atomic():
+            ProductCooccurrence.objects.all().delete()
+            ProductRecommendations.objects.all().delete()
+            CooccurrenceOrder.objects.all().delete()
+
+    recorded, products = 0, set()
+    for order_ids in ledger.paid_order_pages(batch_size):
+        count, changed = _record(order_ids)
+        recorded += count
+        products |= changed
+    refresh(products)
+    return recorded
+
+
+def recommended_ids(product, limit=TOP_K):
+    """
+    id товаров для блока рекомендаций product: готовый топ соседей без мягко удаленных товаров, дополненный
+    бестселлерами категории. У product должна быть загружена связь recommendations (select_related), иначе топ читается
+    отдельным запросом.
+
+    Живые товары топа и бестселлеры выбираются одним запросом по диагонали матрицы: у каждого товара из топа есть
+    диагональная строка, потому что он входил в оплаченный заказ.
+    """
+    try:
+        top = [uuid.UUID(value) for value in product.recommendations.related[:limit]]
+    except ProductRecommendations.DoesNotExist:
+        top = []
+    candidates = list(
+        ProductCooccurrence.objects.filter(product_id=F("other_id"), product__is_deleted=False)
+        .filter(Q(product_id__in=top) | Q(product__category_id=product.category_id))
+        .exclude(product_id=product.id)
+        .annotate(in_top=Case(When(product_id__in=top, then=Value(1)), default=Value(0)))
+        .order_by("-in_top", "-orders", "product_id")
+        .values_list("product_id", flat=True)[:limit]
+    )
+    live, top_ids = set(candidates), set(top)
+    # Топ сохраняет свой порядок, бестселлеры идут после него
+    return [product_id for product_id in top if product_id in live] + [
+        product_id for product_id in candidates if product_id not in top_ids
+    ]
@@ -0,0 +1,280 @@
+import bisect
+import logging
+import math
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+from apps.common.stemmers import analyze
+from apps.common.utils import chunked
+
+logger = logging.getLogger(__name__)
+
+# Слова из названия весят больше слов из описания
+NAME_WEIGHT = 3
+# Во сколько раз совпадение по префиксу слабее точного совпадения основы
+PREFIX_WEIGHT = 0.5
+# Ограничение на количество слов, в которые раскрывается один префикс
+MAX_PREFIX_EXPANSIONS = 50
+# Сколько товаров индексируется за один executemany при полной перестройке FTS
+REBUILD_BATCH_SIZE = 2000
+
+
+def document_terms(name, desc):
+    """Возвращает частоты основ слов товара с учетом веса названия."""
+    terms = Counter()
+    for term in analyze(name):
+        terms[term] += NAME_WEIGHT
+    for term in analyze(desc):
+        terms[term] += 1
+    return terms
+
+
+class InMemorySearchBackend:
+    """
+    Инвертированный индекс в памяти процесса с ранжированием BM25 и поиском по префиксу. Индекс строится лениво при
+    первом запросе и дальше поддерживается инкрементально сигналами модели Product.
+
+    Только для тестов и разработки: изменения, сделанные в одном процессе, не видны индексам других процессов.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self.postings = {}  # основа -> {product_id: tf}
+        self.doc_terms = {}  # product_id -> Counter основ
+        self.doc_lengths = {}  # product_id -> длина документа
+        self.total_length = 0
+        self.vocabulary = []  # отсортированный список основ для поиска по префиксу
+
+    def _add(self, product_id, terms):
+        self.doc_terms[product_id] = terms
+        length = sum(terms.values())
+        self.doc_lengths[product_id] = length
+        self.total_length += length
+        for term, tf in terms.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                bisect.insort(self.vocabulary, term)
+            postings[product_id] = tf
+
+    def _remove(self, product_id):
+        terms = self.doc_terms.pop(product_id, None)
+        if terms is None:
+            return
+        self.total_length -= self.doc_lengths.pop(product_id)
+        for term in terms:
+            postings = self.postings[term]
+            postings.pop(product_id, None)
+            if not postings:
+                del self.postings[term]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, term)]
+
+    def rebuild(self):
+        from apps.shop.models import Product
+
+        with self._lock:
+            self.postings, self.doc_terms, self.doc_lengths = {}, {}, {}
+            self.total_length, self.vocabulary = 0, []
+            rows = Product.objects.values_list("id", "name", "desc").iterator(chunk_size=2000)
+            for product_id, name, desc in rows:
+                self._add(product_id, document_terms(name, desc))
+            self._built = True
+        return len(self.doc_terms)
+
+    def _ensure_built(self):
+        if not self._built:
+            self.rebuild()
+
+    def index(self, product):
+        def apply():
+            with self._lock:
+                if not self._built:
+                    return
+                self._remove(product.id)
+                if not product.is_deleted:
+                    self._add(product.id, document_terms(product.name, product.desc))
+
+        transaction.on_commit(apply)
+
+    def index_many(self, products):
+        for product in products:
+            self.index(product)
+
+    def remove(self, product_ids):
+        def apply():
+            with self._lock:
+                for product_id in product_ids:
+                    self._remove(product_id)
+
+        transaction.on_commit(apply)
+
+    def _expand(self, term):
+        """Возвращает основы словаря, начинающиеся с term, вместе с их весами."""
+        expansions = {term: 1.0} if term in self.postings else {}
+        start = bisect.bisect_right(self.vocabulary, term)
+        for candidate in self.vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not candidate.startswith(term):
+                break
+            expansions[candidate] = PREFIX_WEIGHT
+        return expansions
+
+    def search(self, query, limit=20):
+        """Возвращает список (product_id, score), отсортированный по убыванию релевантности."""
+        self._ensure_built()
+        with self._lock:
+            total_docs = len(self.doc_terms)
+            if not total_docs:
+                return []
+            avg_length = self.total_length / total_docs
+
+            scores = Counter()
+            for query_term in set(analyze(query)):
+                for term, weight in self._expand(query_term).items():
+                    postings = self.postings[term]
+                    idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for product_id, tf in postings.items():
+                        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[product_id] / avg_length)
+                        scores[product_id] += weight * idf * tf * (self.k1 + 1) / (tf + norm)
+            return scores.most_common(limit)
+
+
+class SQLiteFTSBackend:
+    """
+    Поиск через виртуальную таблицу FTS5 (создается миграцией на SQLite). В таблицу пишутся уже приведенные к основе
+    слова, поэтому стемминг русского и английского одинаков для обоих бэкендов, а ранжирование выполняет встроенная
+    функция bm25(). UUID товара хранится в неиндексируемом столбце product_id, а rowid строки — суррогатный ключ из
+    таблицы keys_table (product_id -> id). Поэтому обновление и удаление идут по первичному ключу FTS, а не полным
+    просмотром, и разные товары не могут получить один rowid.
+    """
+
+    table = "shop_product_fts"
+    keys_table = "shop_product_fts_keys"
+
+    def _delete(self, cursor, product_ids):
+        params = [[product_id.hex] for product_id in product_ids]
+        cursor.executemany(
+            f"DELETE FROM {self.table} WHERE rowid = (SELECT id FROM {self.keys_table} WHERE product_id = %s)", params
+        )
+        return params
+
+    def _insert(self, cursor, products):
+        """Индексирует строки (product_id, name, desc), которых еще нет в индексе."""
+        rows = [
+            (product_id.hex, " ".join(analyze(name)), " ".join(analyze(desc))) for product_id, name, desc in products
+        ]
+        cursor.executemany(
+            f"INSERT OR IGNORE INTO {self.keys_table} (product_id) VALUES (%s)", [[row[0]] for row in rows]
+        )
+        cursor.executemany(
+            f"INSERT INTO {self.table} (rowid, product_id, name, description) "
+            f"SELECT id, product_id, %s, %s FROM {self.keys_table} WHERE product_id = %s",
+            [[name, desc, product_id] for product_id, name, desc in rows],
+        )
+
+    def rebuild(self):
+        from apps.shop.models import Product
+
+        count = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.execute(f"DELETE FROM {self.keys_table}")
+            rows = Product.objects.values_list("id", "name", "desc").iterator(chunk_size=REBUILD_BATCH_SIZE)
+            for batch in chunked(rows, REBUILD_BATCH_SIZE):
+                self._insert(cursor, batch)
+                count += len(batch)
+        return count
+
+    def index(self, product):
+        self.index_many([product])
+
+    def index_many(self, products):
+        products = list(products)
+        with transaction.atomic(), connection.cursor() as cursor:
+            self._delete(cursor, [product.id for product in products])
+            self._insert(
+                cursor,
+                [(product.id, product.name, product.desc) for product in products if not product.is_deleted],
+            )
+
+    def remove(self, product_ids):
+        with transaction.atomic(), connection.cursor() as cursor:
+            params = self._delete(cursor, product_ids)
+            cursor.executemany(f"DELETE FROM {self.keys_table} WHERE product_id = %s", params)
+
+    def search(self, query, limit=20):
+        terms = set(analyze(query))
+        if not terms:
+            return []
+        # Каждая основа ищется и точно, и как префикс: bm25() суммирует вклад обеих фраз, поэтому точное совпадение
+        # весит вдвое больше совпадения по префиксу, как PREFIX_WEIGHT в индексе в памяти. Кавычки экранируют синтаксис
+        # FTS5
+        match = " OR ".join(f'"{term}" OR "{term}"*' for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT product_id, bm25({self.table}, 0, {NAME_WEIGHT}, 1) AS rank FROM {self.table} "
+                f"WHERE {self.table} MATCH %s ORDER BY rank LIMIT %s",
+                [match, limit],
+            )
+            return [(uuid.UUID(product_id), -rank) for product_id, rank in cursor.fetchall()]
+
+
+class UnconfiguredSearchBackend:
+    """
+    Заглушка для СУБД без FTS5, если settings.PRODUCT_SEARCH_BACKEND не задан: индексация пропускается, чтобы
+    сохранение товаров не падало, а поиск сообщает о неверной настройке.
+    """
+
+    def __init__(self, vendor):
+        self.vendor = vendor
+
+    def rebuild(self):
+        return 0
+
+    def index(self, product):
+        pass
+
+    def index_many(self, products):
+        pass
+
+    def remove(self, product_ids):
+        pass
+
+    def search(self, query, limit=20):
+        raise ImproperlyConfigured(f"Для СУБД {self.vendor} не задан settings.PRODUCT_SEARCH_BACKEND")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_search_backend():
+    """
+    Возвращает бэкенд поиска из settings.PRODUCT_SEARCH_BACKEND. По умолчанию на SQLite используется FTS5; для других
+    СУБД бэкенд нужно указать явно, иначе индексация пропускается с предупреждением в логе, а поиск недоступен.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                path = getattr(settings, "PRODUCT_SEARCH_BACKEND", None)
+                if path is None:
+                    if connection.vendor != "sqlite":
+                        logger.warning(
+                            "Для СУБД %s не задан settings.PRODUCT_SEARCH_BACKEND: товары не индексируются",
+                            connection.vendor,
+                        )
+                        _backend = UnconfiguredSearchBackend(connection.vendor)
+                        return _backend
+                    path = "apps.shop.search.SQLiteFTSBackend"
+                _backend = import_string(path)()
+    return _backend
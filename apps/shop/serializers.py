@@ -1,10 +1,24 @@
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.utils import validate_file_name
 from rest_framework import serializers
 
+from apps.common.serializers import RenditionField
+
 
 class CategorySerializer(serializers.Serializer):
     name = serializers.CharField()
     slug = serializers.SlugField(read_only=True)
     image = serializers.ImageField()
+    image_thumb = RenditionField(source="image")
+    parent_slug = serializers.SlugField(write_only=True, required=False)
+
+
+class CategoryTreeSerializer(CategorySerializer):
+    """
+    Узел дерева категорий: число живых товаров во всем поддереве и дочерние категории (узлы той же структуры).
+    """
+    product_count = serializers.IntegerField()
+    children = serializers.ListField(child=serializers.DictField())
 
 
 class SellerShopSerializer(serializers.Serializer):
@@ -14,6 +28,7 @@ class SellerShopSerializer(serializers.Serializer):
     name = serializers.CharField(source="business_name")
     slug = serializers.CharField()
     avatar = serializers.CharField(source="user.avatar")
+    avatar_thumb = RenditionField(source="user.avatar")
 
 
 class ProductSerializer(serializers.Serializer):
@@ -32,6 +47,9 @@ class ProductSerializer(serializers.Serializer):
     image1 = serializers.ImageField()
     image2 = serializers.ImageField(required=False)
     image3 = serializers.ImageField(required=False)
+    image1_thumb = RenditionField(source="image1")
+    image2_thumb = RenditionField(source="image2")
+    image3_thumb = RenditionField(source="image3")
 
 
 class CreateProductSerializer(serializers.Serializer):
@@ -46,4 +64,54 @@ class CreateProductSerializer(serializers.Serializer):
     in_stock = serializers.IntegerField()
     image1 = serializers.ImageField()
     image2 = serializers.ImageField(required=False)
-    image3 = serializers.ImageField(required=False)
\ No newline at end of file
+    image3 = serializers.ImageField(required=False)
+
+
+def validate_media_path(value):
+    """Путь к файлу внутри MEDIA_ROOT: относительный и без сегментов "..", иначе хранилище его не откроет."""
+    try:
+        validate_file_name(value, allow_relative_path=True)
+    except SuspiciousFileOperation:
+        raise serializers.ValidationError("Invalid file path")
+
+
+class ImportProductSerializer(serializers.Serializer):
+    """
+    Этот сериализатор валидирует одну строку массового импорта товаров. В отличие от CreateProductSerializer,
+    изображения передаются путями к уже загруженным файлам внутри MEDIA_ROOT.
+    """
+    name = serializers.CharField(max_length=100)
+    desc = serializers.CharField()
+    price_current = serializers.DecimalField(max_digits=10, decimal_places=2)
+    price_old = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
+    category_slug = serializers.CharField()
+    in_stock = serializers.IntegerField(min_value=0)
+    image1 = serializers.CharField(max_length=100, validators=[validate_media_path])
+    image2 = serializers.CharField(
+        max_length=100, required=False, allow_blank=True, default="", validators=[validate_media_path]
+    )
+    image3 = serializers.CharField(
+        max_length=100, required=False, allow_blank=True, default="", validators=[validate_media_path]
+    )
+
+
+class ProductFilterSerializer(serializers.Serializer):
+    """
+    Этот сериализатор валидирует query-параметры публичного каталога товаров: фильтры, курсор и размер страницы.
+    """
+    # Товары категории вместе с ее подкатегориями
+    category = serializers.SlugField(required=False)
+    seller = serializers.SlugField(required=False)
+    price_min = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    price_max = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    in_stock = serializers.BooleanField(required=False)
+    cursor = serializers.CharField(required=False)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=100)
+
+
+class ProductSearchSerializer(serializers.Serializer):
+    """
+    Этот сериализатор валидирует query-параметры полнотекстового поиска товаров.
+    """
+    q = serializers.CharField(max_length=200)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=100, default=20)
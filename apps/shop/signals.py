@@ -0,0 +1,91 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.common.images import schedule_instance_renditions
+from apps.common.ledger import PAID
+from apps.common.signals import renditions_ready, restored, soft_deleted
+from apps.profiles.models import Order
+from apps.shop import categories, recommendations
+from apps.shop.cache import categories_cache
+from apps.shop.models import Category, Product
+from apps.shop.search import get_search_backend
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver(renditions_ready, sender=Category)
+def invalidate_categories_cache(sender, **kwargs):
+    """
+    Сбрасывает кэш списка категорий после фиксации транзакции, изменившей категорию, и после появления миниатюры
+    категории (в списке image_thumb сменится с оригинала на миниатюру).
+    """
+    transaction.on_commit(categories_cache.invalidate)
+
+
+@receiver(post_save, sender=Product)
+def count_product_category(sender, instance, created, using, **kwargs):
+    """
+    Поправляет счетчики категорий при создании живого товара и при переносе живого товара в другую категорию.
+    Мягкое удаление и восстановление учитываются сигналами soft_deleted / restored.
+    """
+    old = None if created else getattr(instance, "_saved_category_id", None)
+    new = instance.category_id
+    instance._saved_category_id = new
+    if (created or old is not None) and old != new and not instance.is_deleted:
+        categories.adjust_counts({old: -1, new: 1}, using=using)
+
+
+@receiver(post_delete, sender=Product)
+def uncount_deleted_product(sender, instance, using, **kwargs):
+    if not instance.is_deleted:
+        categories.adjust_counts({instance.category_id: -1}, using=using)
+
+
+@receiver(soft_deleted, sender=Product)
+def uncount_soft_deleted_products(sender, ids, using, **kwargs):
+    """Вычитает пачку мягко удаленных товаров из счетчиков их категорий."""
+    counts = categories.category_counts(ids, using)
+    categories.adjust_counts({category_id: -count for category_id, count in counts.items()}, using=using)
+
+
+@receiver(restored, sender=Product)
+def count_restored_products(sender, ids, using, **kwargs):
+    categories.adjust_counts(categories.category_counts(ids, using), using=using)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Product)
+def generate_image_renditions(sender, instance, **kwargs):
+    """Ставит генерацию миниатюр загруженных изображений в фоновый пул."""
+    schedule_instance_renditions(instance)
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    """Обновляет товар в поисковом индексе. Мягко удаленный товар из индекса убирается."""
+    get_search_backend().index(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    get_search_backend().remove([instance.id])
+
+
+@receiver(soft_deleted, sender=Product)
+def unindex_soft_deleted_products(sender, ids, **kwargs):
+    """Убирает из поискового индекса пачку мягко удаленных товаров."""
+    get_search_backend().remove(ids)
+
+
+@receiver(restored, sender=Product)
+def index_restored_products(sender, ids, using, **kwargs):
+    """Возвращает в поисковый индекс пачку восстановленных товаров."""
+    products = Product.objects.using(using).filter(id__in=ids).only("id", "name", "desc", "is_deleted")
+    get_search_backend().index_many(products)
+
+
+@receiver(post_save, sender=Order)
+def record_paid_order(sender, instance, **kwargs):
+    """Учитывает оплаченный заказ в матрице совместных покупок после фиксации транзакции."""
+    if instance.payment_status == PAID:
+        transaction.on_commit(lambda: recommendations.record_orders([instance.pk]))
@@ -0,0 +1,119 @@
+"""
+Сервис резервирования остатков. Списание выполняется условным UPDATE
+`SET in_stock = in_stock - n WHERE in_stock >= n` одним запросом на все позиции, поэтому два параллельных оформления
+заказа не могут продать больше, чем есть на складе, и при этом не нужны блокировки строк на чтение.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from apps.shop.models import Product, StockReservation, StockReservationItem
+
+
+class InsufficientStock(Exception):
+    """Недостаточно товара на складе хотя бы для одной позиции резерва."""
+
+    def __init__(self, product_ids):
+        self.product_ids = product_ids
+        super().__init__(f"Insufficient stock for products: {', '.join(str(pk) for pk in product_ids)}")
+
+
+def _normalize(items):
+    """Приводит позиции к словарю {product_id: quantity}, складывая повторы одного товара."""
+    if isinstance(items, dict):
+        items = items.items()
+    quantities = defaultdict(int)
+    for product, quantity in items:
+        if quantity <= 0:
+            raise ValueError("Quantity must be positive")
+        quantities[getattr(product, "pk", product)] += quantity
+    return dict(quantities)
+
+
+def _quantity_case(quantities):
+    return Case(
+        *[When(id=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+
+
+def reserve(items, user=None, ttl=None):
+    """
+    Резервирует товары. items — словарь {product: quantity} или список пар (product, quantity); вместо product
+    можно передать его id. Либо резервируются все позиции, либо (при нехватке) ни одна, и выбрасывается
+    InsufficientStock.
+    """
+    quantities = _normalize(items)
+    if not quantities:
+        raise ValueError("Nothing to reserve")
+    ttl = ttl or timedelta(seconds=settings.STOCK_RESERVATION_TTL)
+    requested = _quantity_case(quantities)
+
+    with transaction.atomic():
+        # updated_at меняется вместе с остатком: по нему считаются ETag и Last-Modified списков товаров
+        updated = Product.objects.filter(id__in=quantities, in_stock__gte=requested).update(
+            in_stock=F("in_stock") - requested, updated_at=timezone.now()
+        )
+        if updated == len(quantities):
+            reservation = StockReservation.objects.create(user=user, expires_at=timezone.now() + ttl)
+            StockReservationItem.objects.bulk_create(
+                StockReservationItem(reservation=reservation, product_id=product_id, quantity=quantity)
+                for product_id, quantity in quantities.items()
+            )
+            return reservation
+        # Часть позиций списать не удалось — откатываем частичное списание
+        transaction.set_rollback(True)
+
+    available = dict(Product.objects.filter(id__in=quantities).values_list("id", "in_stock"))
+    missing = [pk for pk, qty in quantities.items() if available.get(pk, 0) < qty]
+    raise InsufficientStock(missing or list(quantities))
+
+
+def _finish(reservation, status, restore_stock):
+    """Переводит активный резерв в status. Повторный вызов для уже завершенного резерва ничего не делает."""
+    with transaction.atomic():
+        changed = StockReservation.objects.filter(id=reservation.id, status="ACTIVE").update(
+            status=status, updated_at=timezone.now()
+        )
+        if not changed:
+            return False
+        if restore_stock:
+            quantities = dict(reservation.items.values_list("product_id", "quantity"))
+            if quantities:
+                returned = _quantity_case(quantities)
+                Product.objects.unfiltered().filter(id__in=quantities).update(
+                    in_stock=F("in_stock") + returned, updated_at=timezone.now()
+                )
+    reservation.status = status
+    return True
+
+
+def commit(reservation):
+    """Подтверждает резерв (заказ оформлен): списанный остаток больше не возвращается на склад."""
+    return _finish(reservation, "COMMITTED", restore_stock=False)
+
+
+def release(reservation):
+    """Отменяет резерв и возвращает товары на склад."""
+    return _finish(reservation, "RELEASED", restore_stock=True)
+
+
+def release_expired(batch_size=500, now=None):
+    """
+    Возвращает на склад товары из брошенных резервов, у которых истек срок. Каждый резерв освобождается в своей
+    короткой транзакции. Возвращает количество освобожденных резервов.
+    """
+    now = now or timezone.now()
+    released = 0
+    while True:
+        batch = list(StockReservation.objects.filter(status="ACTIVE", expires_at__lt=now)[:batch_size])
+        if not batch:
+            return released
+        for reservation in batch:
+            released += _finish(reservation, "EXPIRED", restore_stock=True)
+        if len(batch) < batch_size:
+            return released
@@ -1,3 +1,526 @@
-from django.test import TestCase
+import base64
+import json
+import threading
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, connection
+from django.db.models import Count, QuerySet
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.common.archive import archive_deleted
+from apps.common.pagination import InvalidCursor, KeysetPagination
+from apps.common.signals import restored, soft_deleted
+from apps.profiles.models import Order, OrderItem
+from apps.sellers.bulk import ProductImporter
+from apps.shop import categories, recommendations, stock
+from apps.shop.models import (
+    MAX_CATEGORY_DEPTH, ArchivedProduct, Category, Product, ProductCooccurrence, StockReservation,
+)
+from apps.shop.search import InMemorySearchBackend, SQLiteFTSBackend, get_search_backend
+
+
+def create_product(category, name="Phone", in_stock=5):
+    return Product.objects.create(
+        name=name, desc="desc", price_current=Decimal("100.00"), category=category, in_stock=in_stock, image1="p.jpg"
+    )
+
+
+class StockReservationTest(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name="Phones", image="category_images/apple.jpg")
+        self.phone = create_product(self.category, "Phone", in_stock=5)
+        self.case = create_product(self.category, "Case", in_stock=1)
+
+    def test_reserve_decrements_all_items(self):
+        reservation = stock.reserve({self.phone: 2, self.case: 1})
+        self.phone.refresh_from_db()
+        self.case.refresh_from_db()
+        self.assertEqual((self.phone.in_stock, self.case.in_stock), (3, 0))
+        self.assertEqual(reservation.items.count(), 2)
+
+    def test_reserve_is_all_or_nothing(self):
+        with self.assertRaises(stock.InsufficientStock) as context:
+            stock.reserve([(self.phone, 2), (self.case, 2)])
+        self.assertEqual(context.exception.product_ids, [self.case.id])
+        self.phone.refresh_from_db()
+        self.assertEqual(self.phone.in_stock, 5)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_release_returns_stock_once(self):
+        reservation = stock.reserve({self.phone: 2})
+        self.assertTrue(stock.release(reservation))
+        self.assertFalse(stock.release(reservation))
+        self.assertFalse(stock.commit(reservation))
+        self.phone.refresh_from_db()
+        self.assertEqual(self.phone.in_stock, 5)
+
+    def test_commit_keeps_stock_reserved(self):
+        reservation = stock.reserve({self.phone: 2})
+        self.assertTrue(stock.commit(reservation))
+        self.assertEqual(stock.release_expired(now=timezone.now() + timedelta(days=1)), 0)
+        self.phone.refresh_from_db()
+        self.assertEqual(self.phone.in_stock, 3)
+
+    def test_release_expired(self):
+        stock.reserve({self.phone: 2}, ttl=timedelta(minutes=1))
+        stock.reserve({self.phone: 1}, ttl=timedelta(hours=1))
+        released = stock.release_expired(now=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(released, 1)
+        self.phone.refresh_from_db()
+        self.assertEqual(self.phone.in_stock, 4)
+
+
+class StockReservationConcurrencyTest(TransactionTestCase):
+    threads = 16
+    attempts_per_thread = 10
+    initial_stock = 50
+
+    def test_hot_sku_is_never_oversold(self):
+        category = Category.objects.create(name="Phones", image="category_images/apple.jpg")
+        product = create_product(category, in_stock=self.initial_stock)
+        results = []
+        barrier = threading.Barrier(self.threads)
+
+        def worker():
+            barrier.wait()
+            try:
+                for _ in range(self.attempts_per_thread):
+                    while True:
+                        try:
+                            stock.reserve({product.id: 1})
+                            results.append(True)
+                        except stock.InsufficientStock:
+                            results.append(False)
+                        except OperationalError:
+                            # SQLite сериализует запись блокировкой базы — повторяем попытку
+                            continue
+                        break
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker) for _ in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        product.refresh_from_db()
+        self.assertEqual(len(results), self.threads * self.attempts_per_thread)
+        self.assertEqual(results.count(True), self.initial_stock)
+        self.assertEqual(product.in_stock, 0)
+        self.assertEqual(StockReservation.objects.count(), self.initial_stock)
+
+
+class SoftDeleteArchiveTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Phones", image="category_images/apple.jpg")
+        self.live = create_product(category, "Live")
+        self.old = create_product(category, "Old")
+        self.ordered = create_product(category, "Ordered")
+        user = User.objects.create_user("Ivan", "Petrov", "buyer@example.com", "password123")
+        OrderItem.objects.create(user=user, product=self.ordered)
+        Product.objects.filter(id__in=[self.old.id, self.ordered.id]).delete()
+        Product.objects.unfiltered().filter(is_deleted=True).update(deleted_at=timezone.now() - timedelta(days=60))
+
+    def test_moves_only_unreferenced_rows_past_retention(self):
+        self.assertEqual(archive_deleted(Product, retention_days=90, pause=0), 0)
+        self.assertEqual(archive_deleted(Product, retention_days=30, batch_size=1, pause=0), 1)
+
+        self.assertFalse(Product._base_manager.filter(id=self.old.id).exists())
+        self.assertTrue(Product._base_manager.filter(id=self.ordered.id).exists())
+        self.assertEqual(ArchivedProduct.objects.get().name, "Old")
+
+    def test_with_archived_reads_live_and_archived_rows(self):
+        archive_deleted(Product, pause=0)
+
+        self.assertEqual(Product.objects.count(), 1)
+        self.assertEqual(Product.objects.with_archived().count(), 3)
+        archived = Product.objects.with_archived().get(slug=self.old.slug)
+        self.assertIsInstance(archived, Product)
+        self.assertTrue(archived.is_deleted)
+        self.assertEqual(
+            list(Product.objects.with_archived().order_by("name").values_list("name", flat=True)),
+            ["Live", "Old", "Ordered"],
+        )
+
+    def test_unfiltered_stays_a_queryset(self):
+        archive_deleted(Product, pause=0)
+
+        products = Product.objects.unfiltered()
+        self.assertIsInstance(products, QuerySet)
+        self.assertEqual(set(products.select_related("category").in_bulk()), {self.live.id, self.ordered.id})
+        self.assertEqual(products.annotate(items=Count("orderitem")).get(id=self.ordered.id).items, 1)
+
+
+    def test_new_slugs_skip_deleted_and_archived_rows(self):
+        archive_deleted(Product, pause=0)
+
+        category = self.live.category
+        # "Old" лежит в архиве, "Ordered" мягко удален и остался в рабочей таблице
+        fresh = [create_product(category, "Old"), create_product(category, "Ordered")]
+        self.assertNotIn(fresh[0].slug, {self.old.slug, self.ordered.slug})
+        self.assertNotIn(fresh[1].slug, {self.old.slug, self.ordered.slug})
+
+        imported = [Product(name="Old", category=category), Product(name="Ordered", category=category)]
+        ProductImporter(seller=None).reserve_slugs(imported)
+        taken = {self.old.slug, self.ordered.slug, *(product.slug for product in fresh)}
+        self.assertFalse(taken & {product.slug for product in imported})
+
+class BulkSoftDeleteTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Phones", image="category_images/apple.jpg")
+        self.products = [create_product(category, f"Phone {i}") for i in range(5)]
+        self.batches = []
+        soft_deleted.connect(self.record, sender=Product)
+        restored.connect(self.record, sender=Product)
+
+    def tearDown(self):
+        soft_deleted.disconnect(self.record, sender=Product)
+        restored.disconnect(self.record, sender=Product)
+
+    def record(self, signal, ids, **kwargs):
+        self.batches.append((signal, ids))
+
+    def search_count(self):
+        return len(get_search_backend().search("phone"))
+
+    def test_soft_delete_and_restore_in_batches(self):
+        self.assertEqual(self.search_count(), 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(Product.objects.all().soft_delete(batch_size=2), 5)
+        self.assertEqual([len(ids) for _, ids in self.batches], [2, 2, 1])
+        self.assertEqual(sorted(id for _, ids in self.batches for id in ids), sorted(p.id for p in self.products))
+        self.assertEqual(Product.objects.count(), 0)
+        self.assertEqual(self.search_count(), 0)
+
+        self.batches.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(Product.objects.unfiltered().restore(batch_size=10), 5)
+        self.assertEqual([signal for signal, _ in self.batches], [restored])
+        self.assertEqual(Product.objects.count(), 5)
+        self.assertEqual(self.search_count(), 5)
+
+
+class RecommendationsTest(TestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user("Petr", "Ivanov", "buyer@example.com", "password123")
+        self.phones = Category.objects.create(name="Phones", image="c.jpg")
+        self.phone, self.case, self.charger, self.new = [
+            create_product(self.phones, name) for name in ("Phone", "Case", "Charger", "New phone")
+        ]
+        self.cable = create_product(Category.objects.create(name="Cables", image="c.jpg"), "Cable")
+
+    def pay_order(self, *products):
+        order = Order.objects.create(user=self.buyer, address="Lenina 2")
+        for product in products:
+            OrderItem.objects.create(user=self.buyer, order=order, product=product, quantity=1)
+        order.payment_status = "SUCCESSFUL"
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+        return order
+
+    def related(self, product):
+        response = self.client.get(f"/shop/products/{product.slug}/related/")
+        self.assertEqual(response.status_code, 200)
+        return [item["slug"] for item in response.json()["results"]]
+
+    def test_top_neighbours_are_updated_incrementally(self):
+        self.pay_order(self.phone, self.case)
+        self.pay_order(self.phone, self.charger, self.cable)
+        self.pay_order(self.phone, self.charger)
+        order = self.pay_order(self.phone, self.charger, self.case)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+
+        self.assertEqual(ProductCooccurrence.objects.get(product=self.phone, other=self.charger).orders, 3)
+        self.assertEqual(ProductCooccurrence.objects.get(product=self.phone, other=self.phone).orders, 4)
+        self.assertEqual(self.related(self.phone)[:3], [self.charger.slug, self.case.slug, self.cable.slug])
+
+        # Пересчет с нуля дает ту же матрицу и те же топы
+        matrix = sorted(ProductCooccurrence.objects.values_list("product_id", "other_id", "orders"))
+        self.assertEqual(recommendations.backfill(rebuild=True), 4)
+        self.assertEqual(sorted(ProductCooccurrence.objects.values_list("product_id", "other_id", "orders")), matrix)
+        self.assertEqual(self.related(self.phone)[:3], [self.charger.slug, self.case.slug, self.cable.slug])
+
+    def test_cold_start_falls_back_to_category_bestsellers(self):
+        self.pay_order(self.phone, self.case)
+        self.pay_order(self.phone)
+        self.pay_order(self.cable)
+        self.assertEqual(self.related(self.new), [self.phone.slug, self.case.slug])
+
+        # Соседи идут первыми, затем бестселлеры категории без повторов; удаленные товары не показываются
+        self.case.delete()
+        self.assertEqual(self.related(self.cable), [])
+        self.assertEqual(self.related(self.charger), [self.phone.slug])
+        self.assertEqual(self.client.get("/shop/products/unknown/related/").status_code, 404)
+
+    def test_deleted_neighbours_are_replaced_by_bestsellers(self):
+        self.pay_order(self.phone, self.charger, self.case)
+        self.pay_order(self.phone, self.charger, self.cable)
+        self.pay_order(self.phone, self.charger)
+        self.pay_order(self.phone, self.case)
+        self.pay_order(self.new)
+
+        def recommended():
+            phone = Product.objects.select_related("recommendations").get(id=self.phone.id)
+            with self.assertNumQueries(1):
+                return recommendations.recommended_ids(phone, limit=3)
+
+        self.assertEqual(recommended(), [self.charger.id, self.case.id, self.cable.id])
+        self.charger.delete()
+        self.assertEqual(recommended(), [self.case.id, self.cable.id, self.new.id])
+
+
+class CategoryTreeTest(TestCase):
+    def setUp(self):
+        # Кэш дерева сбрасывается в on_commit: без выполнения колбэков остался бы ответ предыдущего теста
+        with self.captureOnCommitCallbacks(execute=True):
+            self.electronics = Category.objects.create(name="Electronics", image="c.jpg")
+            self.phones = Category.objects.create(name="Phones", image="c.jpg", parent=self.electronics)
+            self.smartphones = Category.objects.create(name="Smartphones", image="c.jpg", parent=self.phones)
+            self.books = Category.objects.create(name="Books", image="c.jpg")
+            self.phone = create_product(self.phones, "Phone")
+            self.iphone = create_product(self.smartphones, "iPhone")
+            self.pixel = create_product(self.smartphones, "Pixel")
+            self.book = create_product(self.books, "Book")
+
+    def tree(self):
+        response = self.client.get("/shop/categories/")
+        self.assertEqual(response.status_code, 200)
+
+        def counts(nodes):
+            return {node["slug"]: (node["product_count"], counts(node["children"])) for node in nodes}
+
+        return counts(response.json())
+
+    def catalog(self, category):
+        response = self.client.get("/shop/products/", {"category": category.slug})
+        return sorted(item["slug"] for item in response.json()["results"])
+
+    def test_tree_counts_follow_product_changes(self):
+        self.assertEqual(self.tree(), {
+            "books": (1, {}),
+            "electronics": (3, {"phones": (3, {"smartphones": (2, {})})}),
+        })
+        self.assertEqual(self.catalog(self.phones), sorted([self.phone.slug, self.iphone.slug, self.pixel.slug]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.iphone.delete()
+            Product.objects.filter(id=self.pixel.id).soft_delete()
+            product = Product.objects.get(id=self.book.id)
+            product.category = self.smartphones
+            product.save()
+        self.assertEqual(self.tree(), {
+            "books": (0, {}),
+            "electronics": (2, {"phones": (2, {"smartphones": (1, {})})}),
+        })
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.unfiltered().filter(id=self.pixel.id).restore()
+            self.phone.hard_delete()
+        self.assertEqual(self.tree(), {
+            "books": (0, {}),
+            "electronics": (2, {"phones": (2, {"smartphones": (2, {})})}),
+        })
+
+    def test_moving_a_branch_rewrites_descendant_paths(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.phones.parent = self.books
+            self.phones.save()
+        self.smartphones.refresh_from_db()
+        self.assertTrue(self.smartphones.path.startswith(self.books.path))
+        self.assertEqual(self.smartphones.depth, 3)
+        self.assertEqual(self.catalog(self.electronics), [])
+        self.assertEqual(self.catalog(self.books), sorted([self.book.slug, self.phone.slug, self.iphone.slug,
+                                                           self.pixel.slug]))
+        self.assertEqual(self.tree()["books"][0], 4)
+
+        self.books.parent = self.smartphones
+        with self.assertRaises(ValueError):
+            self.books.save()
+
+        # Пересчет с нуля дает те же пути и счетчики
+        paths = sorted(Category.objects.values_list("path", "product_count"))
+        Category.objects.update(path="", product_count=0)
+        self.assertEqual(categories.rebuild(), 4)
+        self.assertEqual(sorted(Category.objects.values_list("path", "product_count")), paths)
+
+    def test_move_respects_depth_of_the_whole_subtree(self):
+        chain = [self.books]
+        for number in range(MAX_CATEGORY_DEPTH - 2):
+            chain.append(Category.objects.create(name=f"Level {number}", image="c.jpg", parent=chain[-1]))
+        # Ветка phones -> smartphones двухуровневая: под chain[-2] она заканчивается ровно на пределе глубины
+        with self.captureOnCommitCallbacks(execute=True):
+            self.phones.parent = chain[-2]
+            self.phones.save()
+        self.smartphones.refresh_from_db()
+        self.assertEqual(self.smartphones.depth, MAX_CATEGORY_DEPTH)
+
+        self.phones.parent = chain[-1]
+        with self.assertRaises(ValueError):
+            self.phones.save()
+        self.smartphones.refresh_from_db()
+        self.assertEqual(self.smartphones.depth, MAX_CATEGORY_DEPTH)
+
+    def test_failed_descendant_update_rolls_back_the_move(self):
+        phones_path = self.phones.path
+        self.phones.parent = self.books
+        with mock.patch.object(QuerySet, "update", side_effect=OperationalError("database is locked")):
+            with self.assertRaises(OperationalError):
+                self.phones.save()
+        self.phones.refresh_from_db()
+        self.assertEqual((self.phones.parent_id, self.phones.path), (self.electronics.id, phones_path))
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Phones", image="category_images/apple.jpg")
+        self.create = lambda name, desc, **kwargs: Product.objects.create(
+            name=name, desc=desc, price_current=Decimal("100.00"), category=category, image1="p.jpg", **kwargs
+        )
+        self.in_name = self.create("Беспроводные наушники", "Удобные")
+        self.in_desc = self.create("Чехол", "Подходит к беспроводным наушникам и телефонам")
+        self.phone = self.create("Smartphone X", "Phones with wireless charging")
+
+    def backends(self):
+        memory = InMemorySearchBackend()
+        memory.rebuild()
+        return [SQLiteFTSBackend(), memory]
+
+    def ids(self, backend, query):
+        return [product_id for product_id, _ in backend.search(query)]
+
+    def test_bm25_ranks_name_matches_first(self):
+        for backend in self.backends():
+            with self.subTest(backend=type(backend).__name__):
+                hits = backend.search("наушники")
+                self.assertEqual([product_id for product_id, _ in hits], [self.in_name.id, self.in_desc.id])
+                self.assertGreater(hits[0][1], hits[1][1])
+
+    def test_stemming_and_prefix(self):
+        for backend in self.backends():
+            with self.subTest(backend=type(backend).__name__):
+                self.assertEqual(self.ids(backend, "беспроводной наушник"), [self.in_name.id, self.in_desc.id])
+                self.assertEqual(self.ids(backend, "телефон"), [self.in_desc.id])
+                self.assertEqual(self.ids(backend, "phone"), [self.phone.id])
+                self.assertEqual(self.ids(backend, "smartph"), [self.phone.id])
+                self.assertEqual(self.ids(backend, "charging"), [self.phone.id])
+                self.assertEqual(self.ids(backend, "!!!"), [])
+
+    def test_exact_match_outranks_prefix_match(self):
+        exact, prefix = self.create("Tab", ""), self.create("Tablet", "")
+        for backend in self.backends():
+            with self.subTest(backend=type(backend).__name__):
+                hits = backend.search("tab")
+                self.assertEqual([product_id for product_id, _ in hits], [exact.id, prefix.id])
+                self.assertGreater(hits[0][1], hits[1][1])
+
+    def test_unconfigured_backend_skips_indexing(self):
+        with mock.patch("apps.shop.search._backend", None):
+            with mock.patch.object(connection, "vendor", "postgresql"), self.assertLogs("apps.shop.search", "WARNING"):
+                backend = get_search_backend()
+            self.assertIs(get_search_backend(), backend)
+            self.create("Tab", "")
+            self.assertEqual(backend.rebuild(), 0)
+            with self.assertRaises(ImproperlyConfigured):
+                backend.search("tab")
+
+    def test_fts_follows_product_changes(self):
+        backend = get_search_backend()
+        self.in_name.name = "Колонка"
+        self.in_name.save()
+        self.assertEqual(self.ids(backend, "наушники"), [self.in_desc.id])
+        self.assertEqual(self.ids(backend, "колонка"), [self.in_name.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(id=self.in_desc.id).soft_delete()
+        self.phone.hard_delete()
+        self.assertEqual(self.ids(backend, "наушники телефон smartphone"), [])
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT product_id FROM {SQLiteFTSBackend.keys_table}")
+            self.assertEqual([row[0] for row in cursor.fetchall()], [self.in_name.id.hex])
+
+        self.assertEqual(backend.rebuild(), 1)
+        self.assertEqual(self.ids(backend, "колонка"), [self.in_name.id])
+
+    def test_uuids_sharing_high_bits_get_distinct_rows(self):
+        # Старшие 63 бита совпадают — прежний rowid (id.int >> 65) был у этих товаров одинаковым
+        high = uuid.uuid4().int >> 65 << 65
+        first = self.create("Adapter one", "", id=uuid.UUID(int=high | 1))
+        second = self.create("Adapter two", "", id=uuid.UUID(int=high | 2))
+        self.assertCountEqual(self.ids(get_search_backend(), "adapter"), [first.id, second.id])
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Phones", image="category_images/apple.jpg")
+        self.products = [create_product(category, f"Phone {i}") for i in range(7)]
+        # Четыре товара с одинаковым created_at: порядок между ними задает id
+        tie = timezone.now() - timedelta(hours=1)
+        Product.objects.filter(id__in=[product.id for product in self.products[2:6]]).update(created_at=tie)
+        self.expected = list(Product.objects.order_by("-created_at", "-id").values_list("slug", flat=True))
+
+    def walk(self, limit):
+        slugs, pages, cursor = [], [], None
+        while True:
+            params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+            response = self.client.get("/shop/products/", params)
+            self.assertEqual(response.status_code, 200)
+            pages.append(len(response.data["results"]))
+            slugs.extend(product["slug"] for product in response.data["results"])
+            cursor = response.data["next"]
+            if cursor is None:
+                return slugs, pages
+
+    def test_pages_cover_every_product_once(self):
+        for limit in (1, 2, 3, 7, 100):
+            with self.subTest(limit=limit):
+                slugs, pages = self.walk(limit)
+                self.assertEqual(slugs, self.expected)
+                # Последняя страница без next; ровно limit оставшихся строк не дают лишней пустой страницы
+                self.assertEqual(pages[-1], 7 - limit * (len(pages) - 1))
+
+    def test_probe_reads_one_extra_row(self):
+        paginator = KeysetPagination(limit=3)
+        self.assertEqual(paginator.page_queryset(Product.objects.all()).query.high_mark, 4)
+
+        page, next_cursor = paginator.paginate_queryset(Product.objects.all())
+        self.assertEqual(len(page), 3)
+        self.assertEqual(KeysetPagination.decode_cursor(next_cursor), (page[-1].created_at, page[-1].id))
+
+        last = Product.objects.order_by("-created_at", "-id")[3]
+        page, next_cursor = paginator.paginate_queryset(Product.objects.all(), KeysetPagination.encode_cursor(last))
+        self.assertEqual([product.slug for product in page], self.expected[4:7])
+        self.assertIsNone(next_cursor)
+
+    def test_cursor_round_trip(self):
+        product = self.products[3]
+        row = {"created_at": product.created_at, "id": product.id}
+        self.assertEqual(KeysetPagination.encode_cursor(row), KeysetPagination.encode_cursor(product))
+        self.assertEqual(
+            KeysetPagination.decode_cursor(KeysetPagination.encode_cursor(row)), (product.created_at, product.id)
+        )
+
+    def test_invalid_cursor(self):
+        def encode(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+        cursors = [
+            "garbage", encode(["2025-01-01T00:00:00+00:00", "not-a-uuid"]), encode(["yesterday", str(uuid.uuid4())]),
+            encode({"created_at": "2025-01-01"}),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(InvalidCursor):
+                    KeysetPagination.decode_cursor(cursor)
+                response = self.client.get("/shop/products/", {"cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data, {"message": "Invalid cursor"})
@@ -1,7 +1,18 @@
 from django.urls import path
 
-from apps.shop.views import CategoriesView
+from apps.common.async_views import select_view
+from apps.shop.views import (
+    AsyncCategoriesView,
+    AsyncProductsView,
+    CategoriesView,
+    ProductSearchView,
+    ProductsView,
+    RelatedProductsView,
+)
 
 urlpatterns = [
-    path("categories/", CategoriesView.as_view()),
-]
\ No newline at end of file
+    path("categories/", select_view(CategoriesView, AsyncCategoriesView)),
+    path("products/", select_view(ProductsView, AsyncProductsView)),
+    path("products/search/", ProductSearchView.as_view()),
+    path("products/<slug:slug>/related/", RelatedProductsView.as_view()),
+]
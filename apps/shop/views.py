@@ -1,40 +1,246 @@
+from asgiref.sync import sync_to_async
+from django.db.models import Subquery
 from drf_spectacular.utils import extend_schema
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from apps.shop.models import Category
-from apps.shop.serializers import CategorySerializer
+from apps.common.async_views import AsyncAPIView
+from apps.common.cache import cached_json_response
+from apps.common.compiled import compile_serializer
+from apps.common.pagination import InvalidCursor, KeysetPagination
+from apps.common.projection import get_projection
+from apps.common.renderers import dumps
+from apps.shop.cache import categories_cache
+from apps.shop.categories import TREE_FIELDS, category_tree
+from apps.shop.models import MAX_CATEGORY_DEPTH, Category, Product, subtree_lookup
+from apps.shop.recommendations import recommended_ids
+from apps.shop.search import get_search_backend
+from apps.shop.serializers import (
+    CategorySerializer,
+    CategoryTreeSerializer,
+    ProductFilterSerializer,
+    ProductSearchSerializer,
+    ProductSerializer,
+)
 
 tags = ["Shop"]
 
 
 class CategoriesView(APIView):
     serializer_class = CategorySerializer
+    query_budget = {"GET": 2}
 
     @extend_schema(
         summary="Categories Fetch",
         description="""
-            Этот endpoint возвращает все категории.
+            Этот endpoint возвращает дерево категорий: корневые категории с вложенными `children`. `product_count`
+            каждой категории — число товаров в ней и во всех ее подкатегориях. Ответ отдается из кэша и поддерживает
+            условные запросы (ETag / If-None-Match).
         """,
-        tags=tags
+        tags=tags,
+        responses=CategoryTreeSerializer(many=True),
     )
     def get(self, request, *args, **kwargs):
-        categories = Category.objects.all()
-        serializer = self.serializer_class(categories, many=True)
-        return Response(data=serializer.data, status=200)
+        payload = categories_cache.get_or_set(self.render_categories)
+        return cached_json_response(request, payload)
+
+    def get_queryset(self):
+        """Все категории одним запросом: столбцы сериализатора и поля дерева, сиблинги по имени."""
+        projection = get_projection(Category, self.serializer_class, extra=TREE_FIELDS)
+        return projection.values(Category.objects.order_by("name"))
+
+    def render_tree(self, rows):
+        return dumps(category_tree(rows, compile_serializer(self.serializer_class).to_representation))
+
+    def render_categories(self):
+        return self.render_tree(self.get_queryset())
 
     @extend_schema(
         summary="Category Create",
         description="""
-            Этот endpoint создает категории.
+            Этот endpoint создает категории. Чтобы создать подкатегорию, передайте slug родителя в `parent_slug`.
         """,
         tags=tags
     )
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
-            new_cat = Category.objects.create(**serializer.validated_data)
+            data = serializer.validated_data
+            parent_slug = data.pop("parent_slug", None)
+            if parent_slug is not None:
+                parent = Category.objects.get_or_none(slug=parent_slug)
+                if not parent:
+                    return Response(data={"message": "Parent category does not exist!"}, status=404)
+                if parent.depth >= MAX_CATEGORY_DEPTH:
+                    return Response(data={"message": "Category tree is too deep!"}, status=400)
+                data["parent"] = parent
+            new_cat = Category.objects.create(**data)
             serializer = self.serializer_class(new_cat)
             return Response(serializer.data, status=200)
         else:
-            return Response(serializer.errors, status=400)
\ No newline at end of file
+            return Response(serializer.errors, status=400)
+
+
+class AsyncCategoriesView(AsyncAPIView, CategoriesView):
+    """Асинхронный вариант CategoriesView для ASGI: при промахе кэша категории читаются через async ORM."""
+
+    @extend_schema(
+        summary="Categories Fetch",
+        description="""
+            Этот endpoint возвращает дерево категорий: корневые категории с вложенными `children`. `product_count`
+            каждой категории — число товаров в ней и во всех ее подкатегориях. Ответ отдается из кэша и поддерживает
+            условные запросы (ETag / If-None-Match).
+        """,
+        tags=tags,
+        responses=CategoryTreeSerializer(many=True),
+    )
+    async def get(self, request, *args, **kwargs):
+        payload = await categories_cache.aget_or_set(self.arender_categories)
+        return cached_json_response(request, payload)
+
+    async def arender_categories(self):
+        categories = [category async for category in self.get_queryset()]
+        # RenditionField проверяет готовность миниатюр синхронно (кэш, хранилище), поэтому сериализация — в потоке
+        return await sync_to_async(self.render_tree)(categories)
+
+
+class ProductsView(APIView):
+    """
+    Публичный каталог товаров с пагинацией по курсору (created_at, id) и фильтрацией по категории, продавцу, цене и
+    наличию на складе.
+    """
+    serializer_class = ProductSerializer
+    query_budget = {"GET": 2}
+    pagination_class = KeysetPagination
+
+    def get_queryset(self, filters):
+        """Страница читается строками .values() только со столбцами сериализатора и курсора."""
+        projection = get_projection(Product, self.serializer_class, extra=self.pagination_class.cursor_fields)
+        products = projection.values(Product.objects.all())
+        if "category" in filters:
+            # Путь категории подставляется подзапросом: поддерево — диапазон по индексу пути, без отдельного запроса
+            path = Subquery(Category.objects.filter(slug=filters["category"]).values("path")[:1])
+            products = products.filter(subtree_lookup(path, "category__path"))
+        if "seller" in filters:
+            products = products.filter(seller__slug=filters["seller"])
+        if "price_min" in filters:
+            products = products.filter(price_current__gte=filters["price_min"])
+        if "price_max" in filters:
+            products = products.filter(price_current__lte=filters["price_max"])
+        if filters.get("in_stock"):
+            products = products.filter(in_stock__gt=0)
+        return products
+
+    @extend_schema(
+        summary="Products Fetch",
+        description="""
+            Этот endpoint возвращает товары постранично. Для получения следующей страницы передайте значение `next`
+            из ответа в параметре `cursor`. Товары могут быть отфильтрованы по категории, продавцу, цене и наличию.
+        """,
+        tags=tags,
+        parameters=[ProductFilterSerializer],
+    )
+    def get(self, request, *args, **kwargs):
+        filter_serializer = ProductFilterSerializer(data=request.query_params)
+        filter_serializer.is_valid(raise_exception=True)
+        filters = filter_serializer.validated_data
+
+        paginator = self.pagination_class(limit=filters.get("limit"))
+        try:
+            products, next_cursor = paginator.paginate_queryset(self.get_queryset(filters), filters.get("cursor"))
+        except InvalidCursor:
+            return Response(data={"message": "Invalid cursor"}, status=400)
+
+        results = compile_serializer(self.serializer_class).many(products)
+        return Response(data={"next": next_cursor, "results": results}, status=200)
+
+
+class AsyncProductsView(AsyncAPIView, ProductsView):
+    """Асинхронный вариант ProductsView для ASGI: страница каталога читается через async ORM."""
+
+    @extend_schema(
+        summary="Products Fetch",
+        description="""
+            Этот endpoint возвращает товары постранично. Для получения следующей страницы передайте значение `next`
+            из ответа в параметре `cursor`. Товары могут быть отфильтрованы по категории, продавцу, цене и наличию.
+        """,
+        tags=tags,
+        parameters=[ProductFilterSerializer],
+    )
+    async def get(self, request, *args, **kwargs):
+        filter_serializer = ProductFilterSerializer(data=request.query_params)
+        filter_serializer.is_valid(raise_exception=True)
+        filters = filter_serializer.validated_data
+
+        paginator = self.pagination_class(limit=filters.get("limit"))
+        try:
+            products, next_cursor = await paginator.apaginate_queryset(
+                self.get_queryset(filters), filters.get("cursor")
+            )
+        except InvalidCursor:
+            return Response(data={"message": "Invalid cursor"}, status=400)
+
+        results = await sync_to_async(compile_serializer(self.serializer_class).many)(products)
+        return Response(data={"next": next_cursor, "results": results}, status=200)
+
+
+class ProductSearchView(APIView):
+    """
+    Полнотекстовый поиск товаров по названию и описанию. Ранжирование выполняет поисковый бэкенд (BM25), а товары
+    затем подгружаются одним запросом по найденным id.
+    """
+    serializer_class = ProductSerializer
+    query_budget = {"GET": 3}
+
+    @extend_schema(
+        summary="Products Search",
+        description="""
+            Этот endpoint ищет товары по названию и описанию с учетом морфологии (русский и английский) и префиксов.
+            Результаты отсортированы по релевантности.
+        """,
+        tags=tags,
+        parameters=[ProductSearchSerializer],
+    )
+    def get(self, request, *args, **kwargs):
+        query_serializer = ProductSearchSerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        query = query_serializer.validated_data
+
+        hits = get_search_backend().search(query["q"], limit=query["limit"])
+        product_ids = [product_id for product_id, _ in hits]
+        products = get_projection(Product, self.serializer_class).only(Product.objects.all()).in_bulk(product_ids)
+        ranked = [products[product_id] for product_id in product_ids if product_id in products]
+
+        results = compile_serializer(self.serializer_class).many(ranked)
+        return Response(data={"results": results}, status=200)
+
+
+class RelatedProductsView(APIView):
+    """
+    Блок «с этим товаром покупают» на странице товара: готовый топ соседей по совместным покупкам
+    (apps.shop.recommendations), для новых товаров — бестселлеры категории.
+    """
+    serializer_class = ProductSerializer
+    query_budget = {"GET": 3}
+
+    @extend_schema(
+        summary="Related Products Fetch",
+        description="""
+            Этот endpoint возвращает товары, которые покупают вместе с указанным товаром. Если совместных покупок
+            мало, список дополняется бестселлерами той же категории.
+        """,
+        tags=tags,
+    )
+    def get(self, request, *args, **kwargs):
+        product = (
+            Product.objects.select_related("recommendations").only("id", "category_id", "recommendations__related")
+            .get_or_none(slug=kwargs["slug"])
+        )
+        if not product:
+            return Response(data={"message": "Product does not exist!"}, status=404)
+
+        ids = recommended_ids(product)
+        projection = get_projection(Product, self.serializer_class, extra=("id",))
+        rows = {row["id"]: row for row in projection.values(Product.objects.filter(id__in=ids))} if ids else {}
+        results = compile_serializer(self.serializer_class).many(rows[pk] for pk in ids if pk in rows)
+        return Response(data={"results": results}, status=200)
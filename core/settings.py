@@ -9,7 +9,9 @@ https://docs.djangoproject.com/en/5.1/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
+import os
 from datetime import timedelta
+from importlib.util import find_spec
 from pathlib import Path
 
 from django.conf.global_settings import AUTH_USER_MODEL
@@ -51,6 +53,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Снаружи PerformanceMiddleware: запросы к таблице ключей не входят в query_budget представлений
+    'apps.common.middleware.IdempotencyMiddleware',
+    'apps.common.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -110,6 +115,35 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Хэширование паролей (apps.accounts.hashers): первый хэшер используется для новых паролей, остальные — только для
+# проверки старых хэшей, которые перехэшируются при следующем входе. Argon2 требует пакет argon2-cffi, без него
+# новые пароли хэшируются scrypt
+PASSWORD_HASHERS = [
+    'apps.accounts.hashers.TunedArgon2PasswordHasher',
+    'apps.accounts.hashers.TunedScryptPasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+if find_spec("argon2") is None:
+    PASSWORD_HASHERS.remove('apps.accounts.hashers.TunedArgon2PasswordHasher')
+
+# Параметры алгоритмов и пул процессов, в котором хэшируются и проверяются пароли: POOL_SIZE процессов
+# (None — по числу ядер, 0 — без пула) и не больше QUEUE_DEPTH проверок одновременно, остальные получают 503
+PASSWORD_HASHING = {
+    "ARGON2": {"time_cost": 2, "memory_cost": 19456, "parallelism": 1},
+    "SCRYPT": {"work_factor": 2 ** 14, "block_size": 8, "parallelism": 1},
+    "POOL_SIZE": None,
+    "QUEUE_DEPTH": 32,
+}
+
+AUTHENTICATION_BACKENDS = ['apps.accounts.backends.PooledModelBackend']
+
+# Лимиты запросов к endpoint'ам токенов (apps.accounts.throttling): с одного IP и на один email
+LOGIN_RATE_LIMITS = {
+    "ip": "60/min",
+    "email": "10/min",
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
@@ -143,11 +177,70 @@ MEDIA_URL = '/media/'
 # DRF
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.accounts.authentication.LazyJWTAuthentication',
+    ],
+    # JSON кодируется и разбирается через orjson (без пакета — стандартной реализацией DRF)
+    'DEFAULT_RENDERER_CLASSES': [
+        'apps.common.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'apps.common.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Общий кэш процессов: готовые JSON-ответы и их версии (RESPONSE_CACHE), готовность миниатюр. REDIS_URL требует пакета
+# redis. Без REDIS_URL (разработка, тесты) — кэш в памяти процесса, который не годится для нескольких воркеров
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL},
+    }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "drf-ecommerce"},
+    }
+
+# Кэш готовых JSON-ответов (apps.common.cache) поверх CACHES. Для кэша в памяти одного процесса (только разработка):
+# {"BACKEND": "apps.common.cache.LocMemLRUBackend", "OPTIONS": {"max_entries": 256}}
+RESPONSE_CACHE = {
+    "BACKEND": "apps.common.cache.DjangoCacheBackend",
+    "OPTIONS": {"alias": "default"},
+}
+
+# Бэкенд полнотекстового поиска товаров (apps.shop.search). Если не задан, на SQLite используется FTS5; на других СУБД
+# его нужно задать явно, иначе товары не индексируются и поиск недоступен. "apps.shop.search.InMemorySearchBackend" —
+# индекс в памяти процесса, только для тестов
+PRODUCT_SEARCH_BACKEND = None
+
+# Номер воркера генератора кодов (apps.common.codes), 0..1023, уникальный для каждого процесса. Если не задан, номер
+# арендуется в общем кэше, поэтому серверам с несколькими воркерами из одного окружения нужен REDIS_URL. Кэш в памяти
+# процесса у каждого воркера свой, и аренда на нем отклоняется с ImproperlyConfigured: без REDIS_URL (разработка в одном
+# процессе) номер задается явно, например CODE_WORKER_ID=0
+CODE_WORKER_ID = int(os.environ["CODE_WORKER_ID"]) if os.environ.get("CODE_WORKER_ID") else None
+
+# Время жизни резерва товаров на складе (в секундах), после которого брошенный резерв освобождается
+STOCK_RESERVATION_TTL = 15 * 60
+
+# Миниатюры изображений (apps.common.images). EXECUTOR: thread, process или sync
+IMAGE_RENDITIONS = {
+    "EXECUTOR": "thread",
+    "WORKERS": 2,
+    "FORMAT": "WEBP",
+    "QUALITY": 80,
+    "SIZES": {"thumb": (320, 320), "medium": (800, 800)},
+}
+
+# Метрики производительности запросов (apps.common.middleware.PerformanceMiddleware)
+PERF_METRICS_ENABLED = True
+PERF_SERVER_TIMING = True
+# Превышение query_budget представления — исключение вместо предупреждения в логе (включается тестовым раннером)
+PERF_ENFORCE_QUERY_BUDGETS = False
+TEST_RUNNER = "apps.common.test_runner.QueryBudgetTestRunner"
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "My First API", # название проекта
     "VERSION": "0.0.1", # версия проекта
@@ -162,4 +255,27 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
     'ACCESS_TOKEN_LIFETIME': timedelta(days=7),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=30),
-}
\ No newline at end of file
+}
+
+# Маршруты, которые обслуживаются асинхронными вариантами представлений (apps.common.async_views.select_view).
+# Имеет смысл только при запуске под ASGI (uvicorn core.asgi:application): под WSGI async-представление выполняется
+# через async_to_sync и работает медленнее синхронного
+ASYNC_VIEWS = []
+
+# Архивирование мягко удаленных строк (apps.common.archive, команда archive_deleted)
+SOFT_DELETE_ARCHIVE = {
+    "RETENTION_DAYS": 30,
+    "BATCH_SIZE": 500,
+    "PAUSE": 0.1,
+}
+
+# Сколько секунд LazyJWTAuthentication доверяет закэшированному состоянию пользователя (is_active, is_deleted)
+JWT_USER_STATE_TTL = 60
+
+# Повтор POST-запросов с заголовком Idempotency-Key (apps.common.idempotency): сколько секунд хранится ответ и через
+# сколько секунд незавершенный запрос перестает блокировать ключ. Просроченные ключи удаляет purge_idempotency_keys
+IDEMPOTENCY = {
+    "TTL": 24 * 60 * 60,
+    "LOCK_TIMEOUT": 60,
+    "METHODS": ["POST"],
+}